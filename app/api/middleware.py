@@ -0,0 +1,212 @@
+import time
+
+from starlette.responses import JSONResponse
+from starlette.routing import Match
+
+from ..services import profiling, tracing
+from ..services.admission import AdmissionRejected, admission_class, get_admission_controller
+from ..services.metrics import route_label, track_in_flight
+from ..services.report_cache import set_cache_policy
+
+
+class CacheControlMiddleware:
+    """Propaga la cabecera ``Cache-Control`` de la petición a la caché de reportes.
+
+    Middleware ASGI puro para que la política quede en el contexto de la tarea
+    que ejecuta la ruta (incluido el envío de respuestas en streaming).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            cache_control = None
+            for name, value in scope.get("headers") or []:
+                if name == b"cache-control":
+                    cache_control = value.decode("latin-1")
+                    break
+            set_cache_policy(cache_control)
+        await self.app(scope, receive, send)
+
+
+class MetricsMiddleware:
+    """Etiqueta las métricas de la petición con la plantilla de la ruta (``/api/v1/lora/docx/{id}``).
+
+    Se usa la plantilla y no la URL para no crear una serie por id. Las rutas de
+    exportación (``/lora/...``) cuentan como exportaciones en curso hasta enviar
+    el último byte del cuerpo.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        route = _route_template(scope)
+        if route is None:
+            await self.app(scope, receive, send)
+            return
+        token = route_label.set(route)
+        try:
+            if "/lora/" in route:
+                with track_in_flight(route):
+                    await self.app(scope, receive, send)
+            else:
+                await self.app(scope, receive, send)
+        finally:
+            route_label.reset(token)
+
+
+class AdmissionMiddleware:
+    """Admite las exportaciones según su clase de costo (ver app/services/admission.py).
+
+    El cupo se mantiene hasta enviar el último byte del cuerpo, por lo que los
+    listados en streaming también cuentan mientras se envían. Una clase saturada
+    responde 429 (cola llena) o 503 (espera agotada) con ``Retry-After``. El
+    tenant es la API key verificada, el ``userId`` de la petición o la dirección
+    del cliente (ver app/services/tenants.py).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        name = admission_class(_route_template(scope)) if scope["type"] == "http" else None
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+        controller = get_admission_controller()
+        tenant = controller.tenants.identify(
+            scope.get("headers") or [], scope.get("client"), scope.get("export_route_params"), scope.get("query_string", b""),
+        )
+        try:
+            async with controller.admit(name, tenant):
+                await self.app(scope, receive, send)
+        except AdmissionRejected as e:
+            await _error(e.status_code, str(e), scope, receive, send, {"Retry-After": str(e.retry_after)})
+
+
+class TracingMiddleware:
+    """Abre una traza por petición y agrega ``Server-Timing`` con la duración de cada etapa.
+
+    La cabecera resume los spans terminados al empezar la respuesta (consulta a
+    VALERA, normalización, cola, render y serialización) más ``total``; el envío
+    del cuerpo se registra como span ``send`` solo en la traza exportada.
+    ``X-Trace-Id`` permite buscar la traza completa en el archivo o colector.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        route = _route_template(scope)
+        if route is None:
+            await self.app(scope, receive, send)
+            return
+        traceparent = None
+        for name, value in scope.get("headers") or []:
+            if name == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+        started = time.perf_counter()
+        with tracing.trace("request", traceparent, **{"http.request.method": scope["method"], "http.route": route}) as trace:
+            send_started = None
+
+            async def send_with_timing(message):
+                nonlocal send_started
+                if message["type"] == "http.response.start":
+                    send_started = time.time_ns()
+                    message = dict(message)
+                    message["headers"] = _timing_headers(message.get("headers") or [], trace, started)
+                elif message["type"] == "http.response.body" and not message.get("more_body", False) and send_started is not None:
+                    tracing.record("send", send_started, time.time_ns())
+                await send(message)
+
+            await self.app(scope, receive, send_with_timing)
+
+
+class ProfilingMiddleware:
+    """Activa el perfilado de los renders de la petición (``X-Profile: cprofile|sample``).
+
+    Requiere ``PROFILING_ENABLED`` y el token de ``PROFILING_ADMIN_TOKEN`` en
+    ``X-Admin-Token``; sin perfilado habilitado la cabecera se ignora. Los ids de
+    los perfiles generados se devuelven en ``X-Profile-Id`` (ver ``/api/v1/admin/profiles``).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        mode = None
+        if scope["type"] == "http" and profiling.enabled():
+            headers = dict(scope.get("headers") or [])
+            mode = headers.get(b"x-profile", b"").decode("latin-1").strip().lower() or None
+            if mode is not None:
+                if not profiling.check_token(headers.get(b"x-admin-token", b"").decode("latin-1")):
+                    await _error(403, "Token de administración inválido", scope, receive, send)
+                    return
+                if mode not in profiling.PROFILE_MODES:
+                    await _error(400, f"X-Profile debe ser uno de: {', '.join(profiling.PROFILE_MODES)}", scope, receive, send)
+                    return
+        if mode is None:
+            await self.app(scope, receive, send)
+            return
+
+        ids = []
+        mode_token = profiling.profile_mode.set(mode)
+        ids_token = profiling.request_profiles.set(ids)
+
+        async def send_with_profiles(message):
+            if message["type"] == "http.response.start" and ids:
+                message = dict(message)
+                message["headers"] = list(message.get("headers") or []) + [(b"x-profile-id", ",".join(ids).encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profiles)
+        finally:
+            profiling.request_profiles.reset(ids_token)
+            profiling.profile_mode.reset(mode_token)
+
+
+async def _error(status_code: int, message: str, scope, receive, send, headers=None):
+    # Mismo formato que el manejador de HTTPException de app/main.py
+    response = JSONResponse(status_code=status_code, content={"error": True, "message": message, "status_code": status_code}, headers=headers)
+    await response(scope, receive, send)
+
+
+def _timing_headers(headers, trace, started: float):
+    headers = list(headers)
+    headers.append((b"x-trace-id", trace.trace_id.encode("latin-1")))
+    if not tracing.server_timing_enabled():
+        return headers
+    total = f"total;dur={(time.perf_counter() - started) * 1000:.1f}"
+    timing = ", ".join(filter(None, [trace.server_timing(), total]))
+    for index, (name, value) in enumerate(headers):
+        # La ruta puede haber agregado sus propias entradas (p. ej. un formato por entrada en /lora/{id}/export)
+        if name.lower() == b"server-timing":
+            headers[index] = (name, value + b", " + timing.encode("latin-1"))
+            return headers
+    headers.append((b"server-timing", timing.encode("latin-1")))
+    return headers
+
+
+def _route_template(scope):
+    # Se resuelve una sola vez por petición y se comparte entre middlewares
+    if "export_route" not in scope:
+        scope["export_route"] = None
+        scope["export_route_params"] = {}
+        app = scope.get("app")
+        for route in getattr(getattr(app, "router", None), "routes", []):
+            match, child_scope = route.matches(scope)
+            if match == Match.FULL:
+                scope["export_route"] = getattr(route, "path", None)
+                scope["export_route_params"] = child_scope.get("path_params", {})
+                break
+    return scope["export_route"]
@@ -0,0 +1,210 @@
+import io
+import os
+import time
+import zipfile
+import tempfile
+from typing import Any, AsyncIterable, AsyncIterator, BinaryIO, Mapping, Optional, Tuple
+
+import anyio
+from starlette.background import BackgroundTask
+from starlette.responses import Response
+
+from ..services.render_executor import SpilledFile, discard_output
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+class ExportFileResponse(Response):
+    """Respuesta de descarga que envía el archivo exportado por fragmentos sin copiarlo.
+
+    Acepta los bytes del render, el ``BytesIO`` del exportador, un archivo abierto
+    (p. ej. un artefacto del almacén en disco) o un ``SpilledFile`` escrito por el
+    proceso de render. Los contenidos en memoria se recorren con ``memoryview`` en
+    fragmentos de tamaño fijo; los que superan el umbral se vuelcan antes a un
+    ``SpooledTemporaryFile`` para no retenerlos en RAM mientras el cliente descarga.
+
+    Configuración por variables de entorno:
+        EXPORT_CHUNK_SIZE: bytes por fragmento enviado (default 64 KB)
+        EXPORT_SPOOL_BYTES: tamaño a partir del cual se envía desde disco (default 8 MB)
+    """
+
+    chunk_size = _env_int("EXPORT_CHUNK_SIZE", 64 * 1024)
+    spool_bytes = _env_int("EXPORT_SPOOL_BYTES", 8 * 1024 * 1024)
+
+    def __init__(
+        self,
+        content: Any,
+        media_type: Optional[str] = None,
+        filename: Optional[str] = None,
+        headers: Optional[Mapping[str, str]] = None,
+        status_code: int = 200,
+        background: Optional[BackgroundTask] = None,
+    ):
+        self.status_code = status_code
+        self.media_type = media_type
+        self.background = background
+        self._view: Optional[memoryview] = None
+        self._file: Optional[BinaryIO] = None
+        self._spilled: Optional[SpilledFile] = None
+
+        if isinstance(content, SpilledFile):
+            self._spilled = content
+            size = content.size
+        elif isinstance(content, io.BytesIO):
+            self._view = content.getbuffer()
+            size = self._view.nbytes
+        elif isinstance(content, (bytes, bytearray, memoryview)):
+            self._view = memoryview(content)
+            size = self._view.nbytes
+        else:
+            self._file = content
+            size = os.fstat(content.fileno()).st_size - content.tell()
+
+        headers = dict(headers or {})
+        headers["content-length"] = str(size)
+        if filename is not None:
+            headers.setdefault("Content-Disposition", f'attachment; filename="{filename}"')
+        self.init_headers(headers)
+
+    async def __call__(self, scope, receive, send):
+        try:
+            if self._view is not None and self._view.nbytes > self.spool_bytes:
+                self._file = await anyio.to_thread.run_sync(self._spool)
+            if self._spilled is not None:
+                self._file = await anyio.to_thread.run_sync(open, self._spilled.path, "rb")
+
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            if self._file is not None:
+                await self._send_file(send)
+            else:
+                await self._send_view(send)
+        finally:
+            self._close()
+        if self.background is not None:
+            await self.background()
+
+    async def _send_view(self, send):
+        view, size = self._view, self._view.nbytes
+        for offset in range(0, size, self.chunk_size):
+            # El corte de un memoryview no copia; solo el fragmento enviado se materializa en bytes
+            end = offset + self.chunk_size
+            await send({"type": "http.response.body", "body": bytes(view[offset:end]), "more_body": end < size})
+        if not size:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    async def _send_file(self, send):
+        more_body = True
+        while more_body:
+            chunk = await anyio.to_thread.run_sync(self._file.read, self.chunk_size)
+            more_body = len(chunk) == self.chunk_size
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+    def _spool(self) -> BinaryIO:
+        spool = tempfile.SpooledTemporaryFile(max_size=self.spool_bytes, prefix="export-")
+        for offset in range(0, self._view.nbytes, self.chunk_size):
+            spool.write(self._view[offset:offset + self.chunk_size])
+        spool.seek(0)
+        # Liberar la referencia al buffer del render: a partir de aquí se envía desde disco
+        self._view.release()
+        self._view = None
+        return spool
+
+    def _close(self):
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._spilled is not None:
+            try:
+                os.unlink(self._spilled.path)
+            except OSError:
+                pass
+            self._spilled = None
+
+
+CHUNK_SIZE = ExportFileResponse.chunk_size
+
+
+def content_size(content: Any) -> int:
+    """Tamaño en bytes de un resultado de render (bytes, ``SpilledFile`` o archivo abierto)"""
+    if isinstance(content, SpilledFile):
+        return content.size
+    if isinstance(content, (bytes, bytearray, memoryview)):
+        return memoryview(content).nbytes
+    return os.fstat(content.fileno()).st_size - content.tell()
+
+
+def release_content(content: Any):
+    """Libera un resultado que no se llegó a enviar (cierra el archivo o borra el temporal)"""
+    if isinstance(content, SpilledFile):
+        discard_output(content)
+    elif hasattr(content, "close"):
+        content.close()
+
+
+async def iter_content(content: Any, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[memoryview]:
+    """Recorre un resultado de render por fragmentos; los archivos se leen en hilos"""
+    if isinstance(content, (bytes, bytearray, memoryview)):
+        view = memoryview(content)
+        for offset in range(0, view.nbytes, chunk_size):
+            yield view[offset:offset + chunk_size]
+        return
+    f = await anyio.to_thread.run_sync(open, content.path, "rb") if isinstance(content, SpilledFile) else content
+    try:
+        while True:
+            chunk = await anyio.to_thread.run_sync(f.read, chunk_size)
+            if not chunk:
+                break
+            yield memoryview(chunk)
+    finally:
+        f.close()
+        release_content(content)
+
+
+class _ZipSink:
+    """Destino de ``zipfile`` sin ``seek``/``tell``: acumula lo escrito hasta enviarlo"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+async def zip_stream(entries: AsyncIterable[Tuple[str, Any]]) -> AsyncIterator[bytes]:
+    """Genera un ZIP a medida que llegan las entradas ``(nombre, contenido)``.
+
+    Cada entrada se escribe por fragmentos y se envía de inmediato, por lo que en
+    memoria solo hay un fragmento del archivo en curso. Los archivos exportados ya
+    vienen comprimidos (PDF, DOCX, XLSX) y se guardan sin recomprimir.
+    """
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED) as archive:
+        async for name, content in entries:
+            info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+            # Con el tamaño conocido zipfile decide si la entrada necesita ZIP64
+            info.file_size = content_size(content)
+            with archive.open(info, mode="w") as dest:
+                async for chunk in iter_content(content):
+                    dest.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+            yield sink.drain()
+    yield sink.drain()
@@ -1,8 +1,11 @@
-import io
+import os
+import time
+import asyncio
+from typing import Any, AsyncIterator, Dict, List, NamedTuple, Optional, Tuple
 from fastapi import APIRouter, HTTPException, Response, Request
 from fastapi.responses import StreamingResponse
 from datetime import datetime
-from ..models.ExportModel import FileFormat
+from ..models.ExportModel import FileFormat, ExportType, ExportJobRequest, ExportJobResponse, BundleRequest
 
 from ..services.LORA.pdf.all_reports import ExportAllReports
 from ..services.LORA.pdf.all_reports_by_userId import ExportAllReportsByUserId
@@ -11,12 +14,25 @@ from ..services.LORA.pdf.single_report_with_styles import ExportSinglePDFReportW
 from ..services.LORA.docs.single_report import DOCXExportService
 from ..services.LORA.xlsx.single_report import XLSXExportService
 from ..services.LORA.xlsx.all_reports import XLSXListExportService
+from ..services.LORA.csv.all_reports import CSVListExportService
+from ..services.LORA.ndjson.all_reports import NDJSONListExportService
+from ..services.LORA.parquet.all_reports import ParquetListExportService
+from ..services.LORA.report_view import ReportView, report_view, view_cache_stats
 from ..services.valera_client import (
-    get_report_by_id,
-    get_reports,
-    get_report_by_userId,
-    get_reports_by_filters,
+    get_report_by_id_async,
+    get_reports_async,
+    iter_reports_by_userId_async,
+    iter_reports_by_filters_async,
+    get_client,
 )
+from ..services.artifact_store import artifact_key, source_etag, etag_matches, get_artifact_store
+from ..services.render_executor import RenderJob, RenderStream, SpilledFile, get_executor
+from ..services.memory import MemoryBudgetExceeded
+from ..services.admission import get_admission_controller
+from ..services.export_jobs import ExportJob, JobQueueFull, get_job_manager
+from ..services.tracing import get_exporter
+from ..services import profiling
+from .responses import ExportFileResponse, release_content, zip_stream
 
 router = APIRouter()
 
@@ -25,8 +41,142 @@ SERVICE_MAP = {
     FileFormat.PDF: ExportAllReports,
     FileFormat.DOCX: DOCXExportService,
     FileFormat.XLSX: XLSXExportService,
+    FileFormat.CSV: CSVListExportService,
+    FileFormat.NDJSON: NDJSONListExportService,
+    FileFormat.PARQUET: ParquetListExportService,
 }
 
+# Exportadores que se precargan en los procesos de render
+EXPORTERS = (
+    ExportAllReports,
+    ExportAllReportsByUserId,
+    ExportSinglePDFReportSimple,
+    ExportSinglePDFReportWithStyle,
+    DOCXExportService,
+    XLSXExportService,
+    XLSXListExportService,
+)
+
+# Renders simultáneos y entradas máximas de /lora/bundle
+BUNDLE_CONCURRENCY = int(os.getenv("BUNDLE_CONCURRENCY", "8"))
+BUNDLE_MAX_ITEMS = int(os.getenv("BUNDLE_MAX_ITEMS", "2000"))
+
+async def _stream_listing(request: Request, service, reports: Any, filename: str) -> Response:
+    """Envía un listado (CSV, NDJSON, Parquet) por fragmentos a medida que se codifica.
+
+    El ETag se calcula con la huella ``id@updatedAt`` del listado completo, por lo
+    que las páginas de VALERA se reciben antes de responder: un fallo de VALERA
+    devuelve un error y no una descarga cortada, y si el cliente ya tiene la
+    versión actual se responde 304 sin codificar nada.
+    """
+    paginated = hasattr(reports, "__aiter__")
+    if paginated:
+        reports = [report async for report in reports]
+    etag = source_etag(reports, type(service))
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return StreamingResponse(
+        # Los listados paginados conservan la codificación por lotes del iterador asíncrono
+        service.aiter_chunks(_replay(reports) if paginated else reports),
+        media_type=service.get_content_type(),
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', "ETag": etag},
+    )
+
+async def _replay(reports: List[Any]) -> AsyncIterator[Any]:
+    for report in reports:
+        yield report
+
+async def _render(service, data: Any, options: Dict = None, init_args: Tuple = (), stream: Optional[RenderStream] = None):
+    """Renderiza en el motor de procesos o sirve el artefacto cacheado si los datos no cambiaron.
+
+    Con ``stream`` (ver ``_receive``) el render ya empezó mientras llegaban los
+    reportes: se completa, o se descarta si el artefacto está en caché.
+
+    Devuelve bytes, un ``SpilledFile`` o el artefacto abierto; ``ExportFileResponse``
+    envía cualquiera de ellos sin copias adicionales.
+    """
+    executor = get_executor()
+    store = get_artifact_store()
+    try:
+        key = await executor.run_io(artifact_key, data, service.get_file_extension(), type(service), options)
+        # Una petición perfilada siempre renderiza: el artefacto cacheado no dice nada del render
+        cached = await executor.run_io(store.open, key) if profiling.profile_mode.get() is None else None
+    except BaseException:
+        # Los fragmentos ya enviados terminan y se borran
+        if stream is not None:
+            stream.discard()
+        raise
+    if cached is not None:
+        if stream is not None:
+            stream.discard()
+        return cached
+    if stream is not None:
+        content = await stream.finish()
+    else:
+        job = RenderJob.for_service(type(service), data, options, init_args)
+        content = await executor.render(job, service.get_file_extension())
+    try:
+        if isinstance(content, SpilledFile):
+            await executor.run_io(store.put_file, key, content.path)
+        else:
+            await executor.run_io(store.put, key, content)
+    except BaseException:
+        # Cancelada (p. ej. el cliente cerró el ZIP) antes de entregar el archivo
+        release_content(content)
+        raise
+    return content
+
+class ExportPlan(NamedTuple):
+    """Qué renderizar en una exportación: servicio, datos de VALERA y nombre del archivo.
+
+    ``data`` puede ser un iterador asíncrono de reportes (listados paginados de VALERA).
+    """
+    service: Any
+    data: Any
+    filename: str
+    init_args: Tuple = ()
+
+async def _receive(plan: ExportPlan, options: Dict = None) -> Tuple[Any, Optional[RenderStream]]:
+    """Devuelve los datos del plan; si llegan por páginas, los envía al motor de render según llegan.
+
+    Los PDF multi-reporte renderizan cada fragmento mientras se descargan las
+    páginas siguientes (ver ``RenderStream``).
+    """
+    if not hasattr(plan.data, "__aiter__"):
+        return plan.data, None
+    service = plan.service
+    job = RenderJob.for_service(type(service), None, options, plan.init_args)
+    stream = get_executor().stream(job, service.get_file_extension())
+    try:
+        async for report in plan.data:
+            stream.add(report)
+    except BaseException:
+        stream.discard()
+        raise
+    return stream.data, stream
+
+async def _export(request: Request, plan: ExportPlan, options: Dict = None) -> Response:
+    """Responde 304 si el cliente ya tiene la versión actual; si no, renderiza y envía el archivo.
+
+    El ETag depende solo de los datos de origen y de la versión del exportador, por
+    lo que se evalúa antes de renderizar (o de terminar un render en streaming).
+    """
+    service = plan.service
+    data, stream = await _receive(plan, options)
+    try:
+        etag = source_etag(data, type(service), options)
+        not_modified = etag_matches(request.headers.get("if-none-match"), etag)
+    except BaseException:
+        if stream is not None:
+            stream.discard()
+        raise
+    if not_modified:
+        if stream is not None:
+            stream.discard()
+        return Response(status_code=304, headers={"ETag": etag})
+    content = await _render(service, data, options, plan.init_args, stream)
+    return ExportFileResponse(content, media_type=service.get_content_type(), filename=plan.filename, headers={"ETag": etag})
+
 @router.get("/health")
 async def health_check():
     return {
@@ -35,6 +185,18 @@ async def health_check():
         "supported_formats": [fmt.value for fmt in FileFormat],
     }
 
+@router.get("/stats", summary="Estadísticas del cliente VALERA, cachés, motor de render y trabajos")
+async def get_stats():
+    return {
+        "valera": get_client().stats(),
+        "report_views": view_cache_stats(),
+        "artifacts": get_artifact_store().stats(),
+        "executor": get_executor().stats(),
+        "jobs": get_job_manager().stats(),
+        "admission": get_admission_controller().stats(),
+        "tracing": get_exporter().stats() if get_exporter() is not None else {"enabled": False},
+    }
+
 @router.get("/formats")
 async def get_supported_formats():
     return {
@@ -48,160 +210,485 @@ async def get_supported_formats():
         ]
     }
 
+# Planes de exportación: compartidos por las rutas /lora y por los trabajos en segundo plano
+
+async def _plan_pdf_all_reports() -> ExportPlan:
+    reports = await get_reports_async()
+    return ExportPlan(ExportAllReports(), reports, "todos_los_reportes.pdf")
+
+async def _plan_pdf_all_reports_by_user(userId: int) -> ExportPlan:
+    reports = iter_reports_by_userId_async(userId)
+    return ExportPlan(ExportAllReportsByUserId(userId), reports, f"reportes_usuario_{userId}.pdf", (userId,))
+
+async def _plan_xlsx_all_reports() -> ExportPlan:
+    data = await get_reports_async()
+    service = XLSXListExportService()
+    return ExportPlan(service, data, f"todos_los_reportes{service.get_file_extension()}")
+
+async def _plan_xlsx_all_reports_by_user(userId: int) -> ExportPlan:
+    data = iter_reports_by_userId_async(userId)
+    service = XLSXListExportService()
+    return ExportPlan(service, data, f"reportes_usuario_{userId}{service.get_file_extension()}")
+
+async def _plan_xlsx_all_reports_filter(params_list: List[Tuple[str, Any]]) -> ExportPlan:
+    # Obtener todas las páginas filtradas de VALERA y generar XLSX con el servicio de listado
+    data = iter_reports_by_filters_async(params_list)
+    service = XLSXListExportService()
+    return ExportPlan(service, data, f"reportes_filtrados{service.get_file_extension()}")
+
+async def _get_report_view(id: int) -> ReportView:
+    # La vista se construye una vez por (id, updatedAt) y la comparten todos los formatos
+    return report_view(await get_report_by_id_async(id))
+
+# Exportaciones de un solo reporte: el exportador recibe la vista ya obtenida
+SINGLE_REPORT_SERVICES = {
+    ExportType.PDF_STYLED: ExportSinglePDFReportWithStyle,
+    ExportType.PDF_SIMPLE: ExportSinglePDFReportSimple,
+    ExportType.DOCX: DOCXExportService,
+    ExportType.XLSX: XLSXExportService,
+}
+
+def _plan_single_report(export: ExportType, id: int, view: ReportView) -> ExportPlan:
+    service = SINGLE_REPORT_SERVICES[export]()
+    return ExportPlan(service, view, f"lora_report_{id}{service.get_file_extension()}")
+
+async def _plan_docx(id: int) -> ExportPlan:
+    return _plan_single_report(ExportType.DOCX, id, await _get_report_view(id))
+
+async def _plan_xlsx(id: int) -> ExportPlan:
+    return _plan_single_report(ExportType.XLSX, id, await _get_report_view(id))
+
+async def _plan_pdf_simple(id: int) -> ExportPlan:
+    return _plan_single_report(ExportType.PDF_SIMPLE, id, await _get_report_view(id))
+
+async def _plan_pdf_styled(id: int) -> ExportPlan:
+    return _plan_single_report(ExportType.PDF_STYLED, id, await _get_report_view(id))
+
 @router.get("/lora/pdf_all_reports", summary="Exporta todos los reportes en un PDF")
-async def export_pdf_all_reports():
+async def export_pdf_all_reports(request: Request):
     try:
-        service = ExportAllReports()
-        file_buffer = await service.generate_file()
-        return Response(
-            content=file_buffer.read(),
-            media_type=service.get_content_type(),
-            headers={"Content-Disposition": 'attachment; filename="todos_los_reportes.pdf"'},
-        )
+        return await _export(request, await _plan_pdf_all_reports())
+    except MemoryBudgetExceeded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al exportar reportes en PDF: {str(e)}")
 
 @router.get("/lora/pdf_all_reports_by_user/{userId}", summary="Exporta reportes por usuario en un PDF")
-async def export_pdf_all_reports_by_user(userId: int):
+async def export_pdf_all_reports_by_user(userId: int, request: Request):
     try:
-        service = ExportAllReportsByUserId(userId)
-        file_buffer = await service.generate_file()
-        return Response(
-            content=file_buffer.read(),
-            media_type=service.get_content_type(),
-            headers={"Content-Disposition": f'attachment; filename="reportes_usuario_{userId}.pdf"'},
-        )
+        return await _export(request, await _plan_pdf_all_reports_by_user(userId))
+    except MemoryBudgetExceeded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al exportar reportes por usuario en PDF: {str(e)}")
 
 @router.get("/lora/xlsx_all_reports", summary="Exporta todos los reportes en XLSX (listado)")
-def export_xlsx_all_reports():
-    data = get_reports()
-    print(data)
-    service = XLSXListExportService()
-    file_buffer = service.generate_file(data, None)
-    filename = f"todos_los_reportes{service.get_file_extension()}"
-    return StreamingResponse(
-        io.BytesIO(file_buffer.read()),
-        media_type=service.get_content_type(),
-        headers={"Content-Disposition": f"attachment; filename={filename}"},
-    )
+async def export_xlsx_all_reports(request: Request):
+    return await _export(request, await _plan_xlsx_all_reports())
 
 @router.get("/lora/xlsx_all_reports_by_user/{userId}", summary="Exporta reportes por usuario en XLSX (listado)")
-def export_xlsx_all_reports_by_user(userId: int):
-    resp = get_report_by_userId(userId)
-    print(resp)
-    data = (((resp or {}).get("data") or {}).get("data") or [])
-    service = XLSXListExportService()
-    file_buffer = service.generate_file(data, None)
-    filename = f"reportes_usuario_{userId}{service.get_file_extension()}"
-    return StreamingResponse(
-        io.BytesIO(file_buffer.read()),
-        media_type=service.get_content_type(),
-        headers={"Content-Disposition": f"attachment; filename={filename}"},
-    )
+async def export_xlsx_all_reports_by_user(userId: int, request: Request):
+    return await _export(request, await _plan_xlsx_all_reports_by_user(userId))
 
 @router.get("/lora/xlsx_all_reports_filter", summary="Exporta reportes filtrados en XLSX (listado)")
-def export_xlsx_all_reports_filter(request: Request):
+async def export_xlsx_all_reports_filter(request: Request):
     try:
         # Capturar todos los filtros recibidos (soporta claves repetidas)
         params_list = list(request.query_params.multi_items())
-
-        # Llamar al cliente VALERA para obtener los datos filtrados
-        resp = get_reports_by_filters(params_list)
-        data = (((resp or {}).get("data") or {}).get("data") or [])
-
-        # Generar XLSX usando el servicio existente de listado
-        service = XLSXListExportService()
-        file_buffer = service.generate_file(data, None)
-        filename = f"reportes_filtrados{service.get_file_extension()}"
-
-        return StreamingResponse(
-            io.BytesIO(file_buffer.read()),
-            media_type=service.get_content_type(),
-            headers={"Content-Disposition": f"attachment; filename={filename}"},
-        )
+        return await _export(request, await _plan_xlsx_all_reports_filter(params_list))
+    except MemoryBudgetExceeded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al exportar reportes filtrados en XLSX: {str(e)}")
 
 @router.get("/lora/docx/{id}")
-def export_single_report_docx(id: int):
-    try:
-        data = get_report_by_id(id)
-        service = DOCXExportService()
-        file_buffer = service.generate_file(data)
-        filename = f"lora_report_{id}{service.get_file_extension()}"
-        return StreamingResponse(
-            io.BytesIO(file_buffer.read()),
-            media_type=service.get_content_type(),
-            headers={"Content-Disposition": f"attachment; filename={filename}"},
-        )
+async def export_single_report_docx(id: int, request: Request):
+    try:
+        return await _export(request, await _plan_docx(id))
+    except MemoryBudgetExceeded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error exportando DOCX: {str(e)}")
 
 @router.get("/lora/xlsx/{id}")
-def export_single_report_xlsx(id: int):
-    try:
-        data = get_report_by_id(id)
-        service = XLSXExportService()
-        file_buffer = service.generate_file(data)
-        filename = f"lora_report_{id}{service.get_file_extension()}"
-        return StreamingResponse(
-            io.BytesIO(file_buffer.read()),
-            media_type=service.get_content_type(),
-            headers={"Content-Disposition": f"attachment; filename={filename}"},
-        )
+async def export_single_report_xlsx(id: int, request: Request):
+    try:
+        return await _export(request, await _plan_xlsx(id))
+    except MemoryBudgetExceeded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error exportando XLSX: {str(e)}")
 
-def _normalize_report_for_single_pdf(data: dict) -> dict:
-    # Adaptar evidencias a lista esperada por los servicios
-    if 'evidence' not in data:
-        evid = data.get('reportEvidence')
-        if evid:
-            data['evidence'] = [evid]
-        else:
-            data['evidence'] = []
-    # Adaptar responsable dentro de acciones
-    actions = data.get('actions') or []
-    for act in actions:
-        if 'responsible' not in act:
-            assigned = act.get('assignedTo') or {}
-            user_info = (assigned or {}).get('userInformation') or {}
-            name = (user_info.get('name') or '').strip()
-            last = (user_info.get('lastName') or '').strip()
-            full = f"{name} {last}".strip()
-            act['responsible'] = full or assigned.get('documentId') or ''
-    return data
-
 @router.get("/lora/pdf_simple/{id}")
-def export_single_report_pdf_simple(id: int):
-    try:
-        data = get_report_by_id(id)
-        data = _normalize_report_for_single_pdf(data)
-        service = ExportSinglePDFReportSimple()
-        file_buffer = service.generate_file(data)
-        filename = f"lora_report_{id}.pdf"
-        return StreamingResponse(
-            io.BytesIO(file_buffer.read()),
-            media_type=service.get_content_type(),
-            headers={"Content-Disposition": f"attachment; filename={filename}"},
-        )
+async def export_single_report_pdf_simple(id: int, request: Request):
+    try:
+        return await _export(request, await _plan_pdf_simple(id))
+    except MemoryBudgetExceeded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error exportando PDF simple: {str(e)}")
 
 @router.get("/lora/pdf_styled/{id}")
-async def export_single_report_pdf_styled(id: int):
-    try:
-        data = get_report_by_id(id)
-        data = _normalize_report_for_single_pdf(data)
-        service = ExportSinglePDFReportWithStyle()
-        file_buffer = await service.generate_file(data)
-        filename = f"lora_report_{id}.pdf"
-        return StreamingResponse(
-            io.BytesIO(file_buffer.read()),
-            media_type=service.get_content_type(),
-            headers={"Content-Disposition": f"attachment; filename={filename}"},
-        )
+async def export_single_report_pdf_styled(id: int, request: Request):
+    try:
+        return await _export(request, await _plan_pdf_styled(id))
+    except MemoryBudgetExceeded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error exportando PDF con estilo: {str(e)}")
+
+# Listados CSV / NDJSON enviados en streaming
+
+@router.get("/lora/csv_all_reports", summary="Exporta todos los reportes en CSV (listado)")
+async def export_csv_all_reports(request: Request):
+    try:
+        return await _stream_listing(request, CSVListExportService(), await get_reports_async(), "todos_los_reportes.csv")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al exportar reportes en CSV: {str(e)}")
+
+@router.get("/lora/csv_all_reports_by_user/{userId}", summary="Exporta reportes por usuario en CSV (listado)")
+async def export_csv_all_reports_by_user(userId: int, request: Request):
+    try:
+        return await _stream_listing(request, CSVListExportService(), iter_reports_by_userId_async(userId), f"reportes_usuario_{userId}.csv")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al exportar reportes por usuario en CSV: {str(e)}")
+
+@router.get("/lora/csv_all_reports_filter", summary="Exporta reportes filtrados en CSV (listado)")
+async def export_csv_all_reports_filter(request: Request):
+    try:
+        params_list = list(request.query_params.multi_items())
+        return await _stream_listing(request, CSVListExportService(), iter_reports_by_filters_async(params_list), "reportes_filtrados.csv")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al exportar reportes filtrados en CSV: {str(e)}")
+
+@router.get("/lora/ndjson_all_reports", summary="Exporta todos los reportes en NDJSON (listado)")
+async def export_ndjson_all_reports(request: Request):
+    try:
+        return await _stream_listing(request, NDJSONListExportService(), await get_reports_async(), "todos_los_reportes.ndjson")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al exportar reportes en NDJSON: {str(e)}")
+
+@router.get("/lora/ndjson_all_reports_by_user/{userId}", summary="Exporta reportes por usuario en NDJSON (listado)")
+async def export_ndjson_all_reports_by_user(userId: int, request: Request):
+    try:
+        return await _stream_listing(request, NDJSONListExportService(), iter_reports_by_userId_async(userId), f"reportes_usuario_{userId}.ndjson")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al exportar reportes por usuario en NDJSON: {str(e)}")
+
+@router.get("/lora/ndjson_all_reports_filter", summary="Exporta reportes filtrados en NDJSON (listado)")
+async def export_ndjson_all_reports_filter(request: Request):
+    try:
+        params_list = list(request.query_params.multi_items())
+        return await _stream_listing(request, NDJSONListExportService(), iter_reports_by_filters_async(params_list), "reportes_filtrados.ndjson")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al exportar reportes filtrados en NDJSON: {str(e)}")
+
+# Listados Parquet (requiere pyarrow)
+
+def _parquet_service() -> ParquetListExportService:
+    if not ParquetListExportService.available():
+        raise HTTPException(status_code=501, detail="Exportación Parquet no disponible: instale pyarrow")
+    return ParquetListExportService()
+
+@router.get("/lora/parquet_all_reports", summary="Exporta todos los reportes en Parquet (listado)")
+async def export_parquet_all_reports(request: Request):
+    service = _parquet_service()
+    try:
+        return await _stream_listing(request, service, await get_reports_async(), "todos_los_reportes.parquet")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al exportar reportes en Parquet: {str(e)}")
+
+@router.get("/lora/parquet_all_reports_by_user/{userId}", summary="Exporta reportes por usuario en Parquet (listado)")
+async def export_parquet_all_reports_by_user(userId: int, request: Request):
+    service = _parquet_service()
+    try:
+        return await _stream_listing(request, service, iter_reports_by_userId_async(userId), f"reportes_usuario_{userId}.parquet")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al exportar reportes por usuario en Parquet: {str(e)}")
+
+@router.get("/lora/parquet_all_reports_filter", summary="Exporta reportes filtrados en Parquet (listado)")
+async def export_parquet_all_reports_filter(request: Request):
+    service = _parquet_service()
+    try:
+        params_list = list(request.query_params.multi_items())
+        return await _stream_listing(request, service, iter_reports_by_filters_async(params_list), "reportes_filtrados.parquet")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al exportar reportes filtrados en Parquet: {str(e)}")
+
+# Exportación de varios reportes en un ZIP
+
+# Exportaciones de un solo reporte disponibles en /lora/bundle
+SINGLE_REPORT_EXPORTS = {
+    ExportType.PDF_STYLED: _plan_pdf_styled,
+    ExportType.PDF_SIMPLE: _plan_pdf_simple,
+    ExportType.DOCX: _plan_docx,
+    ExportType.XLSX: _plan_xlsx,
+}
+
+async def _bundle_entry(export: ExportType, id: int) -> Tuple[str, Any]:
+    plan = await SINGLE_REPORT_EXPORTS[export](id)
+    content = await _render(plan.service, plan.data, None, plan.init_args)
+    # Carpeta por exportación: pdf_simple y pdf_styled generan el mismo nombre de archivo
+    return f"{export.value}/{plan.filename}", content
+
+async def _bundle_entries(items: List[Tuple[ExportType, int]]) -> AsyncIterator[Tuple[str, Any]]:
+    """Renderiza con una ventana de ``BUNDLE_CONCURRENCY`` entradas y las entrega según terminan.
+
+    Los errores no interrumpen el ZIP (la respuesta ya está en curso): se listan al
+    final en ``errores.txt``.
+    """
+    pending: Dict[asyncio.Task, Tuple[ExportType, int]] = {}
+    queue = iter(items)
+    errors = []
+
+    def fill():
+        for export, id in queue:
+            pending[asyncio.ensure_future(_bundle_entry(export, id))] = (export, id)
+            if len(pending) >= max(1, BUNDLE_CONCURRENCY):
+                break
+
+    try:
+        fill()
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                export, id = pending.pop(task)
+                try:
+                    entry = task.result()
+                except Exception as e:
+                    errors.append(f"{export.value} {id}: {e}")
+                    continue
+                yield entry
+            fill()
+        if errors:
+            yield "errores.txt", "\n".join(errors).encode("utf-8")
+    finally:
+        # El cliente cerró la descarga: cancelar renders pendientes y liberar los ya terminados
+        # (un render ya enviado al pool borra su archivo al terminar, ver ``RenderExecutor._submit``)
+        for task in pending:
+            if task.done() and not task.cancelled() and task.exception() is None:
+                release_content(task.result()[1])
+            else:
+                task.cancel()
+
+@router.post("/lora/bundle", summary="Exporta varios reportes en un ZIP (uno o más formatos por reporte)")
+async def export_bundle(body: BundleRequest):
+    invalid = [export.value for export in body.formats if export not in SINGLE_REPORT_EXPORTS]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Formatos no disponibles en el ZIP: {', '.join(invalid)}")
+    ids = list(dict.fromkeys(body.ids))
+    formats = list(dict.fromkeys(body.formats))
+    items = [(export, id) for id in ids for export in formats]
+    if len(items) > BUNDLE_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"El ZIP admite como máximo {BUNDLE_MAX_ITEMS} archivos (solicitados: {len(items)})")
+    return StreamingResponse(
+        zip_stream(_bundle_entries(items)),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="reportes_lora.zip"'},
+    )
+
+# Varios formatos de un mismo reporte
+
+def _parse_formats(values: List[str]) -> List[ExportType]:
+    # Acepta ``formats=pdf_styled,docx`` y también la clave repetida (``formats=docx&formats=xlsx``)
+    formats, invalid = [], []
+    for value in values:
+        for name in value.split(","):
+            name = name.strip()
+            if not name:
+                continue
+            try:
+                export = ExportType(name)
+            except ValueError:
+                export = None
+            if export not in SINGLE_REPORT_SERVICES:
+                invalid.append(name)
+            elif export not in formats:
+                formats.append(export)
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Formatos no disponibles: {', '.join(invalid)}")
+    if not formats:
+        raise HTTPException(status_code=400, detail="Debe indicar al menos un formato en 'formats'")
+    return formats
+
+async def _timed_render(plan: ExportPlan) -> Tuple[Any, float]:
+    start = time.perf_counter()
+    content = await _render(plan.service, plan.data, None, plan.init_args)
+    return content, (time.perf_counter() - start) * 1000
+
+async def _zip_entries(entries: List[Tuple[str, Any]]) -> AsyncIterator[Tuple[str, Any]]:
+    for entry in entries:
+        yield entry
+
+@router.get("/lora/{id}/export", summary="Exporta un reporte en varios formatos a la vez (ZIP)")
+async def export_single_report_formats(id: int, request: Request):
+    """Consulta el reporte una sola vez y renderiza cada formato en paralelo en el motor de render.
+
+    ``formats`` admite pdf_styled, pdf_simple, docx y xlsx (default: pdf_styled,docx,xlsx).
+    La cabecera ``Server-Timing`` incluye la duración de cada formato en
+    milisegundos, además de las etapas que agrega ``TracingMiddleware``.
+    """
+    formats = _parse_formats(request.query_params.getlist("formats") or ["pdf_styled,docx,xlsx"])
+    try:
+        view = await _get_report_view(id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error consultando el reporte {id}: {str(e)}")
+
+    plans = [_plan_single_report(export, id, view) for export in formats]
+    results = await asyncio.gather(*[_timed_render(plan) for plan in plans], return_exceptions=True)
+    failed = [(export, result) for export, result in zip(formats, results) if isinstance(result, BaseException)]
+    if failed:
+        for result in results:
+            if not isinstance(result, BaseException):
+                release_content(result[0])
+        export, error = failed[0]
+        if isinstance(error, MemoryBudgetExceeded):
+            raise error
+        raise HTTPException(status_code=500, detail=f"Error exportando {export.value}: {str(error)}")
+
+    entries = []
+    timings = []
+    for export, plan, (content, elapsed) in zip(formats, plans, results):
+        # pdf_simple y pdf_styled comparten extensión: el nombre incluye la exportación
+        entries.append((f"lora_report_{id}_{export.value}{plan.service.get_file_extension()}", content))
+        timings.append((export.value, elapsed))
+    return StreamingResponse(
+        zip_stream(_zip_entries(entries)),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": f'attachment; filename="lora_report_{id}.zip"',
+            "Server-Timing": ", ".join(f"{name};dur={elapsed:.1f}" for name, elapsed in timings),
+        },
+    )
+
+# Trabajos de exportación en segundo plano
+
+# Exportación -> (plan, parámetro requerido de ExportJobRequest)
+JOB_EXPORTS = {
+    ExportType.PDF_ALL_REPORTS: (_plan_pdf_all_reports, None),
+    ExportType.PDF_ALL_REPORTS_BY_USER: (_plan_pdf_all_reports_by_user, "userId"),
+    ExportType.XLSX_ALL_REPORTS: (_plan_xlsx_all_reports, None),
+    ExportType.XLSX_ALL_REPORTS_BY_USER: (_plan_xlsx_all_reports_by_user, "userId"),
+    ExportType.XLSX_ALL_REPORTS_FILTER: (_plan_xlsx_all_reports_filter, "filters"),
+    ExportType.DOCX: (_plan_docx, "id"),
+    ExportType.XLSX: (_plan_xlsx, "id"),
+    ExportType.PDF_SIMPLE: (_plan_pdf_simple, "id"),
+    ExportType.PDF_STYLED: (_plan_pdf_styled, "id"),
+}
+
+def _filter_params(filters: Dict[str, Any]) -> List[Tuple[str, Any]]:
+    # Las listas se envían como claves repetidas, igual que en la query de /lora/xlsx_all_reports_filter
+    params = []
+    for key, value in filters.items():
+        for item in value if isinstance(value, list) else [value]:
+            params.append((key, item))
+    return params
+
+def _job_status(request: Request, job: ExportJob) -> ExportJobResponse:
+    return ExportJobResponse(
+        success=job.status != "failed",
+        message=job.message,
+        filename=job.filename,
+        content_type=job.content_type,
+        job_id=job.id,
+        status=job.status,
+        progress=job.progress,
+        created_at=job.created_at,
+        finished_at=job.finished_at,
+        size=job.size,
+        download_url=request.url_for("download_export_job", job_id=job.id).path if job.status == "completed" else None,
+    )
+
+@router.post("/jobs", status_code=202, response_model=ExportJobResponse, summary="Crea una exportación en segundo plano")
+async def create_export_job(body: ExportJobRequest, request: Request):
+    plan, param = JOB_EXPORTS[body.export]
+    args = ()
+    if param is not None:
+        value = getattr(body, param)
+        if value is None:
+            raise HTTPException(status_code=400, detail=f"'{param}' es requerido para la exportación {body.export.value}")
+        args = (_filter_params(value),) if param == "filters" else (value,)
+
+    async def run(job: ExportJob):
+        job.update("fetching", 0.1, "Consultando reportes en VALERA")
+        export_plan = await plan(*args)
+        data, stream = await _receive(export_plan)
+        try:
+            job.update("rendering", 0.5, "Generando archivo")
+        except BaseException:
+            if stream is not None:
+                stream.discard()
+            raise
+        content = await _render(export_plan.service, data, None, export_plan.init_args, stream)
+        return content, export_plan.filename, export_plan.service.get_content_type()
+
+    try:
+        job = get_job_manager().submit(body.export.value, body.dict(exclude_none=True), run)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return _job_status(request, job)
+
+@router.get("/jobs/{job_id}", response_model=ExportJobResponse, summary="Estado y avance de una exportación")
+async def get_export_job(job_id: str, request: Request):
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Trabajo de exportación no encontrado o expirado")
+    return _job_status(request, job)
+
+@router.get("/jobs/{job_id}/file", summary="Descarga el archivo de una exportación terminada")
+async def download_export_job(job_id: str):
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Trabajo de exportación no encontrado o expirado")
+    if job.status != "completed":
+        raise HTTPException(status_code=409, detail=f"La exportación aún no está lista (estado: {job.status})")
+    try:
+        content = await get_executor().run_io(open, job.path, "rb")
+    except OSError:
+        raise HTTPException(status_code=404, detail="El archivo de la exportación ya no está disponible")
+    return ExportFileResponse(content, media_type=job.content_type, filename=job.filename)
+
+# Administración: perfiles de render y muestreo del proceso (PROFILING_ENABLED + X-Admin-Token)
+
+def _require_admin(request: Request):
+    if not profiling.enabled():
+        raise HTTPException(status_code=404, detail="Perfilado deshabilitado")
+    if not profiling.check_token(request.headers.get("x-admin-token")):
+        raise HTTPException(status_code=403, detail="Token de administración inválido")
+
+@router.get("/admin/profiles", summary="Perfiles de render generados con X-Profile")
+async def list_profiles(request: Request):
+    _require_admin(request)
+    return {"profiles": profiling.get_profile_store().list()}
+
+@router.get("/admin/profiles/{profile_id}", summary="Descarga un perfil (pstats o pilas colapsadas)")
+async def download_profile(profile_id: str, request: Request):
+    _require_admin(request)
+    profile = profiling.get_profile_store().get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Perfil no encontrado o descartado")
+    return Response(
+        content=profile.data,
+        media_type=profile.media_type,
+        headers={"Content-Disposition": f'attachment; filename="{profile.filename}"'},
+    )
+
+@router.get("/admin/flamegraph", summary="Muestrea las pilas de todos los hilos del proceso durante unos segundos")
+async def sample_flamegraph(request: Request, seconds: float = 10.0, interval_ms: float = 5.0):
+    """Devuelve pilas colapsadas (``flamegraph.pl``, speedscope) del proceso que atiende la petición.
+
+    Incluye el hilo del bucle de eventos y los hilos de E/S; los renders en el
+    pool de procesos se perfilan por petición con ``X-Profile``.
+    """
+    _require_admin(request)
+    max_seconds = float(os.getenv("PROFILING_MAX_SECONDS", "60"))
+    if not 0 < seconds <= max_seconds:
+        raise HTTPException(status_code=400, detail=f"'seconds' debe estar entre 0 y {max_seconds:g}")
+    if interval_ms < 1:
+        raise HTTPException(status_code=400, detail="'interval_ms' debe ser al menos 1")
+    stacks = await get_executor().run_io(profiling.sample_process, seconds, interval_ms / 1000)
+    return Response(
+        content=stacks,
+        media_type="text/plain; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="flamegraph_{datetime.now():%Y%m%d_%H%M%S}.collapsed.txt"'},
+    )
@@ -1,19 +1,37 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 import uvicorn
 from contextlib import asynccontextmanager
 
-from .api.routes import router as export_router
+from .api.routes import router as export_router, EXPORTERS
+from .api.middleware import AdmissionMiddleware, CacheControlMiddleware, MetricsMiddleware, ProfilingMiddleware, TracingMiddleware
+from .services.valera_client import init_client, close_client
+from .services.render_executor import init_executor, shutdown_executor, exporter_path
+from .services.export_jobs import init_jobs, shutdown_jobs
+from .services.metrics import init_metrics, render_latest
+from .services.tracing import init_tracing, shutdown_tracing
+from .services.memory import MemoryBudgetExceeded
+from .services.admission import init_admission
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Manejo del ciclo de vida de la aplicación"""
     # Startup
     print(" Iniciando microservicio de creacion de reportes...")
+    await init_client()
+    init_executor(preload=tuple(exporter_path(cls) for cls in EXPORTERS))
+    init_jobs()
+    init_admission()
+    init_metrics()
+    init_tracing()
     yield
     # Shutdown
     print(" Cerrando microservicio de creacion de reportes...")
+    await shutdown_jobs()
+    await close_client()
+    shutdown_executor()
+    shutdown_tracing()
 
 
 # Crear aplicación FastAPI
@@ -24,13 +42,30 @@ app = FastAPI(
     lifespan=lifespan
 )
 
-# Configurar CORS
+# Política de caché por petición (Cache-Control: no-cache / no-store)
+app.add_middleware(CacheControlMiddleware)
+
+# Límite de exportaciones simultáneas por clase de costo (429/503 con Retry-After)
+app.add_middleware(AdmissionMiddleware)
+
+# Etiqueta de ruta y exportaciones en curso para /metrics
+app.add_middleware(MetricsMiddleware)
+
+# Traza por petición y cabecera Server-Timing
+app.add_middleware(TracingMiddleware)
+
+# Perfilado bajo demanda (X-Profile + X-Admin-Token, solo con PROFILING_ENABLED)
+app.add_middleware(ProfilingMiddleware)
+
+# Configurar CORS: se agrega al final para que sea el middleware más externo y
+# también cubra las respuestas de admisión (429/503) y de perfilado (400/403)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # En producción, especificar orígenes específicos
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Content-Disposition", "Server-Timing", "X-Trace-Id", "X-Profile-Id", "Retry-After"],
 )
 
 # Incluir rutas
@@ -49,6 +84,16 @@ async def root():
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Métricas en formato Prometheus (requiere ``prometheus-client``)"""
+    latest = render_latest()
+    if latest is None:
+        raise HTTPException(status_code=501, detail="Métricas no disponibles: instale prometheus-client o revise METRICS_ENABLED")
+    body, content_type = latest
+    return Response(content=body, headers={"Content-Type": content_type})
+
+
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc: HTTPException):
     """Manejo personalizado de excepciones HTTP"""
@@ -58,7 +103,22 @@ async def http_exception_handler(request, exc: HTTPException):
             "error": True,
             "message": exc.detail,
             "status_code": exc.status_code
-        }
+        },
+        headers=getattr(exc, "headers", None)
+    )
+
+
+@app.exception_handler(MemoryBudgetExceeded)
+async def memory_budget_exception_handler(request, exc: MemoryBudgetExceeded):
+    """Exportación rechazada por el presupuesto de memoria de render (413, o 503 con Retry-After)"""
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={
+            "error": True,
+            "message": str(exc),
+            "status_code": exc.status_code
+        },
+        headers={"Retry-After": str(exc.retry_after)} if exc.retry_after else None
     )
 
 
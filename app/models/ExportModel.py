@@ -1,6 +1,7 @@
 from pydantic import BaseModel, Field
 from typing import Dict, Any, Optional, List
 from enum import Enum
+from datetime import datetime
 
 
 class FileFormat(str, Enum):
@@ -8,6 +9,9 @@ class FileFormat(str, Enum):
     PDF = "pdf"
     DOCX = "docx"
     XLSX = "xlsx"
+    CSV = "csv"
+    NDJSON = "ndjson"
+    PARQUET = "parquet"
 
 
 class ExportRequest(BaseModel):
@@ -41,4 +45,45 @@ class ExportResponse(BaseModel):
     success: bool = Field(..., description="Indica si la exportación fue exitosa")
     message: str = Field(..., description="Mensaje de estado")
     filename: Optional[str] = Field(None, description="Nombre del archivo generado")
-    content_type: Optional[str] = Field(None, description="Tipo de contenido del archivo")
\ No newline at end of file
+    content_type: Optional[str] = Field(None, description="Tipo de contenido del archivo")
+
+class ExportType(str, Enum):
+    """Exportaciones disponibles como trabajo en segundo plano (mismas que las rutas /lora)"""
+    PDF_ALL_REPORTS = "pdf_all_reports"
+    PDF_ALL_REPORTS_BY_USER = "pdf_all_reports_by_user"
+    XLSX_ALL_REPORTS = "xlsx_all_reports"
+    XLSX_ALL_REPORTS_BY_USER = "xlsx_all_reports_by_user"
+    XLSX_ALL_REPORTS_FILTER = "xlsx_all_reports_filter"
+    DOCX = "docx"
+    XLSX = "xlsx"
+    PDF_SIMPLE = "pdf_simple"
+    PDF_STYLED = "pdf_styled"
+
+
+class ExportJobRequest(BaseModel):
+    """Modelo para crear un trabajo de exportación"""
+    export: ExportType = Field(..., description="Exportación a generar")
+    userId: Optional[int] = Field(None, description="Usuario (exportaciones *_by_user)")
+    id: Optional[int] = Field(None, description="Reporte (exportaciones de un solo reporte)")
+    filters: Optional[Dict[str, Any]] = Field(None, description="Filtros de getReportFilter; una lista se envía como clave repetida")
+
+
+class ExportJobResponse(ExportResponse):
+    """Estado de un trabajo de exportación"""
+    job_id: str = Field(..., description="Identificador del trabajo")
+    status: str = Field(..., description="queued, fetching, rendering, saving, completed o failed")
+    progress: float = Field(..., description="Avance entre 0 y 1")
+    created_at: datetime = Field(..., description="Fecha de creación")
+    finished_at: Optional[datetime] = Field(None, description="Fecha de finalización")
+    size: Optional[int] = Field(None, description="Tamaño del archivo en bytes")
+    download_url: Optional[str] = Field(None, description="Ruta de descarga cuando el trabajo terminó")
+
+
+class BundleRequest(BaseModel):
+    """Modelo para exportar varios reportes en un ZIP"""
+    ids: List[int] = Field(..., min_items=1, description="Reportes a exportar")
+    formats: List[ExportType] = Field(
+        default=[ExportType.PDF_STYLED],
+        min_items=1,
+        description="Exportaciones de un solo reporte: pdf_styled, pdf_simple, docx o xlsx",
+    )
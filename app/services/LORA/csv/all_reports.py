@@ -0,0 +1,30 @@
+import io
+import csv
+from typing import Dict
+from ..listing import TextListExportService
+
+class CSVListExportService(TextListExportService):
+    """Servicio para exportar una lista de reportes en CSV (UTF-8, mismas columnas que el listado XLSX)"""
+
+    def __init__(self):
+        # Un único buffer/escritor reutilizado para codificar cada fila
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer, lineterminator="\r\n")
+
+    def encode_header(self) -> bytes:
+        return self._encode([label for _, label in self.HEADERS])
+
+    def encode_row(self, report: Dict) -> bytes:
+        return self._encode(self.PROJECTION.row(report))
+
+    def _encode(self, values) -> bytes:
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        self._writer.writerow(values)
+        return self._buffer.getvalue().encode("utf-8")
+
+    def get_content_type(self) -> str:
+        return "text/csv"
+
+    def get_file_extension(self) -> str:
+        return ".csv"
@@ -5,6 +5,7 @@ import io
 from typing import Any, Dict, List
 from datetime import datetime
 from ...base import BaseExportService
+from ..report_view import ReportView, report_view
 
 
 class DOCXExportService(BaseExportService):
@@ -37,6 +38,7 @@ class DOCXExportService(BaseExportService):
         ("reportStatus", "Estado del reporte"),
         ("loraReportCode", "Codigo de reporte LORA"),
     ]
+
     def __init__(self):
         self.document = None
 
@@ -44,14 +46,15 @@ class DOCXExportService(BaseExportService):
         if not self.validate_data(data):
             raise ValueError("Datos no válidos")
 
+        view = report_view(data)
         self.document = Document()
         self._apply_base_styles()
 
         # Secciones principales del documento
-        self._render_header(data)
-        self._render_fields_table(data)
-        self._render_actions(data.get("actions", []))
-        self._render_footer(data)
+        self._render_header(view)
+        self._render_fields_table(view)
+        self._render_actions(view.actions)
+        self._render_footer(view)
 
         # Guardar documento en buffer
         buffer = io.BytesIO()
@@ -88,7 +91,7 @@ class DOCXExportService(BaseExportService):
 
         self._add_separator()
 
-    def _render_fields_table(self, data: Dict):
+    def _render_fields_table(self, view: ReportView):
         """Tabla con todos los campos alineados a XLSX all_reports"""
         self.document.add_heading("Detalles del reporte", level=1)
 
@@ -98,14 +101,10 @@ class DOCXExportService(BaseExportService):
         hdr_cells[0].text = "Campo"
         hdr_cells[1].text = "Valor"
 
-        for key, label in self.FIELDS:
-            if key == "actions":
-                value = self._format_actions(data.get("actions", []))
-            else:
-                value = self._format_value(self._get_nested_value(data, key, fallback=data))
+        for label, value in view.items(self.FIELDS):
             row = table.add_row().cells
             row[0].text = str(label)
-            row[1].text = str(value if value not in (None, "") else "N/A")
+            row[1].text = str(value)
 
         self._add_separator()
 
@@ -145,42 +144,6 @@ class DOCXExportService(BaseExportService):
     # UTILITARIOS / ESTILO
     # ---------------------------
 
-    def _get_nested_value(self, obj: Dict, key: str, fallback: Dict = None) -> Any:
-        """Navega claves anidadas usando punto. Permite fallback para casos especiales."""
-        parts = key.split('.')
-        value = obj
-        for part in parts:
-            if isinstance(value, dict):
-                value = value.get(part, None)
-            else:
-                value = None
-            if value is None:
-                break
-        if value is None and fallback and key == "reportEvidence":
-            evidences = fallback.get("evidence", [])
-            return evidences if evidences else None
-        if value is None and fallback and key == "actions":
-            return fallback.get("actions", [])
-        return value
-
-    def _format_value(self, value: Any) -> Any:
-        """Normaliza listas/diccionarios a texto legible."""
-        if value is None:
-            return "N/A"
-        if isinstance(value, list):
-            formatted_items = []
-            for item in value:
-                if isinstance(item, dict):
-                    parts = [f"{k}: {v}" for k, v in item.items() if v not in (None, "")]
-                    formatted_items.append(", ".join(parts) if parts else str(item))
-                else:
-                    formatted_items.append(str(item))
-            return "\n".join(formatted_items) if formatted_items else "N/A"
-        if isinstance(value, dict):
-            parts = [f"{k}: {v}" for k, v in value.items() if v not in (None, "")]
-            return ", ".join(parts) if parts else "N/A"
-        return value
-
     def _apply_base_styles(self):
         """Estilos base para texto institucional"""
         style = self.document.styles["Normal"]
@@ -0,0 +1,82 @@
+import io
+from abc import abstractmethod
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterable, Iterator, Union
+
+from ..base import BaseExportService
+from .xlsx.all_reports import XLSXListExportService
+
+
+class TextListExportService(BaseExportService):
+    """Base de los listados de texto (CSV, NDJSON) que se escriben fila por fila.
+
+    Usa las mismas columnas que el listado XLSX. Cada reporte se codifica en
+    cuanto llega y las filas se agrupan en fragmentos de ``CHUNK_SIZE`` bytes para
+    enviarlas sin construir el archivo completo.
+    """
+
+    HEADERS = XLSXListExportService.HEADERS
+    PROJECTION = XLSXListExportService.PROJECTION
+
+    # Bytes acumulados antes de entregar un fragmento
+    CHUNK_SIZE = 64 * 1024
+    # El archivo completo queda en memoria solo cuando se genera con generate_file
+    MEMORY_MODEL = (2 * 1024 * 1024, 512, 2)
+
+    def encode_header(self) -> bytes:
+        return b""
+
+    @abstractmethod
+    def encode_row(self, report: Dict) -> bytes:
+        pass
+
+    def generate_file(self, data: Any, options: Dict = None) -> io.BytesIO:
+        if not self.validate_data(data):
+            raise ValueError("Datos no válidos")
+
+        if isinstance(data, (dict, str, bytes)) or not isinstance(data, Iterable):
+            raise ValueError("Para listado se espera una lista de reportes")
+
+        buffer = io.BytesIO()
+        for chunk in self.iter_chunks(data):
+            buffer.write(chunk)
+        buffer.seek(0)
+        return buffer
+
+    def iter_rows(self, reports: Iterable[Dict]) -> Iterator[bytes]:
+        header = self.encode_header()
+        if header:
+            yield header
+        for report in reports:
+            yield self.encode_row(report)
+
+    def iter_chunks(self, reports: Iterable[Dict]) -> Iterator[bytes]:
+        pending, size = [], 0
+        for row in self.iter_rows(reports):
+            pending.append(row)
+            size += len(row)
+            if size >= self.CHUNK_SIZE:
+                yield b"".join(pending)
+                pending, size = [], 0
+        if pending:
+            yield b"".join(pending)
+
+    async def aiter_chunks(self, reports: Union[AsyncIterable[Dict], Iterable[Dict]]) -> AsyncIterator[bytes]:
+        """Igual que ``iter_chunks`` pero consumiendo un iterador asíncrono (páginas de VALERA)"""
+        if not hasattr(reports, "__aiter__"):
+            for chunk in self.iter_chunks(reports):
+                yield chunk
+            return
+        pending, size = [], 0
+        header = self.encode_header()
+        if header:
+            pending.append(header)
+            size += len(header)
+        async for report in reports:
+            row = self.encode_row(report)
+            pending.append(row)
+            size += len(row)
+            if size >= self.CHUNK_SIZE:
+                yield b"".join(pending)
+                pending, size = [], 0
+        if pending:
+            yield b"".join(pending)
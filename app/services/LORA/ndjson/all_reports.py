@@ -0,0 +1,21 @@
+import json
+from typing import Dict
+from ..listing import TextListExportService
+
+class NDJSONListExportService(TextListExportService):
+    """Servicio para exportar una lista de reportes en NDJSON (un objeto JSON por línea).
+
+    Cada línea tiene las mismas claves que las columnas del listado XLSX
+    (``user.documentId``, ``reportStatus``...) con los valores sin formatear;
+    un campo ausente se escribe como ``null``.
+    """
+
+    def encode_row(self, report: Dict) -> bytes:
+        record = dict(zip(self.PROJECTION.keys, self.PROJECTION.raw(report)))
+        return (json.dumps(record, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+
+    def get_content_type(self) -> str:
+        return "application/x-ndjson"
+
+    def get_file_extension(self) -> str:
+        return ".ndjson"
@@ -0,0 +1,196 @@
+import io
+import os
+import json
+import asyncio
+from datetime import datetime, timezone
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Union
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow es opcional: sin él el formato Parquet no está disponible
+    pa = pq = None
+
+from ...base import BaseExportService
+from ..xlsx.all_reports import XLSXListExportService
+
+
+class _ChunkSink:
+    """Destino de escritura de pyarrow que acumula bytes hasta entregarlos"""
+
+    def __init__(self):
+        self._chunks = []
+        self.closed = False
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class ParquetListExportService(BaseExportService):
+    """Servicio para exportar una lista de reportes en Parquet (mismas columnas que el listado XLSX).
+
+    Las columnas categóricas se guardan con codificación de diccionario, las fechas
+    como timestamps UTC y ``id`` como entero; listas y objetos se guardan como JSON.
+    Cada lote de ``PARQUET_ROW_GROUP_SIZE`` reportes (default 10000) se escribe
+    como un row group en cuanto se completa, por lo que el archivo puede enviarse
+    mientras llegan las páginas.
+    """
+
+    HEADERS = XLSXListExportService.HEADERS
+    PROJECTION = XLSXListExportService.PROJECTION
+
+    # Columnas con pocos valores distintos: se leen como ``category`` en pandas
+    CATEGORICAL = (
+        "reportStatus", "reportType", "hazardClassification", "hazardType",
+        "rig", "project", "field", "unity", "base",
+    )
+    TIMESTAMPS = ("createdAt", "updatedAt")
+    INTEGERS = ("id",)
+    # pyarrow y un row group de columnas en memoria
+    MEMORY_MODEL = (16 * 1024 * 1024, 1024, 6)
+
+    def __init__(self, row_group_size: Optional[int] = None):
+        self.row_group_size = row_group_size or int(os.getenv("PARQUET_ROW_GROUP_SIZE", "10000"))
+
+    @classmethod
+    def available(cls) -> bool:
+        return pa is not None
+
+    def schema(self) -> "pa.Schema":
+        fields = []
+        for key, _ in self.HEADERS:
+            if key in self.CATEGORICAL:
+                type_ = pa.dictionary(pa.int32(), pa.string())
+            elif key in self.TIMESTAMPS:
+                type_ = pa.timestamp("ms", tz="UTC")
+            elif key in self.INTEGERS:
+                type_ = pa.int64()
+            else:
+                type_ = pa.string()
+            fields.append(pa.field(key, type_))
+        return pa.schema(fields)
+
+    def generate_file(self, data: Any, options: Dict = None) -> io.BytesIO:
+        if not self.validate_data(data):
+            raise ValueError("Datos no válidos")
+
+        if isinstance(data, (dict, str, bytes)) or not isinstance(data, Iterable):
+            raise ValueError("Para listado se espera una lista de reportes")
+
+        buffer = io.BytesIO()
+        for chunk in self.iter_chunks(data):
+            buffer.write(chunk)
+        buffer.seek(0)
+        return buffer
+
+    def iter_chunks(self, reports: Iterable[Dict]) -> Iterator[bytes]:
+        writer, sink = self._open()
+        batch = []
+        for report in reports:
+            batch.append(report)
+            if len(batch) >= self.row_group_size:
+                yield self._write_batch(writer, sink, batch)
+                batch = []
+        yield self._close(writer, sink, batch)
+
+    async def aiter_chunks(self, reports: Union[AsyncIterable[Dict], Iterable[Dict]]) -> AsyncIterator[bytes]:
+        """Escribe un row group por lote mientras se consume el iterador asíncrono de VALERA"""
+        if not hasattr(reports, "__aiter__"):
+            for chunk in self.iter_chunks(reports):
+                yield chunk
+            return
+        # La codificación de cada lote es CPU-bound: se hace en un hilo para no bloquear el bucle
+        loop = asyncio.get_running_loop()
+        writer, sink = self._open()
+        batch = []
+        async for report in reports:
+            batch.append(report)
+            if len(batch) >= self.row_group_size:
+                yield await loop.run_in_executor(None, self._write_batch, writer, sink, batch)
+                batch = []
+        yield await loop.run_in_executor(None, self._close, writer, sink, batch)
+
+    def _open(self):
+        if pa is None:
+            raise RuntimeError("Se requiere pyarrow para exportar en Parquet")
+        self._schema = self.schema()
+        sink = _ChunkSink()
+        writer = pq.ParquetWriter(
+            pa.PythonFile(sink, mode="w"),
+            self._schema,
+            compression="snappy",
+            # El diccionario solo aporta en las columnas categóricas; el texto libre se guarda plano
+            use_dictionary=list(self.CATEGORICAL),
+        )
+        return writer, sink
+
+    def _write_batch(self, writer, sink: _ChunkSink, batch: List[Dict]) -> bytes:
+        writer.write_table(self._table(batch), row_group_size=len(batch))
+        return sink.drain()
+
+    def _close(self, writer, sink: _ChunkSink, batch: List[Dict]) -> bytes:
+        if batch:
+            writer.write_table(self._table(batch), row_group_size=len(batch))
+        writer.close()
+        return sink.drain()
+
+    def _table(self, batch: List[Dict]) -> "pa.Table":
+        columns = []
+        for field, values in zip(self._schema, self.PROJECTION.columns(batch, raw=True)):
+            if field.name in self.TIMESTAMPS:
+                values = [self._parse_timestamp(value) for value in values]
+            elif field.name in self.INTEGERS:
+                values = [self._parse_int(value) for value in values]
+            else:
+                values = [self._format_value(value) for value in values]
+            if pa.types.is_dictionary(field.type):
+                columns.append(pa.array(values, type=pa.string()).dictionary_encode())
+            else:
+                columns.append(pa.array(values, type=field.type))
+        return pa.Table.from_arrays(columns, schema=self._schema)
+
+    def _format_value(self, value: Any) -> Optional[str]:
+        """
+        Texto de la celda: listas y objetos como JSON para poder analizarlos después.
+        """
+        if value is None or value == "":
+            return None
+        if isinstance(value, (list, dict)):
+            return json.dumps(value, ensure_ascii=False, default=str)
+        return str(value)
+
+    def _parse_timestamp(self, value: Any) -> Optional[datetime]:
+        if isinstance(value, datetime):
+            return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+        if not value:
+            return None
+        try:
+            # VALERA envía ISO 8601 con sufijo Z (no soportado por fromisoformat en Python 3.9)
+            parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        except ValueError:
+            return None
+        return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+    def _parse_int(self, value: Any) -> Optional[int]:
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+
+    def get_content_type(self) -> str:
+        return "application/vnd.apache.parquet"
+
+    def get_file_extension(self) -> str:
+        return ".parquet"
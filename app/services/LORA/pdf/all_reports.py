@@ -4,12 +4,21 @@ from typing import Any, Dict, List
 from datetime import datetime
 from pathlib import Path
 from ...base import BaseExportService
-from ...valera_client import get_reports
+from .merge import merge_pdf_parts, pdf_shard_size
+from ..report_view import ReportView, iter_report_views
+from ...valera_client import get_reports_async
 
 
 class ExportAllReports(BaseExportService):
     """Genera un PDF con TODOS los reportes usando el mismo estilo que el PDF simple individual."""
 
+    # Renderizado por fragmentos en paralelo: cada fragmento genera un PDF con el mismo
+    # diseño (una página por reporte) y el motor de render los une en orden
+    SHARD_SIZE = pdf_shard_size()
+    merge_parts = staticmethod(merge_pdf_parts)
+    # fpdf mantiene todas las páginas en memoria hasta el final: ~18 bytes por carácter
+    MEMORY_MODEL = (4 * 1024 * 1024, 8 * 1024, 20)
+
     FIELDS = [
         ("id", "ID de reporte"),
         ("userId", "ID de usuario"),
@@ -57,12 +66,14 @@ class ExportAllReports(BaseExportService):
         self.pdf.set_font("DejaVu", "", 11)
 
     async def generate_file(self, data: Any = None, options: Dict = None) -> io.BytesIO:
-        reports = get_reports()
+        # Permite recibir los reportes ya obtenidos (p. ej. desde la ruta) o consultarlos a VALERA
+        reports = data if data is not None else await get_reports_async()
         if not isinstance(reports, list) or not reports:
             raise ValueError("No hay reportes disponibles para exportar")
 
-        for report in reports:
-            self._add_page_for_report(report)
+        # Vistas normalizadas una vez por reporte (las que faltan se proyectan por lotes)
+        for view in iter_report_views(reports):
+            self._add_page_for_report(view)
 
         buffer = io.BytesIO()
         pdf_output = self.pdf.output(dest='S')
@@ -73,15 +84,15 @@ class ExportAllReports(BaseExportService):
         buffer.seek(0)
         return buffer
 
-    def _add_page_for_report(self, data: Dict):
+    def _add_page_for_report(self, view: ReportView):
         self.pdf.add_page()
         self.pdf.set_font("DejaVu", "", 11)
         self.pdf.set_text_color(0, 0, 0)
 
-        self._render_header(data)
-        self._render_section("Detalles del reporte", self._format_fields(data))
-        self._render_section("Acciones", self._format_actions(data.get("actions", [])))
-        self._render_footer(data)
+        self._render_header(view)
+        self._render_section("Detalles del reporte", self._format_fields(view))
+        self._render_section("Acciones", view.actions_summary)
+        self._render_footer(view)
 
     def _render_header(self, data: Dict):
         self.pdf.set_font("DejaVu", "B", 14)
@@ -101,16 +112,8 @@ class ExportAllReports(BaseExportService):
         self.pdf.multi_cell(0, 6, str(content).strip() or "N/A")
         self._draw_separator()
 
-    def _format_fields(self, data: Dict) -> str:
-        lines = []
-        for key, label in self.FIELDS:
-            if key == "actions":
-                value = self._format_actions(data.get("actions", []))
-            else:
-                value = self._format_value(self._get_nested_value(data, key))
-            cleaned = value if value not in (None, "") else "N/A"
-            lines.append(f"{label}: {cleaned}")
-        return "\n\n".join(lines)
+    def _format_fields(self, view: ReportView) -> str:
+        return "\n\n".join(f"{label}: {value}" for label, value in view.items(self.FIELDS))
 
     def _render_footer(self, data: Dict):
         self.pdf.set_y(-30)
@@ -125,46 +128,6 @@ class ExportAllReports(BaseExportService):
         self.pdf.cell(0, 0, "-" * 120, ln=True)
         self.pdf.ln(3)
 
-    def _format_actions(self, actions: List[Dict]) -> str:
-        if not actions:
-            return "Sin acciones registradas."
-        result = []
-        for i, act in enumerate(actions, 1):
-            desc = act.get("description", "N/A")
-            resp = act.get("responsible", "N/A")
-            due = act.get("dueDate", "N/A")
-            status = act.get("status", "N/A").upper()
-            result.append(f"{i}. {desc}\n   Responsable: {resp}\n   Fecha limite: {due}\n   Estado: {status}\n")
-        return "\n".join(result)
-
-    def _format_value(self, value: Any) -> Any:
-        if value is None:
-            return "N/A"
-        if isinstance(value, list):
-            formatted_items = []
-            for item in value:
-                if isinstance(item, dict):
-                    parts = [f"{k}: {v}" for k, v in item.items() if v not in (None, "")]
-                    formatted_items.append(", ".join(parts) if parts else str(item))
-                else:
-                    formatted_items.append(str(item))
-            return "\n".join(formatted_items)
-        if isinstance(value, dict):
-            return ", ".join([f"{k}: {v}" for k, v in value.items() if v not in (None, "")])
-        return value
-
-    def _get_nested_value(self, obj: Dict, key: str) -> Any:
-        parts = key.split('.')
-        value = obj
-        for part in parts:
-            if isinstance(value, dict):
-                value = value.get(part, None)
-            else:
-                value = None
-            if value is None:
-                return None
-        return value
-
     def get_content_type(self) -> str:
         return "application/pdf"
 
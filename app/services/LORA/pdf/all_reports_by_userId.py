@@ -4,12 +4,21 @@ from typing import Any, Dict, List
 from datetime import datetime
 from pathlib import Path
 from ...base import BaseExportService
-from ...valera_client import get_report_by_userId
+from .merge import merge_pdf_parts, pdf_shard_size
+from ..report_view import ReportView, iter_report_views, report_view
+from ...valera_client import iter_reports_by_userId_async
 
 
 class ExportAllReportsByUserId(BaseExportService):
     """Genera un PDF con los reportes filtrados por userId."""
 
+    # Renderizado por fragmentos en paralelo: cada fragmento genera un PDF con el mismo
+    # diseño (una página por reporte) y el motor de render los une en orden
+    SHARD_SIZE = pdf_shard_size()
+    merge_parts = staticmethod(merge_pdf_parts)
+    # fpdf mantiene todas las páginas en memoria hasta el final: ~18 bytes por carácter
+    MEMORY_MODEL = (4 * 1024 * 1024, 8 * 1024, 20)
+
     FIELDS = [
         ("id", "ID de reporte"),
         ("userId", "ID de usuario"),
@@ -56,15 +65,20 @@ class ExportAllReportsByUserId(BaseExportService):
         self.pdf.set_font("DejaVu", "", 11)
 
     async def generate_file(self, data: Any = None, options: Dict = None) -> io.BytesIO:
-        resp = get_report_by_userId(self.user_id)
-        # Estructura esperada: { success, data: { data: [...], pagination: {...} }, message }
-        reports = (((resp or {}).get("data") or {}).get("data") or [])
-        if not isinstance(reports, list) or not reports:
+        count = 0
+        if data is not None:
+            # Vistas normalizadas una vez por reporte (las que faltan se proyectan por lotes)
+            for view in iter_report_views(data):
+                self._add_page_for_report(view)
+                count += 1
+        else:
+            # Las páginas de getReportFilter se renderizan a medida que llegan
+            async for report in iter_reports_by_userId_async(self.user_id):
+                self._add_page_for_report(report_view(report))
+                count += 1
+        if not count:
             raise ValueError("No hay reportes disponibles para exportar para este usuario")
 
-        for report in reports:
-            self._add_page_for_report(report)
-
         buffer = io.BytesIO()
         pdf_output = self.pdf.output(dest='S')
         if isinstance(pdf_output, (bytes, bytearray)):
@@ -74,15 +88,15 @@ class ExportAllReportsByUserId(BaseExportService):
         buffer.seek(0)
         return buffer
 
-    def _add_page_for_report(self, data: Dict):
+    def _add_page_for_report(self, view: ReportView):
         self.pdf.add_page()
         self.pdf.set_font("DejaVu", "", 11)
         self.pdf.set_text_color(0, 0, 0)
 
-        self._render_header(data)
-        self._render_section("Detalles del reporte", self._format_fields(data))
-        self._render_section("Acciones", self._format_actions(data.get("actions", [])))
-        self._render_footer(data)
+        self._render_header(view)
+        self._render_section("Detalles del reporte", self._format_fields(view))
+        self._render_section("Acciones", view.actions_summary)
+        self._render_footer(view)
 
     def _render_header(self, data: Dict):
         self.pdf.set_font("DejaVu", "B", 14)
@@ -115,62 +129,8 @@ class ExportAllReportsByUserId(BaseExportService):
         self.pdf.cell(0, 0, "-" * 120, ln=True)
         self.pdf.ln(3)
 
-    def _format_fields(self, data: Dict) -> str:
-        lines = []
-        for key, label in self.FIELDS:
-            if key == "actions":
-                value = self._format_actions(data.get("actions", []))
-            else:
-                value = self._format_value(self._get_nested_value(data, key))
-            cleaned = value if value not in (None, "") else "N/A"
-            lines.append(f"{label}: {cleaned}")
-        return "\n\n".join(lines)
-
-    def _format_actions(self, actions: List[Dict]) -> str:
-        if not actions:
-            return "Sin acciones registradas."
-        result = []
-        for i, act in enumerate(actions, 1):
-            desc = act.get("description", "N/A")
-            resp = act.get("responsible", "N/A")
-            due = act.get("dueDate", "N/A")
-            status = act.get("status", "N/A").upper()
-            result.append(f"{i}. {desc}\n   Responsable: {resp}\n   Fecha limite: {due}\n   Estado: {status}\n")
-        return "\n".join(result)
-
-    def _format_value(self, value: Any) -> Any:
-        if value is None:
-            return "N/A"
-        if isinstance(value, list):
-            formatted_items = []
-            for item in value:
-                if isinstance(item, dict):
-                    parts = [f"{k}: {v}" for k, v in item.items() if v not in (None, "")]
-                    formatted_items.append(", ".join(parts) if parts else str(item))
-                else:
-                    formatted_items.append(str(item))
-            return "\n".join(formatted_items) if formatted_items else "N/A"
-        if isinstance(value, dict):
-            parts = [f"{k}: {v}" for k, v in value.items() if v not in (None, "")]
-            return ", ".join(parts) if parts else "N/A"
-        return value
-
-    def _get_nested_value(self, obj: Dict, key: str) -> Any:
-        parts = key.split('.')
-        value = obj
-        for part in parts:
-            if isinstance(value, dict):
-                value = value.get(part, None)
-            else:
-                value = None
-            if value is None:
-                break
-        if value is None and key == "reportEvidence":
-            evidences = obj.get("evidence", [])
-            return evidences if evidences else None
-        if value is None and key == "actions":
-            return obj.get("actions", [])
-        return value
+    def _format_fields(self, view: ReportView) -> str:
+        return "\n\n".join(f"{label}: {value}" for label, value in view.items(self.FIELDS))
 
     def get_content_type(self) -> str:
         return "application/pdf"
@@ -0,0 +1,32 @@
+import io
+import os
+from typing import List
+
+try:
+    from pypdf import PdfReader, PdfWriter
+except ImportError:  # pypdf es opcional: sin él los PDF multi-reporte se renderizan en un solo proceso
+    PdfReader = PdfWriter = None
+
+
+def pdf_shard_size() -> int:
+    """Mínimo de reportes por fragmento al renderizar PDFs multi-reporte en paralelo (0 = deshabilitado)"""
+    if PdfWriter is None:
+        return 0
+    try:
+        return int(os.getenv("PDF_SHARD_SIZE", "50"))
+    except ValueError:
+        return 0
+
+
+def merge_pdf_parts(parts: List[bytes]) -> bytes:
+    """Une PDFs parciales en un único documento conservando el orden de las páginas"""
+    if PdfWriter is None:
+        raise RuntimeError("Se requiere pypdf para unir PDFs parciales")
+    if len(parts) == 1:
+        return parts[0]
+    writer = PdfWriter()
+    for part in parts:
+        writer.append(PdfReader(io.BytesIO(part)))
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
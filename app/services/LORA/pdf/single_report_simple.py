@@ -4,6 +4,7 @@ from typing import Any, Dict, List
 from datetime import datetime
 from pathlib import Path
 from ...base import BaseExportService
+from ..report_view import ReportView, report_view
 
 
 class ExportSinglePDFReportSimple(BaseExportService):
@@ -61,10 +62,11 @@ class ExportSinglePDFReportSimple(BaseExportService):
         self.pdf.set_font("DejaVu", "", 11)
         self.pdf.set_text_color(0, 0, 0)
 
-        self._render_header(data)
-        self._render_section("Detalles del reporte", self._format_fields(data))
-        self._render_section("Acciones", self._format_actions(data.get("actions", [])))
-        self._render_footer(data)
+        view = report_view(data)
+        self._render_header(view)
+        self._render_section("Detalles del reporte", self._format_fields(view))
+        self._render_section("Acciones", view.actions_summary)
+        self._render_footer(view)
 
         buffer = io.BytesIO()
         pdf_output = self.pdf.output(dest='S')
@@ -108,62 +110,8 @@ class ExportSinglePDFReportSimple(BaseExportService):
         self.pdf.cell(0, 0, "-" * 120, ln=True)
         self.pdf.ln(3)
 
-    def _format_fields(self, data: Dict) -> str:
-        lines = []
-        for key, label in self.FIELDS:
-            if key == "actions":
-                value = self._format_actions(data.get("actions", []))
-            else:
-                value = self._format_value(self._get_nested_value(data, key))
-            cleaned = value if value not in (None, "") else "N/A"
-            lines.append(f"{label}: {cleaned}")
-        return "\n\n".join(lines)
-
-    def _format_actions(self, actions: List[Dict]) -> str:
-        if not actions:
-            return "Sin acciones registradas."
-        result = []
-        for i, act in enumerate(actions, 1):
-            desc = act.get("description", "N/A")
-            resp = act.get("responsible", "N/A")
-            due = act.get("dueDate", "N/A")
-            status = act.get("status", "N/A").upper()
-            result.append(f"{i}. {desc}\n   Responsable: {resp}\n   Fecha limite: {due}\n   Estado: {status}\n")
-        return "\n".join(result)
-
-    def _format_value(self, value: Any) -> Any:
-        if value is None:
-            return "N/A"
-        if isinstance(value, list):
-            formatted_items = []
-            for item in value:
-                if isinstance(item, dict):
-                    parts = [f"{k}: {v}" for k, v in item.items() if v not in (None, "")]
-                    formatted_items.append(", ".join(parts) if parts else str(item))
-                else:
-                    formatted_items.append(str(item))
-            return "\n".join(formatted_items) if formatted_items else "N/A"
-        if isinstance(value, dict):
-            parts = [f"{k}: {v}" for k, v in value.items() if v not in (None, "")]
-            return ", ".join(parts) if parts else "N/A"
-        return value
-
-    def _get_nested_value(self, obj: Dict, key: str) -> Any:
-        parts = key.split('.')
-        value = obj
-        for part in parts:
-            if isinstance(value, dict):
-                value = value.get(part, None)
-            else:
-                value = None
-            if value is None:
-                break
-        if value is None and key == "reportEvidence":
-            evidences = obj.get("evidence", [])
-            return evidences if evidences else None
-        if value is None and key == "actions":
-            return obj.get("actions", [])
-        return value
+    def _format_fields(self, view: ReportView) -> str:
+        return "\n\n".join(f"{label}: {value}" for label, value in view.items(self.FIELDS))
 
     def get_content_type(self) -> str:
         return "application/pdf"
@@ -4,6 +4,7 @@ import os
 from typing import Any, Dict, List
 from datetime import datetime
 from ...base import BaseExportService
+from ..report_view import ReportView, report_view
 
 
 class ExportSinglePDFReportWithStyle(BaseExportService):
@@ -55,14 +56,11 @@ class ExportSinglePDFReportWithStyle(BaseExportService):
         }
 
     async def generate_file(self, data: Any, options: Dict = None) -> io.BytesIO:
-        if not isinstance(data, dict):
-            raise ValueError("Se requiere un diccionario con los datos del reporte")
-
-        report_data = data
+        report_data = report_view(data)
         # Permitir pasar el logo por options o por los datos, y usar un default
         if isinstance(options, dict):
             self.logo_path = options.get("logo_path") or options.get("logo")
-        if not self.logo_path and isinstance(report_data, dict):
+        if not self.logo_path:
             self.logo_path = report_data.get("logo_path") or report_data.get("logo")
         if not self.logo_path:
             # Ruta por defecto indicada: common/logo.png
@@ -128,11 +126,8 @@ class ExportSinglePDFReportWithStyle(BaseExportService):
         self.pdf.cell(0, 8, f"Creado: {created}", ln=True)
         self._draw_line()
 
-    def _draw_summary(self, data: Dict):
-        field_items = [
-            (label, self._format_value(self._get_nested_value(data, key)))
-            for key, label in self.FIELDS
-        ]
+    def _draw_summary(self, data: ReportView):
+        field_items = data.items(self.FIELDS)
         self._draw_block("Detalles del reporte", self._render_summary_grid, field_items)
 
     def _draw_description(self, data: Dict):
@@ -145,15 +140,15 @@ class ExportSinglePDFReportWithStyle(BaseExportService):
         if data.get("conversation"):
             self._draw_block("Conversacion", self._render_paragraph, data["conversation"])
 
-    def _draw_evidences(self, data: Dict):
-        evidences = data.get("evidence", [])
+    def _draw_evidences(self, data: ReportView):
+        evidences = data.evidence
         if evidences:
             self._draw_block("Evidencias", self._render_evidences, evidences)
         else:
             self._draw_block("Evidencias", self._render_paragraph, "Sin evidencias adjuntas")
 
-    def _draw_actions(self, data: Dict):
-        actions = data.get("actions", [])
+    def _draw_actions(self, data: ReportView):
+        actions = data.actions
         if not actions:
             return
         self._draw_block("Acciones", self._render_actions, actions)
@@ -234,7 +229,7 @@ class ExportSinglePDFReportWithStyle(BaseExportService):
             self.pdf.set_fill_color(*bg)
             self.pdf.set_x(15)
             self.pdf.set_font("Courier", "B", 10)
-            self.pdf.multi_cell(0, 8, f"Accion: {act.get('description', 'N/A')}", border=0, fill=True)
+            self.pdf.multi_cell(0, 8, f"Accion: {act.get('description', 'N/A')}", border=0, fill=True, ln=True)
             self.pdf.set_font("Courier", "", 9)
             resp = act.get("responsible", "No asignado")
             due = act.get("dueDate", "N/A")
@@ -243,40 +238,6 @@ class ExportSinglePDFReportWithStyle(BaseExportService):
             self.pdf.ln(3)
 
     # Utils
-    def _format_value(self, value: Any) -> Any:
-        if value is None:
-            return "N/A"
-        if isinstance(value, list):
-            formatted_items = []
-            for item in value:
-                if isinstance(item, dict):
-                    parts = [f"{k}: {v}" for k, v in item.items() if v not in (None, "")]
-                    formatted_items.append(", ".join(parts) if parts else str(item))
-                else:
-                    formatted_items.append(str(item))
-            return "\n".join(formatted_items) if formatted_items else "N/A"
-        if isinstance(value, dict):
-            parts = [f"{k}: {v}" for k, v in value.items() if v not in (None, "")]
-            return ", ".join(parts) if parts else "N/A"
-        return value
-
-    def _get_nested_value(self, obj: Dict, key: str) -> Any:
-        parts = key.split('.')
-        value = obj
-        for part in parts:
-            if isinstance(value, dict):
-                value = value.get(part, None)
-            else:
-                value = None
-            if value is None:
-                break
-        if value is None and key == "reportEvidence":
-            evidences = obj.get("evidence", [])
-            return evidences if evidences else None
-        if value is None and key == "actions":
-            return obj.get("actions", [])
-        return value
-
     def _draw_line(self):
         self.pdf.set_draw_color(*self.colors['border'])
         y = self.pdf.get_y()
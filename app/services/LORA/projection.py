@@ -0,0 +1,156 @@
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+""" Proyección de campos de reportes LORA compilada una sola vez por exportador """
+
+Getter = Callable[[Dict], Any]
+Formatter = Callable[[Any], Any]
+
+
+def compile_path(key: str) -> Getter:
+    """Compila una ruta con puntos (``user.userInformation.name``) en una función de acceso.
+
+    La ruta se divide una sola vez. Devuelve ``None`` si falta cualquier tramo e
+    incluye los respaldos de VALERA: ``reportEvidence`` usa ``evidence`` (lista ya
+    normalizada) y ``actions`` vacío se devuelve como lista.
+    """
+    parts = tuple(key.split("."))
+
+    if len(parts) == 1:
+        name = parts[0]
+
+        def get(obj):
+            return obj.get(name) if isinstance(obj, dict) else None
+    else:
+        def get(obj):
+            value = obj
+            for part in parts:
+                if not isinstance(value, dict):
+                    return None
+                value = value.get(part)
+                if value is None:
+                    return None
+            return value
+
+    if key == "reportEvidence":
+        def get_evidence(obj):
+            value = get(obj)
+            if value is None and isinstance(obj, dict):
+                return obj.get("evidence") or None
+            return value
+        return get_evidence
+
+    if key == "actions":
+        def get_actions(obj):
+            value = get(obj)
+            if value is None and isinstance(obj, dict):
+                return obj.get("actions", [])
+            return value
+        return get_actions
+
+    return get
+
+
+def format_value(value: Any, missing: Any = "N/A") -> Any:
+    """Normaliza listas/diccionarios a texto legible; ``missing`` reemplaza valores vacíos"""
+    if value is None:
+        return missing
+    cls = type(value)
+    if cls is str or cls is int:
+        return value
+    if cls is list:
+        formatted_items = []
+        for item in value:
+            if isinstance(item, dict):
+                parts = [f"{k}: {v}" for k, v in item.items() if v not in (None, "")]
+                formatted_items.append(", ".join(parts) if parts else str(item))
+            else:
+                formatted_items.append(str(item))
+        return "\n".join(formatted_items) if formatted_items else missing
+    if cls is dict:
+        parts = [f"{k}: {v}" for k, v in value.items() if v not in (None, "")]
+        return ", ".join(parts) if parts else missing
+    return value
+
+
+def format_actions(actions: Optional[List[Dict]]) -> str:
+    """Resumen de acciones numerado (PDF y DOCX)"""
+    if not actions:
+        return "Sin acciones registradas."
+    result = []
+    for i, act in enumerate(actions, 1):
+        desc = act.get("description", "N/A")
+        resp = act.get("responsible", "N/A")
+        due = act.get("dueDate", "N/A")
+        status = str(act.get("status", "N/A")).upper()
+        result.append(f"{i}. {desc}\n   Responsable: {resp}\n   Fecha limite: {due}\n   Estado: {status}\n")
+    return "\n".join(result)
+
+
+class Projection:
+    """Lista ``FIELDS``/``HEADERS`` compilada: un acceso y un formateador por campo.
+
+    ``row``/``items`` proyectan un reporte; ``rows``, ``columns`` e
+    ``iter_projected`` proyectan un lote completo campo por campo (``map`` sobre el
+    lote en lugar de recorrer la ruta de cada valor), que es como la comparten
+    todos los exportadores.
+    """
+
+    __slots__ = ("fields", "keys", "labels", "getters", "formatters", "_accessors")
+
+    def __init__(self, fields: Sequence[Tuple[str, str]], missing: Any = "N/A", formatters: Optional[Dict[str, Formatter]] = None):
+        formatters = formatters or {}
+        self.fields = tuple(fields)
+        self.keys = tuple(key for key, _ in self.fields)
+        self.labels = tuple(label for _, label in self.fields)
+        self.getters = tuple(compile_path(key) for key in self.keys)
+        self.formatters = tuple(formatters.get(key) or _formatter(missing) for key in self.keys)
+        self._accessors = tuple(zip(self.getters, self.formatters))
+
+    def raw(self, report: Dict) -> List[Any]:
+        """Valores sin formatear (``None`` si faltan)"""
+        return [get(report) for get in self.getters]
+
+    def row(self, report: Dict) -> List[Any]:
+        return [fmt(get(report)) for get, fmt in self._accessors]
+
+    def items(self, report: Dict) -> List[Tuple[str, Any]]:
+        """Pares (etiqueta, valor formateado) en el orden de ``fields``"""
+        return list(zip(self.labels, self.row(report)))
+
+    def columns(self, reports: Sequence[Dict], raw: bool = False) -> List[List[Any]]:
+        """Proyecta un lote en columnas: una lista de valores por campo"""
+        if raw:
+            return [list(map(get, reports)) for get in self.getters]
+        return [list(map(fmt, map(get, reports))) for get, fmt in self._accessors]
+
+    def rows(self, reports: Sequence[Dict]) -> List[Tuple[Any, ...]]:
+        """Proyecta un lote completo en filas con una pasada por campo"""
+        if not reports:
+            return []
+        return list(zip(*self.columns(reports)))
+
+    def iter_projected(self, reports: Iterable[Dict], batch_size: int = 500) -> Iterator[Tuple[Dict, Tuple[Any, ...]]]:
+        """Pares (reporte, fila) proyectados por lotes de ``batch_size``; acepta cualquier iterable"""
+        batch = []
+        for report in reports:
+            batch.append(report)
+            if len(batch) >= batch_size:
+                yield from zip(batch, self.rows(batch))
+                batch = []
+        if batch:
+            yield from zip(batch, self.rows(batch))
+
+
+def _formatter(missing: Any) -> Formatter:
+    # Los textos y enteros (la gran mayoría) se devuelven sin pasar por ``format_value``
+    def fmt(value):
+        cls = type(value)
+        if cls is str or cls is int:
+            return value
+        return format_value(value, missing)
+    return fmt
+
+
+def compile_projection(fields: Sequence[Tuple[str, str]], missing: Any = "N/A", formatters: Optional[Dict[str, Formatter]] = None) -> Projection:
+    """Compila ``fields`` (pares ruta/etiqueta) para un exportador; se invoca una vez a nivel de clase"""
+    return Projection(fields, missing, formatters)
@@ -0,0 +1,269 @@
+import os
+import threading
+from collections import OrderedDict
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from ..metrics import timed_stage
+from .projection import compile_projection, format_actions, format_value
+
+""" Vista normalizada e inmutable de un reporte LORA, compartida por todos los exportadores """
+
+# Campos que la vista deja formateados (los exportadores usan este orden o un subconjunto)
+REPORT_FIELDS = [
+    ("id", "ID de reporte"),
+    ("userId", "ID de usuario"),
+    ("user.documentId", "Documento de usuario"),
+    ("user.userInformation.name", "Nombre del usuario"),
+    ("user.userInformation.lastName", "Apellido del usuario"),
+    ("externalNameUser", "Nombre externo del usuario"),
+    ("externalOrganization", "Organizacion externa"),
+    ("reportTitle", "Titulo del reporte"),
+    ("conversation", "Conversacion"),
+    ("base", "Base"),
+    ("createdAt", "Fecha de creacion"),
+    ("updatedAt", "Fecha de actualizacion"),
+    ("unity", "Unidad"),
+    ("rig", "Equipo (rig)"),
+    ("project", "Proyecto"),
+    ("field", "Campo"),
+    ("reportType", "Tipo de reporte"),
+    ("hazardClassification", "Clasificacion del peligro"),
+    ("hazardType", "Tipo de peligro"),
+    ("detailedDescription", "Descripcion detallada"),
+    ("findingCause", "Causa del hallazgo"),
+    ("reportEvidence", "Evidencias del reporte"),
+    ("actions", "Acciones"),
+    ("reportStatus", "Estado del reporte"),
+    ("loraReportCode", "Codigo de reporte LORA"),
+]
+
+# Las acciones se formatean aparte, una vez resuelto el responsable
+_PROJECTION = compile_projection(REPORT_FIELDS, missing=None, formatters={"actions": lambda value: None})
+
+
+class ReportView:
+    """Reporte de VALERA normalizado una sola vez para todos los formatos.
+
+    Contiene los campos de ``REPORT_FIELDS`` ya formateados (``None`` si faltan),
+    las acciones con ``responsible`` resuelto, las evidencias como lista de textos
+    y el resumen de acciones. Es inmutable: ``get``/``[]`` leen el reporte original
+    salvo ``actions`` y ``evidence``, que devuelven las versiones normalizadas.
+    """
+
+    __slots__ = ("id", "updated_at", "raw", "values", "actions", "evidence", "actions_summary")
+
+    def __init__(self, report: Dict, row: Optional[Sequence[Any]] = None):
+        actions = tuple(MappingProxyType(_resolve_action(act)) for act in (report.get("actions") or []))
+        evidence = _resolve_evidence(report)
+        summary = format_actions(actions)
+        values = {
+            key: None if value == "" else value
+            for key, value in zip(_PROJECTION.keys, row if row is not None else _PROJECTION.row(report))
+        }
+        values["reportEvidence"] = "\n".join(evidence) or None
+        values["actions"] = summary
+        self._init(
+            report.get("id"), report.get("updatedAt"), MappingProxyType(dict(report)),
+            MappingProxyType(values), actions, evidence, summary,
+        )
+
+    def _init(self, id, updated_at, raw, values, actions, evidence, actions_summary):
+        setter = object.__setattr__
+        setter(self, "id", id)
+        setter(self, "updated_at", updated_at)
+        setter(self, "raw", raw)
+        setter(self, "values", values)
+        setter(self, "actions", actions)
+        setter(self, "evidence", evidence)
+        setter(self, "actions_summary", actions_summary)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ReportView es inmutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("ReportView es inmutable")
+
+    def __reduce__(self):
+        # Los MappingProxyType no se serializan: se envían copias y se reconstruye en el proceso de render
+        return (_restore, (
+            self.id, self.updated_at, dict(self.raw), dict(self.values),
+            tuple(dict(act) for act in self.actions), self.evidence, self.actions_summary,
+        ))
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key == "actions":
+            return self.actions
+        if key == "evidence":
+            return list(self.evidence)
+        return self.raw.get(key, default)
+
+    def __getitem__(self, key: str) -> Any:
+        if key in ("actions", "evidence"):
+            return self.get(key)
+        return self.raw[key]
+
+    def __contains__(self, key: str) -> bool:
+        return key in ("actions", "evidence") or key in self.raw
+
+    def value(self, key: str, missing: Any = "N/A") -> Any:
+        """Valor formateado de un campo de ``REPORT_FIELDS``"""
+        value = self.values.get(key)
+        return missing if value is None else value
+
+    def items(self, fields: Sequence[Tuple[str, str]], missing: Any = "N/A") -> List[Tuple[str, Any]]:
+        """Pares (etiqueta, valor formateado) para la lista ``FIELDS`` de un exportador"""
+        values = self.values
+        return [(label, missing if values.get(key) is None else values[key]) for key, label in fields]
+
+    def to_dict(self) -> Dict:
+        """Reporte original (claves de caché y ETag)"""
+        return dict(self.raw)
+
+
+def _restore(id, updated_at, raw, values, actions, evidence, actions_summary) -> ReportView:
+    view = ReportView.__new__(ReportView)
+    view._init(
+        id, updated_at, MappingProxyType(raw), MappingProxyType(values),
+        tuple(MappingProxyType(act) for act in actions), evidence, actions_summary,
+    )
+    return view
+
+
+def _resolve_action(act: Dict) -> Dict:
+    act = dict(act)
+    if "responsible" not in act:
+        assigned = act.get("assignedTo") or {}
+        user_info = assigned.get("userInformation") or {}
+        name = (user_info.get("name") or "").strip()
+        last = (user_info.get("lastName") or "").strip()
+        act["responsible"] = f"{name} {last}".strip() or assigned.get("documentId") or ""
+    return act
+
+
+def _resolve_evidence(report: Mapping) -> Tuple[str, ...]:
+    # VALERA envía ``evidence`` (lista) o ``reportEvidence`` (una URL o lista) según la versión
+    items = report.get("evidence")
+    if items is None:
+        items = report.get("reportEvidence")
+    if not items:
+        return ()
+    if not isinstance(items, (list, tuple)):
+        items = [items]
+    resolved = []
+    for item in items:
+        if isinstance(item, dict):
+            item = item.get("url") or format_value(item, "")
+        if item:
+            resolved.append(str(item))
+    return tuple(resolved)
+
+
+def _view_key(report: Mapping) -> Optional[Tuple[Any, Any]]:
+    report_id, updated_at = report.get("id"), report.get("updatedAt")
+    if report_id is None or not updated_at:
+        return None
+    return report_id, updated_at
+
+
+class _ViewCache:
+    """LRU de vistas por (id, updatedAt): un reporte sin cambios se normaliza una sola vez"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._views: "OrderedDict[Tuple[Any, Any], ReportView]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple[Any, Any]) -> Optional[ReportView]:
+        with self._lock:
+            view = self._views.get(key)
+            if view is None:
+                self.misses += 1
+                return None
+            self._views.move_to_end(key)
+            self.hits += 1
+            return view
+
+    def put(self, key: Tuple[Any, Any], view: ReportView):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._views[key] = view
+            self._views.move_to_end(key)
+            while len(self._views) > self.max_entries:
+                self._views.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._views.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._views), "max_entries": self.max_entries, "hits": self.hits, "misses": self.misses}
+
+
+_cache = _ViewCache(int(os.getenv("REPORT_VIEW_CACHE_SIZE", "1024")))
+
+
+def report_view(report: Any) -> ReportView:
+    """Devuelve la vista del reporte, reutilizando la ya construida si (id, updatedAt) no cambió"""
+    if isinstance(report, ReportView):
+        return report
+    if not isinstance(report, dict):
+        raise ValueError("Se requiere un diccionario con los datos del reporte")
+    key = _view_key(report)
+    if key is None:
+        with timed_stage("normalize"):
+            return ReportView(report)
+    view = _cache.get(key)
+    if view is None:
+        with timed_stage("normalize"):
+            view = ReportView(report)
+        _cache.put(key, view)
+    return view
+
+
+def iter_report_views(reports: Iterable[Any], batch_size: int = 500) -> Iterator[ReportView]:
+    """Vistas de una lista de reportes; las que faltan en caché se proyectan por lotes"""
+    batch: List[Any] = []
+    for report in reports:
+        batch.append(report)
+        if len(batch) >= batch_size:
+            yield from _views_for_batch(batch)
+            batch = []
+    if batch:
+        yield from _views_for_batch(batch)
+
+
+def _views_for_batch(batch: List[Any]) -> List[ReportView]:
+    views: List[Optional[ReportView]] = []
+    missing: List[int] = []
+    for index, report in enumerate(batch):
+        if isinstance(report, ReportView):
+            views.append(report)
+            continue
+        if not isinstance(report, dict):
+            raise ValueError("Se requiere un diccionario con los datos del reporte")
+        key = _view_key(report)
+        view = _cache.get(key) if key is not None else None
+        views.append(view)
+        if view is None:
+            missing.append(index)
+    if missing:
+        with timed_stage("normalize"):
+            for index, row in zip(missing, _PROJECTION.rows([batch[i] for i in missing])):
+                view = ReportView(batch[index], row)
+                key = _view_key(batch[index])
+                if key is not None:
+                    _cache.put(key, view)
+                views[index] = view
+    return views
+
+
+def view_cache_stats() -> Dict[str, Any]:
+    return _cache.stats()
+
+
+def clear_view_cache():
+    _cache.clear()
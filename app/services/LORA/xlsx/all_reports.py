@@ -1,15 +1,60 @@
 from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.cell.cell import Cell
+from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, NamedStyle
+from openpyxl.utils import get_column_letter
 import io
-from typing import Any, Dict, List
+from copy import copy
+from typing import Any, Dict, Iterable, List
 from datetime import datetime
 from ...base import BaseExportService
+from ..projection import compile_projection
 
 class XLSXListExportService(BaseExportService):
     """Servicio para exportar una lista de reportes en un archivo XLSX"""
 
+    # Libro en modo write_only: las filas se escriben a disco y la memoria apenas crece
+    MEMORY_MODEL = (4 * 1024 * 1024, 1024, 1)
+
+    # Encabezados conforme al modelo completo
+    HEADERS = [
+        ("id", "ID de reporte"),
+        ("user.documentId", "Documento de usuario"),
+        ("user.userInformation.name", "Nombre del usuario"),
+        ("user.userInformation.lastName", "Apellido del usuario"),
+        ("externalNameUser", "Nombre externo del usuario"),
+        ("externalOrganization", "Organizacion externa"),
+        ("reportTitle", "Titulo del reporte"),
+        ("conversation", "Conversacion"),
+        ("base", "Base"),
+        ("createdAt", "Fecha de creacion"),
+        ("updatedAt", "Fecha de actualizacion"),
+        ("unity", "Unidad"),
+        ("rig", "Equipo (rig)"),
+        ("project", "Proyecto"),
+        ("field", "Campo"),
+        ("reportType", "Tipo de reporte"),
+        ("hazardClassification", "Clasificacion del peligro"),
+        ("hazardType", "Tipo de peligro"),
+        ("detailedDescription", "Descripcion detallada"),
+        ("findingCause", "Causa del hallazgo"),
+        ("reportEvidence", "Evidencias del reporte"),
+        ("actions", "Acciones"),
+        ("reportStatus", "Estado del reporte"),
+        ("loraReportCode", "Codigo de reporte LORA"),
+    ]
+    PROJECTION = compile_projection(HEADERS, missing="")
+
+    # Reportes proyectados a filas en cada pasada
+    BATCH_SIZE = 500
+
+    # Filas iniciales usadas para calcular el ancho de columnas
+    WIDTH_SAMPLE_ROWS = 500
+
     def __init__(self):
         self.workbook = None
+        self._sheet = None
+        self._pending = None
         self.colors = {
             "header_fill": "D9D9D9",
             "row_odd_fill": "FFFFFF",
@@ -26,114 +71,83 @@ class XLSXListExportService(BaseExportService):
         if not self.validate_data(data):
             raise ValueError("Datos no válidos")
 
-        if not isinstance(data, list):
+        if isinstance(data, (dict, str, bytes)) or not isinstance(data, Iterable):
             raise ValueError("Para listado se espera una lista de reportes")
 
-        self.workbook = Workbook()
-        sheet = self.workbook.active
-        sheet.title = "Listado Reportes"
-
-        # Encabezados conforme al modelo completo
-        headers = [
-            ("id", "ID de reporte"),
-            ("user.documentId", "Documento de usuario"),
-            ("user.userInformation.name", "Nombre del usuario"),
-            ("user.userInformation.lastName", "Apellido del usuario"),
-            ("externalNameUser", "Nombre externo del usuario"),
-            ("externalOrganization", "Organizacion externa"),
-            ("reportTitle", "Titulo del reporte"),
-            ("conversation", "Conversacion"),
-            ("base", "Base"),
-            ("createdAt", "Fecha de creacion"),
-            ("updatedAt", "Fecha de actualizacion"),
-            ("unity", "Unidad"),
-            ("rig", "Equipo (rig)"),
-            ("project", "Proyecto"),
-            ("field", "Campo"),
-            ("reportType", "Tipo de reporte"),
-            ("hazardClassification", "Clasificacion del peligro"),
-            ("hazardType", "Tipo de peligro"),
-            ("detailedDescription", "Descripcion detallada"),
-            ("findingCause", "Causa del hallazgo"),
-            ("reportEvidence", "Evidencias del reporte"),
-            ("actions", "Acciones"),
-            ("reportStatus", "Estado del reporte"),
-            ("loraReportCode", "Codigo de reporte LORA"),
-        ]
-
-        # Escribir encabezado
-        for col_index, (_, header_label) in enumerate(headers, start=1):
-            cell = sheet.cell(row=1, column=col_index, value=header_label)
-            cell.font = Font(bold=True)
-            cell.fill = PatternFill(start_color=self.colors["header_fill"], fill_type="solid")
-            cell.alignment = Alignment(horizontal="center", vertical="center")
-            cell.border = self.border
-        sheet.row_dimensions[1].height = 20
-
-        # Escribir filas
-        for row_index, report in enumerate(data, start=2):
-            fill_color = self.colors["row_even_fill"] if row_index % 2 == 0 else self.colors["row_odd_fill"]
-            for col_index, (header_key, _) in enumerate(headers, start=1):
-                # permitir navegación en campos anidados (e.g., user.externalName)
-                value = self._format_value(self._get_nested_value(report, header_key))
-                cell = sheet.cell(row=row_index, column=col_index, value=value)
-                cell.fill = PatternFill(start_color=fill_color, fill_type="solid")
-                cell.alignment = Alignment(vertical="top", wrap_text=True)
-                cell.border = self.border
-            sheet.row_dimensions[row_index].height = 30
-
-        # Ajustar ancho de columnas
-        for column_cells in sheet.columns:
-            max_length = 0
-            column = column_cells[0].column_letter
-            for cell in column_cells:
-                try:
-                    length = len(str(cell.value or ""))
-                    if length > max_length:
-                        max_length = length
-                except:
-                    pass
-            sheet.column_dimensions[column].width = min(max_length + 5, 50)
-
-        # Crear buffer
+        self._start_sheet()
+        for _, values in self.PROJECTION.iter_projected(data, self.BATCH_SIZE):
+            self._write_row(values)
+        return self._finish()
+
+    def _start_sheet(self):
+        """Prepara un libro en modo ``write_only``: las filas se escriben a disco según llegan.
+
+        Los estilos se registran una sola vez como ``NamedStyle`` y cada celda copia
+        el arreglo de estilo ya resuelto en lugar de crear fill/alignment/border propios.
+        """
+        self.workbook = Workbook(write_only=True)
+        self._sheet = self.workbook.create_sheet("Listado Reportes")
+        self._sheet.sheet_format.defaultRowHeight = 30
+        self._sheet.sheet_format.customHeight = True
+        self._sheet.row_dimensions[1].height = 20
+
+        self._style_arrays = {}
+        styles = {
+            "listado_header": (Font(bold=True), self.colors["header_fill"], Alignment(horizontal="center", vertical="center")),
+            "listado_even": (Font(), self.colors["row_even_fill"], Alignment(vertical="top", wrap_text=True)),
+            "listado_odd": (Font(), self.colors["row_odd_fill"], Alignment(vertical="top", wrap_text=True)),
+        }
+        for name, (font, color, alignment) in styles.items():
+            style = NamedStyle(name=name, font=font, alignment=alignment, border=self.border)
+            style.fill = PatternFill(start_color=color, fill_type="solid")
+            self.workbook.add_named_style(style)
+            template = WriteOnlyCell(self._sheet)
+            template.style = name
+            self._style_arrays[name] = template._style
+
+        self._row_index = 1
+        self._widths = [len(label) for _, label in self.HEADERS]
+        self._pending = [[label for _, label in self.HEADERS]]
+
+    def _write_row(self, values: List[Any]):
+        self._row_index += 1
+        if self._pending is None:
+            self._append(values, self._row_index)
+            return
+        # Las primeras filas se retienen para calcular el ancho de columnas en la misma pasada:
+        # en modo write_only las columnas deben definirse antes de escribir la primera fila
+        for index, value in enumerate(values):
+            length = len(str(value or ""))
+            if length > self._widths[index]:
+                self._widths[index] = length
+        self._pending.append(values)
+        if len(self._pending) > self.WIDTH_SAMPLE_ROWS:
+            self._flush_pending()
+
+    def _flush_pending(self):
+        for index, width in enumerate(self._widths, start=1):
+            self._sheet.column_dimensions[get_column_letter(index)].width = min(width + 5, 50)
+        pending, self._pending = self._pending, None
+        for row_index, values in enumerate(pending, start=1):
+            self._append(values, row_index)
+
+    def _append(self, values: List[Any], row_index: int):
+        if row_index == 1:
+            style = self._style_arrays["listado_header"]
+        elif row_index % 2 == 0:
+            style = self._style_arrays["listado_even"]
+        else:
+            style = self._style_arrays["listado_odd"]
+        self._sheet.append([Cell(self._sheet, row=1, column=1, value=value, style_array=copy(style)) for value in values])
+
+    def _finish(self) -> io.BytesIO:
+        if self._pending is not None:
+            self._flush_pending()
         buffer = io.BytesIO()
         self.workbook.save(buffer)
         buffer.seek(0)
         return buffer
 
-    def _get_nested_value(self, obj: Dict, key: str) -> Any:
-        """
-        Permite acceder a valores anidados usando punto como separador,
-        por ejemplo: 'user.externalName'
-        """
-        parts = key.split('.')
-        value = obj
-        for part in parts:
-            if isinstance(value, dict):
-                value = value.get(part, None)
-            else:
-                value = None
-            if value is None:
-                return ""
-        return value
-
-    def _format_value(self, value: Any) -> Any:
-        """
-        Normaliza valores complejos (listas/diccionarios) para que se vean legibles en la celda.
-        """
-        if isinstance(value, list):
-            formatted_items = []
-            for item in value:
-                if isinstance(item, dict):
-                    parts = [f"{k}: {v}" for k, v in item.items() if v not in (None, "")]
-                    formatted_items.append(", ".join(parts) if parts else str(item))
-                else:
-                    formatted_items.append(str(item))
-            return "\n".join(formatted_items)
-        if isinstance(value, dict):
-            return ", ".join([f"{k}: {v}" for k, v in value.items() if v not in (None, "")])
-        return value
-
     def get_content_type(self) -> str:
         return "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
 
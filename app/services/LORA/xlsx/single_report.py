@@ -4,6 +4,7 @@ import io
 from typing import Any, Dict, List
 from datetime import datetime
 from ...base import BaseExportService
+from ..report_view import ReportView, report_view
 
 
 class XLSXExportService(BaseExportService):
@@ -62,10 +63,11 @@ class XLSXExportService(BaseExportService):
         default_sheet = self.workbook.active
         self.workbook.remove(default_sheet)
 
-        if isinstance(data, dict):
-            self._create_summary_sheet(data)
-            self._create_details_sheet(data)
-            self._create_actions_sheet(data)
+        if isinstance(data, (dict, ReportView)):
+            view = report_view(data)
+            self._create_summary_sheet(view)
+            self._create_details_sheet(view)
+            self._create_actions_sheet(view)
         else:
             self._create_simple_sheet(data)
 
@@ -77,7 +79,7 @@ class XLSXExportService(BaseExportService):
     # ---------------------------
     # HOJA 1: RESUMEN
     # ---------------------------
-    def _create_summary_sheet(self, data: Dict):
+    def _create_summary_sheet(self, data: ReportView):
         ws = self.workbook.create_sheet("Resumen")
         ws.sheet_properties.tabColor = "1F497D"
 
@@ -89,10 +91,7 @@ class XLSXExportService(BaseExportService):
         ws.row_dimensions[1].height = 25
 
         # Campos clave
-        summary_fields = [
-            (label, self._format_value(self._get_nested_value(data, key, fallback=data)))
-            for key, label in self.FIELDS
-        ]
+        summary_fields = data.items(self.FIELDS)
 
         start_row = 3
         ws.append(["Campo", "Valor"])
@@ -113,7 +112,7 @@ class XLSXExportService(BaseExportService):
     # ---------------------------
     # HOJA 2: DETALLES
     # ---------------------------
-    def _create_details_sheet(self, data: Dict):
+    def _create_details_sheet(self, data: ReportView):
         ws = self.workbook.create_sheet("Detalles")
         ws.sheet_properties.tabColor = "76933C"
 
@@ -121,7 +120,7 @@ class XLSXExportService(BaseExportService):
             ("Descripción", data.get("detailedDescription")),
             ("Causa", data.get("findingCause")),
             ("Conversación", data.get("conversation")),
-            ("Evidencias", "\n".join(data.get("evidence", [])) if data.get("evidence") else "Sin evidencias adjuntas"),
+            ("Evidencias", "\n".join(data.evidence) if data.evidence else "Sin evidencias adjuntas"),
         ]
 
         row = 1
@@ -148,7 +147,7 @@ class XLSXExportService(BaseExportService):
     # ---------------------------
     # HOJA 3: ACCIONES
     # ---------------------------
-    def _create_actions_sheet(self, data: Dict):
+    def _create_actions_sheet(self, data: ReportView):
         ws = self.workbook.create_sheet("Acciones")
         ws.sheet_properties.tabColor = "C0504D"
 
@@ -162,7 +161,7 @@ class XLSXExportService(BaseExportService):
             cell.alignment = Alignment(horizontal="center")
             cell.border = self.border
 
-        actions = data.get("actions", [])
+        actions = data.actions
         if not actions:
             ws.append(["Sin acciones registradas"])
         else:
@@ -198,43 +197,6 @@ class XLSXExportService(BaseExportService):
     # ---------------------------
     # HELPERS
     # ---------------------------
-    def _get_nested_value(self, obj: Dict, key: str, fallback: Dict = None) -> Any:
-        parts = key.split('.')
-        value = obj
-        for part in parts:
-            if isinstance(value, dict):
-                value = value.get(part, None)
-            else:
-                value = None
-            if value is None:
-                break
-        if value is None and fallback and key == "reportEvidence":
-            evidences = fallback.get("evidence", [])
-            return evidences if evidences else None
-        if value is None and fallback and key == "actions":
-            return fallback.get("actions", [])
-        return value
-
-    def _format_value(self, value: Any) -> Any:
-        if value is None:
-            return "N/A"
-        if isinstance(value, list):
-            formatted_items = []
-            for item in value:
-                if isinstance(item, dict):
-                    parts = [f"{k}: {v}" for k, v in item.items() if v not in (None, "")]
-                    formatted_items.append(", ".join(parts) if parts else str(item))
-                else:
-                    formatted_items.append(str(item))
-            return "\n".join(formatted_items) if formatted_items else "N/A"
-        if isinstance(value, dict):
-            parts = [f"{k}: {v}" for k, v in value.items() if v not in (None, "")]
-            return ", ".join(parts) if parts else "N/A"
-        return value
-
-    # ---------------------------
-    # METADATOS
-    # ---------------------------
     def get_content_type(self) -> str:
         return "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
 
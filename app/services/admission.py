@@ -0,0 +1,310 @@
+import os
+import math
+import time
+import heapq
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+from . import metrics, tracing
+from .tenants import ANONYMOUS, TenantRegistry, TenantState
+
+""" Control de admisión de las rutas de exportación por clase de costo.
+
+Cada clase tiene un límite de exportaciones simultáneas y una cola de espera
+acotada. Una petición que encuentra la cola llena recibe ``429``; una que espera
+más que el tiempo máximo de la clase recibe ``503``. En ambos casos
+``Retry-After`` se calcula con el ritmo de exportaciones terminadas de la clase.
+
+La cola de cada clase se atiende con colas justas ponderadas (WFQ) por tenant
+(ver app/services/tenants.py): un cliente con muchas exportaciones en espera no
+retrasa a los demás más allá de su parte del límite. Cada tenant además gasta,
+por exportación, el costo de la clase en su token bucket; sin tokens responde ``429``.
+
+Clases:
+    single: un reporte (``/lora/docx/{id}``, ``/lora/{id}/export``, ...)
+    user: reportes de un usuario o filtrados, y el ZIP de varios reportes
+    all: todos los reportes
+"""
+
+ADMISSION_CLASSES = ("single", "user", "all")
+
+# Límite, cola, espera máxima (s) y costo en tokens por defecto de cada clase
+DEFAULT_LIMITS = {
+    "single": (32, 256, 10.0, 1.0),
+    "user": (8, 64, 30.0, 4.0),
+    "all": (2, 8, 60.0, 10.0),
+}
+
+# Ventana (s) usada para medir el ritmo de exportaciones terminadas
+THROUGHPUT_WINDOW = 60.0
+MAX_RETRY_AFTER = 300
+
+
+def admission_class(route: Optional[str]) -> Optional[str]:
+    """Clase de admisión de una plantilla de ruta; ``None`` si la ruta no es una exportación"""
+    if not route or "/lora/" not in route:
+        return None
+    if "_by_user" in route or route.endswith("_filter") or route.endswith("/bundle"):
+        return "user"
+    if "all_reports" in route:
+        return "all"
+    return "single"
+
+
+class AdmissionRejected(Exception):
+    """Exportación rechazada: cola llena o tenant sin tokens (429), o espera agotada (503)"""
+
+    def __init__(self, message: str, status_code: int, retry_after: int, reason: str = "queue_full"):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class AdmissionClass:
+    """Semáforo con cola acotada atendida por WFQ entre tenants, tiempo máximo de espera y ritmo de salida.
+
+    Cada petición en espera recibe una marca de fin virtual ``max(V, fin anterior
+    del tenant) + 1 / peso``; al liberarse un cupo pasa a la marca menor y ``V``
+    avanza hasta ella. Un tenant identificado puede tener en espera como máximo
+    ``tenant_queue`` peticiones de la clase, para no llenar la cola de todos.
+    """
+
+    def __init__(self, name: str, limit: int, max_queue: int, timeout: float, cost: float = 1.0, tenant_queue: Optional[int] = None):
+        self.name = name
+        self.limit = max(1, limit)
+        self.max_queue = max(0, max_queue)
+        self.timeout = timeout
+        self.cost = cost
+        self.tenant_queue = tenant_queue if tenant_queue is not None else max(1, self.max_queue // 2)
+        self.running = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        # (marca de fin, orden de llegada, waiter); las entradas vencidas se descartan al atender
+        self._heap: List[Tuple[float, int, asyncio.Future]] = []
+        self._sequence = 0
+        self._virtual = 0.0
+        self._finish: Dict[str, float] = {}
+        self._queued: Dict[str, int] = {}
+        self._finished: Deque[float] = deque()
+        self._avg_seconds: Optional[float] = None
+
+    async def acquire(self, tenant: Optional[TenantState] = None):
+        tenant_id = tenant.id if tenant is not None else ANONYMOUS
+        if self.running < self.limit and not self.waiting:
+            self.running += 1
+            self.admitted += 1
+            return
+        # Las peticiones sin tenant identificado comparten la cola completa
+        tenant_full = tenant_id != ANONYMOUS and self._queued.get(tenant_id, 0) >= self.tenant_queue
+        if self.waiting >= self.max_queue or tenant_full:
+            self.rejected += 1
+            raise AdmissionRejected(
+                f"Demasiadas exportaciones de tipo '{self.name}' en curso; reintente más tarde",
+                429, self.retry_after(),
+            )
+        weight = tenant.weight if tenant is not None else 1.0
+        finish = max(self._virtual, self._finish.get(tenant_id, 0.0)) + 1.0 / weight
+        self._finish[tenant_id] = finish
+        waiter = asyncio.get_running_loop().create_future()
+        self._sequence += 1
+        heapq.heappush(self._heap, (finish, self._sequence, waiter))
+        self.waiting += 1
+        self._queued[tenant_id] = self._queued.get(tenant_id, 0) + 1
+        try:
+            await asyncio.wait_for(waiter, self.timeout)
+        except BaseException as e:
+            # Cancelada o vencida justo después de recibir el cupo: se cede al siguiente
+            if waiter.done() and not waiter.cancelled():
+                self._hand_off()
+            if not isinstance(e, asyncio.TimeoutError):
+                raise
+            self.timed_out += 1
+            raise AdmissionRejected(
+                f"Tiempo de espera agotado para exportaciones de tipo '{self.name}'; reintente más tarde",
+                503, self.retry_after(), "timeout",
+            ) from None
+        finally:
+            self.waiting -= 1
+            self._queued[tenant_id] -= 1
+            if not self._queued[tenant_id]:
+                del self._queued[tenant_id]
+                # Un tenant sin peticiones en espera no conserva crédito atrasado
+                if self._finish.get(tenant_id, 0.0) <= self._virtual:
+                    self._finish.pop(tenant_id, None)
+        self.admitted += 1
+
+    def release(self, seconds: float):
+        self.completed += 1
+        self._finished.append(time.monotonic())
+        self._avg_seconds = seconds if self._avg_seconds is None else 0.8 * self._avg_seconds + 0.2 * seconds
+        self._hand_off()
+
+    def _hand_off(self):
+        # El cupo pasa directamente al waiter vivo con menor marca de fin, sin volver a competir
+        while self._heap:
+            finish, _, waiter = heapq.heappop(self._heap)
+            if not waiter.done():
+                self._virtual = finish
+                waiter.set_result(None)
+                return
+        self.running -= 1
+
+    def throughput(self) -> Optional[float]:
+        """Exportaciones terminadas por segundo en la última ventana, o la capacidad según la duración media"""
+        now = time.monotonic()
+        while self._finished and self._finished[0] < now - THROUGHPUT_WINDOW:
+            self._finished.popleft()
+        if len(self._finished) >= 2 and now - self._finished[0] > 0:
+            return len(self._finished) / (now - self._finished[0])
+        if self._avg_seconds:
+            return self.limit / self._avg_seconds
+        return None
+
+    def retry_after(self) -> int:
+        """Segundos hasta que la cola actual más esta petición deberían haberse atendido"""
+        rate = self.throughput()
+        seconds = (self.waiting + 1) / rate if rate else self.timeout
+        return min(MAX_RETRY_AFTER, max(1, math.ceil(seconds)))
+
+    def stats(self) -> Dict[str, Any]:
+        rate = self.throughput()
+        return {
+            "limit": self.limit,
+            "max_queue": self.max_queue,
+            "tenant_queue": self.tenant_queue,
+            "timeout": self.timeout,
+            "cost": self.cost,
+            "running": self.running,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "throughput": round(rate, 3) if rate else None,
+            "avg_seconds": round(self._avg_seconds, 3) if self._avg_seconds else None,
+        }
+
+
+class AdmissionController:
+    """Clases de admisión de las exportaciones.
+
+    Configuración por variables de entorno:
+        ADMISSION_ENABLED: ``false`` admite todas las peticiones sin límite (default true)
+        ADMISSION_<CLASE>_LIMIT: exportaciones simultáneas de la clase (SINGLE, USER, ALL)
+        ADMISSION_<CLASE>_QUEUE: peticiones en espera antes de responder 429
+        ADMISSION_<CLASE>_TIMEOUT: segundos máximos de espera antes de responder 503
+        ADMISSION_<CLASE>_COST: tokens que consume cada exportación de la clase (ver ``TenantRegistry``)
+        ADMISSION_<CLASE>_TENANT_QUEUE: peticiones en espera por tenant (default la mitad de la cola)
+    """
+
+    def __init__(self, enabled: Optional[bool] = None):
+        self.enabled = enabled if enabled is not None else os.getenv("ADMISSION_ENABLED", "true").strip().lower() not in ("0", "false", "no", "off")
+        self.tenants = TenantRegistry()
+        self.classes: Dict[str, AdmissionClass] = {}
+        for name in ADMISSION_CLASSES:
+            limit, max_queue, timeout, cost = DEFAULT_LIMITS[name]
+            prefix = f"ADMISSION_{name.upper()}"
+            tenant_queue = _env_int(f"{prefix}_TENANT_QUEUE", 0)
+            self.classes[name] = AdmissionClass(
+                name,
+                _env_int(f"{prefix}_LIMIT", limit),
+                _env_int(f"{prefix}_QUEUE", max_queue),
+                _env_float(f"{prefix}_TIMEOUT", timeout),
+                _env_float(f"{prefix}_COST", cost),
+                tenant_queue if tenant_queue > 0 else None,
+            )
+
+    @asynccontextmanager
+    async def admit(self, name: str, tenant: str = ANONYMOUS) -> AsyncIterator[None]:
+        """Espera un cupo de la clase ``name`` para ``tenant`` y lo libera al salir.
+
+        Lanza ``AdmissionRejected`` si el tenant no tiene tokens o la clase está saturada.
+        """
+        if not self.enabled:
+            yield
+            return
+        cls = self.classes[name]
+        state = self.tenants.get(tenant)
+        if state.bucket is not None:
+            wait = state.bucket.take(cls.cost)
+            if wait > 0:
+                state.throttled += 1
+                metrics.observe_tenant_rejected(state.label, name, "rate_limited")
+                raise AdmissionRejected(
+                    "Límite de exportaciones por cliente alcanzado; reintente más tarde",
+                    429, min(MAX_RETRY_AFTER, max(1, math.ceil(wait))), "rate_limited",
+                )
+        queued_at = time.time_ns()
+        state.waiting += 1
+        try:
+            await cls.acquire(state)
+        except BaseException as e:
+            # Rechazada por congestión (o cancelada en la cola): la exportación no corrió y no gasta tokens
+            if state.bucket is not None:
+                state.bucket.refund(cls.cost)
+            if isinstance(e, AdmissionRejected):
+                state.rejected += 1
+                metrics.observe_tenant_rejected(state.label, name, e.reason)
+            raise
+        finally:
+            state.waiting -= 1
+        admitted_at = time.time_ns()
+        waited = (admitted_at - queued_at) / 1e9
+        state.admitted += 1
+        state.wait_seconds += waited
+        state.running += 1
+        metrics.observe_admission_wait(name, waited, state.label)
+        if admitted_at - queued_at > 1_000_000:
+            # La espera por admisión aparece como ``queue`` en Server-Timing
+            tracing.record("queue", queued_at, admitted_at, reason="admission", admission_class=name, tenant=tenant)
+        try:
+            yield
+        finally:
+            state.running -= 1
+            state.completed += 1
+            metrics.observe_tenant_completed(state.label, name)
+            cls.release((time.time_ns() - admitted_at) / 1e9)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "classes": {name: cls.stats() for name, cls in self.classes.items()},
+            "tenants": self.tenants.stats(),
+        }
+
+
+_controller: Optional[AdmissionController] = None
+
+
+def init_admission(**kwargs) -> AdmissionController:
+    """Crea el controlador de admisión (se invoca desde ``lifespan`` en ``app/main.py``)"""
+    global _controller
+    _controller = AdmissionController(**kwargs)
+    return _controller
+
+
+def get_admission_controller() -> AdmissionController:
+    global _controller
+    if _controller is None:
+        _controller = AdmissionController()
+    return _controller
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
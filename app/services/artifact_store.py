@@ -0,0 +1,277 @@
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, BinaryIO, Dict, Optional
+
+
+def artifact_key(data: Any, file_format: str, exporter: type, options: Optional[Dict] = None) -> str:
+    """Clave de contenido de un archivo renderizado.
+
+    Hash SHA-256 de (huella de los datos, formato, clase exportadora, versión de
+    plantilla, opciones). La huella es ``id@updatedAt`` de cada reporte, como en
+    ``source_etag``, para no serializar el payload completo. Cambiar
+    ``TEMPLATE_VERSION`` en un servicio invalida todos sus artefactos previos.
+    """
+    digest = hashlib.sha256()
+    for part in (
+        _source_fingerprint(data),
+        str(file_format),
+        f"{exporter.__module__}.{exporter.__qualname__}",
+        str(getattr(exporter, "TEMPLATE_VERSION", "")),
+        _canonical_json(options or {}),
+    ):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def source_etag(data: Any, exporter: type, options: Optional[Dict] = None) -> str:
+    """ETag HTTP de una exportación calculado solo a partir de los datos de origen.
+
+    Usa ``id`` + ``updatedAt`` de cada reporte cuando están presentes (barato,
+    sin serializar el payload completo) y el hash del JSON en otro caso. Se
+    combina con la clase exportadora y su ``TEMPLATE_VERSION`` para que un cambio
+    de plantilla invalide las copias del cliente.
+    """
+    digest = hashlib.sha256()
+    for part in (
+        _source_fingerprint(data),
+        f"{exporter.__module__}.{exporter.__qualname__}",
+        str(getattr(exporter, "TEMPLATE_VERSION", "")),
+        _canonical_json(options or {}),
+    ):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def _source_fingerprint(data: Any) -> str:
+    if hasattr(data, "to_dict"):
+        data = data.to_dict()
+    if isinstance(data, dict) and data.get("id") is not None and data.get("updatedAt"):
+        return f"{data['id']}@{data['updatedAt']}"
+    if isinstance(data, list):
+        return "[" + ",".join(_source_fingerprint(item) for item in data) + "]"
+    return hashlib.sha256(_canonical_json(data).encode("utf-8")).hexdigest()
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Evalúa la cabecera ``If-None-Match`` (lista de ETags, débiles o ``*``)"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def _canonical_json(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=_json_default)
+
+
+def _json_default(value: Any) -> Any:
+    # Las vistas de reporte (``ReportView``) se serializan como el reporte original
+    if hasattr(value, "to_dict"):
+        return value.to_dict()
+    return str(value)
+
+
+class ArtifactStore:
+    """Almacén en disco de archivos ya renderizados, direccionado por contenido.
+
+    Expulsa por LRU cuando se supera el presupuesto de bytes y escribe de forma
+    atómica (archivo temporal + ``os.replace``) para que un lector nunca vea un
+    archivo a medio escribir.
+
+    El directorio puede compartirse entre varios procesos (workers de uvicorn):
+    cada escritura vuelve a leer el directorio si pasaron más de
+    ``ARTIFACT_CACHE_RESCAN_SECONDS`` desde la última lectura, para que el
+    presupuesto se aplique al total del directorio y no solo a lo que escribió
+    este proceso.
+
+    Configuración por variables de entorno:
+        ARTIFACT_CACHE_ENABLED: habilita el almacén (default true)
+        ARTIFACT_CACHE_DIR: directorio de los artefactos (default <tmp>/exportfiles-artifacts)
+        ARTIFACT_CACHE_MAX_BYTES: presupuesto en bytes del directorio (default 512 MB)
+        ARTIFACT_CACHE_RESCAN_SECONDS: intervalo mínimo entre lecturas del directorio (default 5)
+    """
+
+    # Archivos temporales más antiguos que esto se consideran abandonados
+    STALE_TMP_SECONDS = 3600
+
+    def __init__(self, root: Optional[str] = None, max_bytes: Optional[int] = None, enabled: Optional[bool] = None):
+        self.root = root or os.getenv("ARTIFACT_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "exportfiles-artifacts")
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.getenv("ARTIFACT_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+        if enabled is None:
+            enabled = os.getenv("ARTIFACT_CACHE_ENABLED", "true").strip().lower() in ("1", "true", "yes", "on")
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self.rescan_interval = float(os.getenv("ARTIFACT_CACHE_RESCAN_SECONDS", "5"))
+        self._scanned_at = 0.0
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if self.enabled:
+            os.makedirs(self.root, exist_ok=True)
+            self._load_index()
+
+    def get(self, key: str) -> Optional[bytes]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            if key not in self._index:
+                self.misses += 1
+                return None
+            self._index.move_to_end(key)
+        try:
+            with open(self._path(key), "rb") as f:
+                content = f.read()
+            os.utime(self._path(key))
+        except OSError:
+            with self._lock:
+                self.bytes -= self._index.pop(key, 0)
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return content
+
+    def open(self, key: str) -> Optional[BinaryIO]:
+        """Abre el artefacto para enviarlo por fragmentos sin leerlo completo en memoria.
+
+        El descriptor abierto sigue siendo válido aunque el artefacto se expulse
+        mientras se envía.
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            if key not in self._index:
+                self.misses += 1
+                return None
+            self._index.move_to_end(key)
+        try:
+            f = open(self._path(key), "rb")
+            os.utime(self._path(key))
+        except OSError:
+            with self._lock:
+                self.bytes -= self._index.pop(key, 0)
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return f
+
+    def put(self, key: str, content: bytes):
+        if not self.enabled or len(content) > self.max_bytes:
+            return
+        self._store(key, len(content), lambda f: f.write(content))
+
+    def put_file(self, key: str, path: str):
+        """Guarda una copia del archivo ``path`` (el original queda para quien lo generó)"""
+        if not self.enabled:
+            return
+        size = os.path.getsize(path)
+        if size > self.max_bytes:
+            return
+
+        def copy(f):
+            with open(path, "rb") as src:
+                shutil.copyfileobj(src, f)
+
+        self._store(key, size, copy)
+
+    def _store(self, key: str, size: int, write):
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            return
+        with self._lock:
+            if time.monotonic() - self._scanned_at >= self.rescan_interval:
+                # Incluye los artefactos que escribieron otros procesos y quita los que expulsaron
+                self._load_index()
+            else:
+                self.bytes -= self._index.pop(key, 0)
+                self._index[key] = size
+                self.bytes += size
+            self._evict()
+
+    def _evict(self):
+        while self._index and self.bytes > self.max_bytes:
+            key, size = self._index.popitem(last=False)
+            self.bytes -= size
+            self.evictions += 1
+            try:
+                os.unlink(self._path(key))
+            except OSError:
+                pass
+
+    def _load_index(self):
+        """Reconstruye el orden LRU a partir de la fecha de modificación de los archivos"""
+        entries = []
+        now = time.time()
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if name.startswith(".tmp-"):
+                # Puede ser una escritura en curso de otro proceso: solo se borran las abandonadas
+                if now - st.st_mtime > self.STALE_TMP_SECONDS:
+                    try:
+                        os.unlink(path)
+                    except OSError:
+                        pass
+                continue
+            entries.append((st.st_mtime, name, st.st_size))
+        self._index.clear()
+        self.bytes = 0
+        for _, name, size in sorted(entries):
+            self._index[name] = size
+            self.bytes += size
+        self._scanned_at = time.monotonic()
+        self._evict()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._index),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+_store: Optional[ArtifactStore] = None
+
+
+def get_artifact_store() -> ArtifactStore:
+    """Devuelve el almacén compartido del proceso"""
+    global _store
+    if _store is None:
+        _store = ArtifactStore()
+    return _store
@@ -1,9 +1,25 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 import io
 
+from .metrics import instrument_render, instrument_stream
+
 """ Clases abstractas para todos los servicios """
 class BaseExportService(ABC):
+    # Versión de la plantilla de salida; incrementarla invalida los artefactos cacheados
+    TEMPLATE_VERSION = "1"
+    # Memoria estimada de un render en bytes: (base, por reporte, por carácter de texto)
+    # (ver app/services/memory.py); los exportadores la ajustan según lo medido
+    MEMORY_MODEL = (8 * 1024 * 1024, 64 * 1024, 16)
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Métricas de render y tamaño de salida (ver app/services/metrics.py)
+        if "generate_file" in cls.__dict__:
+            cls.generate_file = instrument_render(cls.generate_file)
+        if "aiter_chunks" in cls.__dict__:
+            cls.aiter_chunks = instrument_stream(cls.aiter_chunks)
+
     @abstractmethod
     def generate_file(self, data: Any, options: Dict = None) -> io.BytesIO:
         """
@@ -48,4 +64,14 @@ class BaseExportService(ABC):
         Returns:
             bool: True si los datos son válidos
         """
-        return data is not None
\ No newline at end of file
+        return data is not None
+
+    def rendered_pages(self) -> Optional[int]:
+        """
+        Páginas del último archivo generado (exportadores FPDF)
+
+        Returns:
+            Optional[int]: Número de páginas, o None si el formato no es paginado
+        """
+        pdf = getattr(self, "pdf", None)
+        return pdf.page_no() if pdf is not None and hasattr(pdf, "page_no") else None
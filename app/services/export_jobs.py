@@ -0,0 +1,215 @@
+import os
+import time
+import uuid
+import shutil
+import asyncio
+import tempfile
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .metrics import route_label
+from .tracing import span, trace
+from .render_executor import SpilledFile, get_executor
+
+
+class JobQueueFull(Exception):
+    """La cola de trabajos de exportación alcanzó su límite"""
+
+
+class ExportJob:
+    """Estado de una exportación en segundo plano.
+
+    El resultado se guarda en un archivo del directorio de trabajos para poder
+    descargarlo varias veces sin mantenerlo en memoria.
+    """
+
+    def __init__(self, export: str, params: Dict[str, Any]):
+        self.id = uuid.uuid4().hex
+        self.export = export
+        self.params = params
+        self.status = "queued"
+        self.progress = 0.0
+        self.message = "En cola"
+        self.created_at = datetime.now()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.filename: Optional[str] = None
+        self.content_type: Optional[str] = None
+        self.path: Optional[str] = None
+        self.size: Optional[int] = None
+        self.error: Optional[str] = None
+        self._expires_at: Optional[float] = None
+
+    def update(self, status: str, progress: float, message: str):
+        self.status = status
+        self.progress = progress
+        self.message = message
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("completed", "failed")
+
+
+# El trabajo recibe el job para reportar progreso y devuelve (contenido, nombre, content-type)
+JobRunner = Callable[[ExportJob], Awaitable[Tuple[Any, str, str]]]
+
+
+class JobManager:
+    """Pool acotado de trabajadores asíncronos que ejecutan exportaciones en segundo plano.
+
+    Los trabajos esperan en una cola de tamaño fijo; cuando está llena ``submit``
+    lanza ``JobQueueFull`` en lugar de aceptar trabajo sin límite. Los resultados
+    terminados se conservan ``ttl`` segundos.
+
+    Configuración por variables de entorno:
+        EXPORT_JOB_WORKERS: trabajos ejecutándose a la vez (default 4)
+        EXPORT_JOB_MAX_QUEUED: trabajos en espera máximos (default 100)
+        EXPORT_JOB_TTL: segundos que se conserva un resultado terminado (default 3600)
+        EXPORT_JOB_DIR: directorio de los resultados (default <tmp>/exportfiles-jobs)
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_queued: Optional[int] = None,
+        ttl: Optional[float] = None,
+        root: Optional[str] = None,
+    ):
+        self.workers = workers if workers is not None else int(os.getenv("EXPORT_JOB_WORKERS", "4"))
+        self.max_queued = max_queued if max_queued is not None else int(os.getenv("EXPORT_JOB_MAX_QUEUED", "100"))
+        self.ttl = ttl if ttl is not None else float(os.getenv("EXPORT_JOB_TTL", "3600"))
+        self.root = root or os.getenv("EXPORT_JOB_DIR") or os.path.join(tempfile.gettempdir(), "exportfiles-jobs")
+        os.makedirs(self.root, exist_ok=True)
+        self._jobs: "OrderedDict[str, ExportJob]" = OrderedDict()
+        self._queue: "asyncio.Queue[Tuple[ExportJob, JobRunner]]" = asyncio.Queue(maxsize=max(1, self.max_queued))
+        self._tasks: List[asyncio.Task] = []
+        self.completed = 0
+        self.failed = 0
+
+    def start(self):
+        """Arranca los trabajadores (debe llamarse con el bucle de eventos en marcha)"""
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(max(1, self.workers))]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for job in self._jobs.values():
+            self._remove_file(job)
+        self._jobs.clear()
+
+    def submit(self, export: str, params: Dict[str, Any], run: JobRunner) -> ExportJob:
+        self._expire()
+        job = ExportJob(export, params)
+        try:
+            self._queue.put_nowait((job, run))
+        except asyncio.QueueFull:
+            raise JobQueueFull(f"Hay {self._queue.qsize()} exportaciones en espera; intente más tarde")
+        self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[ExportJob]:
+        self._expire()
+        return self._jobs.get(job_id)
+
+    async def _worker(self):
+        while True:
+            job, run = await self._queue.get()
+            try:
+                await self._run(job, run)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: ExportJob, run: JobRunner):
+        job.started_at = datetime.now()
+        # Las métricas del trabajo se etiquetan con la exportación y no con la ruta /jobs
+        token = route_label.set(f"job:{job.export}")
+        try:
+            with trace("job", export=job.export, **{"job.id": job.id}):
+                content, filename, content_type = await run(job)
+                job.update("saving", 0.9, "Guardando archivo")
+                job.path = os.path.join(self.root, job.id)
+                with span("save"):
+                    job.size = await get_executor().run_io(_save, content, job.path)
+            job.filename = filename
+            job.content_type = content_type
+            job.update("completed", 1.0, "Exportación completada")
+            self.completed += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            job.error = str(e)
+            job.update("failed", job.progress, f"Error en la exportación: {e}")
+            self.failed += 1
+        finally:
+            route_label.reset(token)
+            job.finished_at = datetime.now()
+            job._expires_at = time.monotonic() + self.ttl
+
+    def _expire(self):
+        now = time.monotonic()
+        for job_id in [job_id for job_id, job in self._jobs.items() if job._expires_at is not None and job._expires_at <= now]:
+            self._remove_file(self._jobs.pop(job_id))
+
+    def _remove_file(self, job: ExportJob):
+        if job.path is not None:
+            try:
+                os.unlink(job.path)
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        statuses: Dict[str, int] = {}
+        for job in self._jobs.values():
+            statuses[job.status] = statuses.get(job.status, 0) + 1
+        return {
+            "workers": len(self._tasks),
+            "queued": self._queue.qsize(),
+            "max_queued": self.max_queued,
+            "completed": self.completed,
+            "failed": self.failed,
+            "jobs": statuses,
+        }
+
+
+def _save(content: Any, path: str) -> int:
+    # Acepta bytes, un SpilledFile del motor de render o un artefacto abierto del almacén
+    if isinstance(content, SpilledFile):
+        shutil.move(content.path, path)
+    elif isinstance(content, (bytes, bytearray)):
+        with open(path, "wb") as f:
+            f.write(content)
+    else:
+        with content, open(path, "wb") as f:
+            shutil.copyfileobj(content, f)
+    return os.path.getsize(path)
+
+
+_manager: Optional[JobManager] = None
+
+
+def init_jobs(**kwargs) -> JobManager:
+    """Crea y arranca el pool de trabajos (se invoca desde ``lifespan`` en ``app/main.py``)"""
+    global _manager
+    _manager = JobManager(**kwargs)
+    _manager.start()
+    return _manager
+
+
+async def shutdown_jobs():
+    global _manager
+    if _manager is not None:
+        await _manager.stop()
+        _manager = None
+
+
+def get_job_manager() -> JobManager:
+    """Devuelve el pool compartido; lo crea con la configuración por defecto si no existe"""
+    global _manager
+    if _manager is None:
+        _manager = JobManager()
+        _manager.start()
+    return _manager
@@ -0,0 +1,230 @@
+import os
+import asyncio
+import threading
+import tracemalloc
+from collections.abc import Mapping
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
+
+""" Memoria de los renders: medición del pico por exportación, estimación previa y presupuesto por trabajador """
+
+MB = 1024 * 1024
+
+
+def _page_size() -> int:
+    try:
+        return os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, ValueError, OSError):
+        return 4096
+
+
+_PAGE_SIZE = _page_size()
+
+
+def current_rss() -> Optional[int]:
+    """RSS actual del proceso en bytes (Linux, ``/proc/self/statm``); ``None`` si no está disponible"""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class MemoryUsage:
+    """Memoria de un render: RSS al empezar y pico durante el render, y pico de tracemalloc si se activó"""
+
+    __slots__ = ("rss_start", "rss_peak", "tracemalloc_peak")
+
+    def __init__(self):
+        self.rss_start: Optional[int] = None
+        self.rss_peak: Optional[int] = None
+        self.tracemalloc_peak: Optional[int] = None
+
+    @property
+    def rss_delta(self) -> Optional[int]:
+        """Crecimiento del RSS durante el render (lo que consume por encima del trabajador ocioso)"""
+        if self.rss_start is None or self.rss_peak is None:
+            return None
+        return max(0, self.rss_peak - self.rss_start)
+
+    def as_dict(self) -> Dict[str, Optional[int]]:
+        return {
+            "rss_start": self.rss_start,
+            "rss_peak": self.rss_peak,
+            "rss_delta": self.rss_delta,
+            "tracemalloc_peak": self.tracemalloc_peak,
+        }
+
+
+def tracking_mode() -> str:
+    """``rss`` (default), ``tracemalloc`` (además del RSS; hace el render más lento) u ``off``"""
+    mode = os.getenv("RENDER_MEMORY_TRACKING", "rss").strip().lower()
+    return mode if mode in ("rss", "tracemalloc", "off") else "rss"
+
+
+@contextmanager
+def track_memory(mode: Optional[str] = None, interval: float = 0.01) -> Iterator[Optional[MemoryUsage]]:
+    """Mide el pico de memoria del bloque con un hilo que lee el RSS cada ``interval`` segundos"""
+    mode = mode or tracking_mode()
+    if mode == "off" or current_rss() is None:
+        yield None
+        return
+    usage = MemoryUsage()
+    usage.rss_start = usage.rss_peak = current_rss()
+    stop = threading.Event()
+
+    def sample():
+        while not stop.wait(interval):
+            rss = current_rss()
+            if rss is not None and rss > usage.rss_peak:
+                usage.rss_peak = rss
+
+    sampler = threading.Thread(target=sample, name="rss-sampler", daemon=True)
+    sampler.start()
+    tracing_started = mode == "tracemalloc" and not tracemalloc.is_tracing()
+    if tracing_started:
+        tracemalloc.start()
+    try:
+        yield usage
+    finally:
+        if tracing_started:
+            usage.tracemalloc_peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        stop.set()
+        sampler.join()
+        rss = current_rss()
+        if rss is not None and rss > usage.rss_peak:
+            usage.rss_peak = rss
+
+
+# Estimación previa al render
+
+def text_volume(data: Any) -> int:
+    """Caracteres de texto de los reportes (valores de dicts y listas anidadas), base de la estimación"""
+    total = 0
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, str):
+            total += len(value)
+        elif isinstance(value, Mapping):
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+        elif hasattr(value, "raw"):
+            # ReportView: se mide el reporte original
+            stack.append(value.raw)
+    return total
+
+
+def report_count(data: Any) -> int:
+    return len(data) if isinstance(data, (list, tuple)) else 1
+
+
+def estimate_peak(service_cls: type, data: Any) -> int:
+    """Crecimiento de memoria esperado al renderizar ``data`` con ``service_cls``.
+
+    Usa ``MEMORY_MODEL = (base, por reporte, por carácter)`` del exportador, en
+    bytes, multiplicado por ``RENDER_MEMORY_ESTIMATE_FACTOR`` (default 1).
+    """
+    base, per_report, per_char = getattr(service_cls, "MEMORY_MODEL", (8 * MB, 64 * 1024, 16))
+    factor = _env_float("RENDER_MEMORY_ESTIMATE_FACTOR", 1.0)
+    return int((base + per_report * report_count(data) + per_char * text_volume(data)) * factor)
+
+
+class MemoryBudgetExceeded(Exception):
+    """La exportación no cabe en el presupuesto de memoria de los trabajadores de render"""
+
+    def __init__(self, message: str, status_code: int, estimate: int, retry_after: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.estimate = estimate
+        self.retry_after = retry_after
+
+
+class MemoryBudget:
+    """Presupuesto de memoria de los renders, repartido entre los trabajadores.
+
+    Cada render reserva su estimación antes de enviarse al pool. Un render cuya
+    estimación supera el presupuesto de un trabajador se rechaza (413); los que
+    caben esperan, hasta ``timeout`` segundos, a que se libere memoria del total
+    (``per_worker`` × trabajadores) y si no se rechazan con 503.
+
+    Configuración por variables de entorno:
+        RENDER_MEMORY_BUDGET_MB: memoria por trabajador para un render, por encima de su
+            consumo ocioso (default 0 = sin límite)
+        RENDER_MEMORY_QUEUE_TIMEOUT: segundos máximos de espera por memoria (default 30)
+    """
+
+    def __init__(self, workers: int, per_worker: Optional[int] = None, timeout: Optional[float] = None):
+        self.per_worker = per_worker if per_worker is not None else int(_env_float("RENDER_MEMORY_BUDGET_MB", 0) * MB)
+        self.workers = max(1, workers)
+        self.timeout = timeout if timeout is not None else _env_float("RENDER_MEMORY_QUEUE_TIMEOUT", 30.0)
+        self.reserved = 0
+        self.waiting = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._condition: Optional[asyncio.Condition] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.per_worker > 0
+
+    @property
+    def total(self) -> int:
+        return self.per_worker * self.workers
+
+    @asynccontextmanager
+    async def reserve(self, estimate: int, worker_estimate: Optional[int] = None) -> AsyncIterator[None]:
+        """Reserva ``estimate`` bytes; ``worker_estimate`` es la parte mayor que cae en un solo trabajador"""
+        if not self.enabled:
+            yield
+            return
+        worker_estimate = estimate if worker_estimate is None else worker_estimate
+        if worker_estimate > self.per_worker:
+            self.rejected += 1
+            raise MemoryBudgetExceeded(
+                f"La exportación necesitaría ~{worker_estimate // MB} MB y el límite por render es "
+                f"{self.per_worker // MB} MB; filtre los reportes o use un listado en streaming (CSV, NDJSON, Parquet)",
+                413, estimate,
+            )
+        # Una reserva mayor que el total (render por fragmentos) espera a tener el pool libre
+        estimate = min(estimate, self.total)
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        async with self._condition:
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._condition.wait_for(lambda: self.reserved + estimate <= self.total), self.timeout)
+            except asyncio.TimeoutError:
+                self.timed_out += 1
+                raise MemoryBudgetExceeded(
+                    "Memoria de render ocupada por otras exportaciones; reintente más tarde",
+                    503, estimate, retry_after=max(1, int(self.timeout)),
+                )
+            finally:
+                self.waiting -= 1
+            self.reserved += estimate
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self.reserved -= estimate
+                self._condition.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "per_worker": self.per_worker,
+            "total": self.total,
+            "reserved": self.reserved,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
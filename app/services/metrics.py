@@ -0,0 +1,406 @@
+import io
+import os
+import re
+import time
+import inspect
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .tracing import span
+
+try:
+    from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+    from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+except ImportError:  # prometheus_client es opcional: sin él las métricas no se registran
+    REGISTRY = None
+
+""" Métricas Prometheus de las exportaciones: tiempos por etapa, tamaño de salida y colas.
+
+Etapas medidas:
+    fetch: consulta HTTP a VALERA (``ValeraClient``)
+    normalize: construcción de ``ReportView`` (vistas nuevas, no las de caché)
+    render: ``generate_file`` del exportador (incluye la normalización hecha dentro del render)
+    serialize: paso del archivo generado a bytes o a archivo temporal para el proceso principal
+
+La memoria de cada render (pico y crecimiento del RSS del proceso trabajador, y
+la estimación previa) se registra con ``observe_memory`` (ver app/services/memory.py).
+
+Las observaciones hechas en los procesos de render se acumulan con ``collect`` y
+se devuelven junto con el archivo; ``replay`` las registra en el proceso principal
+con la ruta que originó la exportación.
+"""
+
+# Ruta (plantilla de FastAPI) o trabajo que originó la exportación en curso
+route_label: ContextVar[str] = ContextVar("export_route", default="")
+
+# Observaciones pendientes dentro de un proceso de render (ver ``collect``)
+_pending: ContextVar[Optional[List[Tuple[str, Tuple]]]] = ContextVar("export_metrics_pending", default=None)
+_format_label: ContextVar[str] = ContextVar("export_format", default="")
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+BYTES_BUCKETS = tuple(1024 * 4 ** i for i in range(11))  # 1 KiB .. 1 GiB
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 50000, 100000)
+
+
+def enabled() -> bool:
+    return REGISTRY is not None and os.getenv("METRICS_ENABLED", "true").strip().lower() not in ("0", "false", "no", "off")
+
+
+if REGISTRY is not None:
+    FETCH_SECONDS = Histogram(
+        "export_valera_fetch_seconds", "Latencia de las consultas HTTP a VALERA",
+        ["route", "endpoint", "status"], buckets=SECONDS_BUCKETS,
+    )
+    STAGE_SECONDS = {
+        stage: Histogram(
+            f"export_{stage}_seconds", description,
+            ["route", "format"], buckets=SECONDS_BUCKETS,
+        )
+        for stage, description in (
+            ("normalize", "Tiempo de normalización de reportes (construcción de ReportView)"),
+            ("render", "Tiempo de generate_file del exportador"),
+            ("serialize", "Tiempo de serialización del archivo generado"),
+        )
+    }
+    OUTPUT_BYTES = Histogram("export_output_bytes", "Tamaño del archivo generado", ["route", "format"], buckets=BYTES_BUCKETS)
+    OUTPUT_ROWS = Histogram("export_output_rows", "Reportes incluidos en el archivo", ["route", "format"], buckets=COUNT_BUCKETS)
+    OUTPUT_PAGES = Histogram("export_output_pages", "Páginas del archivo (PDF)", ["route", "format"], buckets=COUNT_BUCKETS)
+    EXPORTS_TOTAL = Counter("export_files_total", "Archivos generados", ["route", "format"])
+    MEMORY_PEAK = Histogram(
+        "export_render_peak_rss_bytes", "RSS máximo del proceso de render durante el render",
+        ["route", "format"], buckets=BYTES_BUCKETS,
+    )
+    MEMORY_GROWTH = Histogram(
+        "export_render_memory_bytes", "Crecimiento del RSS del proceso de render durante el render",
+        ["route", "format"], buckets=BYTES_BUCKETS,
+    )
+    MEMORY_ESTIMATE = Histogram(
+        "export_render_memory_estimate_bytes", "Memoria estimada antes del render (presupuesto de memoria)",
+        ["route", "format"], buckets=BYTES_BUCKETS,
+    )
+    TRACEMALLOC_PEAK = Histogram(
+        "export_render_tracemalloc_peak_bytes", "Pico de tracemalloc durante el render (RENDER_MEMORY_TRACKING=tracemalloc)",
+        ["route", "format"], buckets=BYTES_BUCKETS,
+    )
+    ADMISSION_WAIT = Histogram(
+        "export_admission_wait_seconds", "Espera por un cupo de la clase de admisión",
+        ["admission_class"], buckets=SECONDS_BUCKETS,
+    )
+    TENANT_WAIT = Histogram(
+        "export_tenant_wait_seconds", "Espera por admisión de cada tenant",
+        ["tenant", "admission_class"], buckets=SECONDS_BUCKETS,
+    )
+    TENANT_EXPORTS = Counter("export_tenant_exports", "Exportaciones terminadas por tenant", ["tenant", "admission_class"])
+    TENANT_REJECTED = Counter(
+        "export_tenant_rejected", "Exportaciones rechazadas por tenant (queue_full, timeout, rate_limited)",
+        ["tenant", "admission_class", "reason"],
+    )
+    IN_FLIGHT = Gauge("export_in_flight", "Peticiones de exportación en curso (incluye el envío del cuerpo)", ["route"])
+
+
+def _record(name: str, args: Tuple):
+    pending = _pending.get()
+    if pending is not None:
+        pending.append((name, args))
+    elif enabled():
+        _RECORDERS[name](route_label.get(), *args)
+
+
+def _record_stage(route: str, stage: str, fmt: str, seconds: float):
+    STAGE_SECONDS[stage].labels(route, fmt).observe(seconds)
+
+
+def _record_output(route: str, fmt: str, size: int, rows: Optional[int], pages: Optional[int]):
+    EXPORTS_TOTAL.labels(route, fmt).inc()
+    OUTPUT_BYTES.labels(route, fmt).observe(size)
+    if rows is not None:
+        OUTPUT_ROWS.labels(route, fmt).observe(rows)
+    if pages is not None:
+        OUTPUT_PAGES.labels(route, fmt).observe(pages)
+
+
+def _record_memory(route: str, fmt: str, peak: Optional[int], growth: Optional[int], tracemalloc_peak: Optional[int], estimate: Optional[int]):
+    for histogram, value in ((MEMORY_PEAK, peak), (MEMORY_GROWTH, growth), (TRACEMALLOC_PEAK, tracemalloc_peak), (MEMORY_ESTIMATE, estimate)):
+        if value is not None:
+            histogram.labels(route, fmt).observe(value)
+
+
+_RECORDERS: Dict[str, Callable] = {"stage": _record_stage, "output": _record_output, "memory": _record_memory}
+
+
+def observe_stage(stage: str, seconds: float, fmt: Optional[str] = None):
+    """Registra la duración de una etapa (normalize, render, serialize)"""
+    _record("stage", (stage, _format_label.get() if fmt is None else fmt, seconds))
+
+
+def observe_output(fmt: str, size: int, rows: Optional[int] = None, pages: Optional[int] = None):
+    """Registra un archivo generado: bytes, reportes y páginas"""
+    _record("output", (fmt, size, rows, pages))
+
+
+def observe_memory(fmt: str, usage: Any, estimate: Optional[int] = None):
+    """Registra la memoria de un render (``MemoryUsage``, puede ser ``None``) y su estimación previa"""
+    if usage is None:
+        _record("memory", (fmt, None, None, None, estimate))
+    else:
+        _record("memory", (fmt, usage.rss_peak, usage.rss_delta, usage.tracemalloc_peak, estimate))
+
+
+def observe_admission_wait(admission_class: str, seconds: float, tenant: Optional[str] = None):
+    """Espera de una petición por su clase de admisión (ver app/services/admission.py)"""
+    if enabled():
+        ADMISSION_WAIT.labels(admission_class).observe(seconds)
+        if tenant is not None:
+            TENANT_WAIT.labels(tenant, admission_class).observe(seconds)
+
+
+def observe_tenant_completed(tenant: str, admission_class: str):
+    if enabled():
+        TENANT_EXPORTS.labels(tenant, admission_class).inc()
+
+
+def observe_tenant_rejected(tenant: str, admission_class: str, reason: str):
+    if enabled():
+        TENANT_REJECTED.labels(tenant, admission_class, reason).inc()
+
+
+@contextmanager
+def timed_stage(stage: str, fmt: Optional[str] = None, **attributes: Any) -> Iterator[None]:
+    """Mide una etapa en su histograma y como span de la traza actual"""
+    fmt = _format_label.get() if fmt is None else fmt
+    start = time.perf_counter()
+    try:
+        with span(stage, format=fmt, **attributes):
+            yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start, fmt)
+
+
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+
+def observe_fetch(path: str, status: int, seconds: float):
+    """Latencia de una consulta a VALERA (``status`` 0 si falló la conexión); los ids se agrupan como ``{id}``"""
+    if not enabled():
+        return
+    endpoint = _ID_SEGMENT.sub("/{id}", "/" + path.split("?", 1)[0].strip("/"))
+    FETCH_SECONDS.labels(route_label.get(), endpoint, str(status)).observe(seconds)
+
+
+@contextmanager
+def collect(fmt: str = "") -> Iterator[List[Tuple[str, Tuple]]]:
+    """Acumula las observaciones del render en curso en lugar de registrarlas.
+
+    Se usa en los procesos de render, que no comparten el registro de Prometheus
+    con el proceso principal; la lista se devuelve con el resultado y se pasa a ``replay``.
+    """
+    observations: List[Tuple[str, Tuple]] = []
+    pending_token = _pending.set(observations)
+    format_token = _format_label.set(fmt)
+    try:
+        yield observations
+    finally:
+        _format_label.reset(format_token)
+        _pending.reset(pending_token)
+
+
+def replay(observations: List[Tuple[str, Tuple]]):
+    """Registra en el proceso actual las observaciones devueltas por un proceso de render"""
+    for name, args in observations:
+        _record(name, args)
+
+
+def combine_outputs(observations: List[Tuple[str, Tuple]], size: int) -> List[Tuple[str, Tuple]]:
+    """Une las salidas de los fragmentos de un render por fragmentos en un solo archivo de ``size`` bytes"""
+    outputs = [args for name, args in observations if name == "output"]
+    combined = [(name, args) for name, args in observations if name != "output"]
+    if outputs:
+        rows = [args[2] for args in outputs if args[2] is not None]
+        pages = [args[3] for args in outputs if args[3] is not None]
+        combined.append(("output", (outputs[0][0], size, sum(rows) if rows else None, sum(pages) if pages else None)))
+    return combined
+
+
+@contextmanager
+def track_in_flight(route: str) -> Iterator[None]:
+    if not enabled():
+        yield
+        return
+    gauge = IN_FLIGHT.labels(route)
+    gauge.inc()
+    try:
+        yield
+    finally:
+        gauge.dec()
+
+
+# Instrumentación de los exportadores (ver ``BaseExportService.__init_subclass__``)
+
+def _output_size(result: Any) -> int:
+    if isinstance(result, io.BytesIO):
+        with result.getbuffer() as view:
+            return view.nbytes
+    try:
+        return len(result)
+    except TypeError:
+        return 0
+
+
+def _row_count(data: Any) -> Optional[int]:
+    if isinstance(data, (list, tuple)):
+        return len(data)
+    return 1 if data is not None else None
+
+
+def _observe_output(service: Any, data: Any, result: Any):
+    observe_output(service.get_file_extension().lstrip("."), _output_size(result), _row_count(data), service.rendered_pages())
+
+
+def instrument_render(fn: Callable) -> Callable:
+    """Envuelve ``generate_file`` (síncrono o asíncrono) para medir el render y el archivo generado"""
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(self, *args, **kwargs):
+            with timed_stage("render", self.get_file_extension().lstrip("."), exporter=type(self).__name__):
+                result = await fn(self, *args, **kwargs)
+            _observe_output(self, args[0] if args else kwargs.get("data"), result)
+            return result
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(self, *args, **kwargs):
+        with timed_stage("render", self.get_file_extension().lstrip("."), exporter=type(self).__name__):
+            result = fn(self, *args, **kwargs)
+        _observe_output(self, args[0] if args else kwargs.get("data"), result)
+        return result
+    return wrapper
+
+
+def instrument_stream(fn: Callable) -> Callable:
+    """Envuelve ``aiter_chunks`` de los listados en streaming para contar bytes y reportes enviados"""
+    @functools.wraps(fn)
+    async def wrapper(self, reports, *args, **kwargs):
+        counter = [0]
+        size = 0
+        async for chunk in fn(self, _count(reports, counter), *args, **kwargs):
+            size += len(chunk)
+            yield chunk
+        observe_output(self.get_file_extension().lstrip("."), size, counter[0])
+    return wrapper
+
+
+def _count(reports: Any, counter: List[int]) -> Any:
+    # Conserva el tipo de iterador: los exportadores eligen el camino síncrono o asíncrono según ``__aiter__``
+    if hasattr(reports, "__aiter__"):
+        async def counted_async():
+            async for report in reports:
+                counter[0] += 1
+                yield report
+        return counted_async()
+
+    def counted():
+        for report in reports:
+            counter[0] += 1
+            yield report
+    return counted()
+
+
+# Estado de colas y cachés, leído en cada consulta a /metrics
+
+class _StatsCollector:
+    """Expone como gauges las estadísticas de ``/stats``: colas del motor de render, trabajos y cachés"""
+
+    def collect(self):
+        from .admission import get_admission_controller
+        from .artifact_store import get_artifact_store
+        from .export_jobs import get_job_manager
+        from .render_executor import get_executor
+        from .valera_client import get_client
+        from .LORA.report_view import view_cache_stats
+
+        executor = get_executor().stats()
+        queued = GaugeMetricFamily("export_executor_queued", "Renders esperando un cupo del formato", labels=["format"])
+        running = GaugeMetricFamily("export_executor_running", "Renders en ejecución", labels=["format"])
+        for fmt, values in executor["formats"].items():
+            queued.add_metric([fmt], values["queued"])
+            running.add_metric([fmt], values["running"])
+        yield queued
+        yield running
+        renders = CounterMetricFamily("export_executor_renders", "Renders terminados", labels=["result"])
+        renders.add_metric(["completed"], executor["completed"])
+        renders.add_metric(["failed"], executor["failed"])
+        yield renders
+
+        memory = executor["memory"]
+        yield GaugeMetricFamily("export_memory_budget_bytes", "Presupuesto de memoria de render (todos los trabajadores)", value=memory["total"])
+        yield GaugeMetricFamily("export_memory_reserved_bytes", "Memoria reservada por los renders en curso", value=memory["reserved"])
+        yield GaugeMetricFamily("export_memory_waiting", "Renders esperando memoria libre", value=memory["waiting"])
+        rejected = CounterMetricFamily("export_memory_rejected", "Exportaciones rechazadas por el presupuesto de memoria", labels=["reason"])
+        rejected.add_metric(["too_large"], memory["rejected"])
+        rejected.add_metric(["timeout"], memory["timed_out"])
+        yield rejected
+
+        admission = get_admission_controller().stats()["classes"]
+        admission_running = GaugeMetricFamily("export_admission_running", "Exportaciones admitidas en curso", labels=["admission_class"])
+        admission_waiting = GaugeMetricFamily("export_admission_waiting", "Exportaciones en la cola de admisión", labels=["admission_class"])
+        admission_rejected = CounterMetricFamily(
+            "export_admission_rejected", "Exportaciones rechazadas por saturación", labels=["admission_class", "reason"],
+        )
+        for name, values in admission.items():
+            admission_running.add_metric([name], values["running"])
+            admission_waiting.add_metric([name], values["waiting"])
+            admission_rejected.add_metric([name, "queue_full"], values["rejected"])
+            admission_rejected.add_metric([name, "timeout"], values["timed_out"])
+        yield admission_running
+        yield admission_waiting
+        yield admission_rejected
+
+        jobs = get_job_manager().stats()
+        yield GaugeMetricFamily("export_jobs_queued", "Trabajos en segundo plano en cola", value=jobs["queued"])
+        by_status = GaugeMetricFamily("export_jobs", "Trabajos en segundo plano por estado", labels=["status"])
+        for status, count in jobs["jobs"].items():
+            by_status.add_metric([status], count)
+        yield by_status
+
+        valera = get_client().stats()["cache"]
+        views = view_cache_stats()
+        artifacts = get_artifact_store().stats()
+        caches = {
+            "valera": (valera["hits"] + valera["revalidated"], valera["stale"] - valera["revalidated"] + valera["misses"]),
+            "report_views": (views["hits"], views["misses"]),
+            "artifacts": (artifacts["hits"], artifacts["misses"]),
+        }
+        hits = CounterMetricFamily("export_cache_hits", "Aciertos de caché", labels=["cache"])
+        misses = CounterMetricFamily("export_cache_misses", "Fallos de caché", labels=["cache"])
+        ratio = GaugeMetricFamily("export_cache_hit_ratio", "Proporción de aciertos desde el arranque", labels=["cache"])
+        for name, (hit, miss) in caches.items():
+            hits.add_metric([name], hit)
+            misses.add_metric([name], max(0, miss))
+            ratio.add_metric([name], hit / (hit + miss) if hit + miss else 0.0)
+        yield hits
+        yield misses
+        yield ratio
+        yield GaugeMetricFamily(
+            "export_valera_requests_in_flight", "Consultas a VALERA en curso (single-flight)",
+            value=get_client().stats()["single_flight"]["in_flight"],
+        )
+
+
+_stats_registered = False
+
+
+def init_metrics():
+    """Registra el colector de estadísticas (se invoca desde ``lifespan`` en ``app/main.py``)"""
+    global _stats_registered
+    if REGISTRY is not None and not _stats_registered:
+        REGISTRY.register(_StatsCollector())
+        _stats_registered = True
+
+
+def render_latest() -> Optional[Tuple[bytes, str]]:
+    """Cuerpo y Content-Type de ``/metrics``; ``None`` si las métricas no están disponibles"""
+    if not enabled():
+        return None
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
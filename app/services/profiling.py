@@ -0,0 +1,236 @@
+import os
+import sys
+import time
+import hmac
+import uuid
+import marshal
+import cProfile
+import threading
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+
+""" Perfilado bajo demanda de los renders y muestreo de pilas del proceso.
+
+Desactivado por defecto. Con ``PROFILING_ENABLED=true`` y ``PROFILING_ADMIN_TOKEN``
+configurado, una petición con ``X-Admin-Token`` y ``X-Profile: cprofile|sample``
+se renderiza bajo el perfilador dentro del proceso de render; el resultado se
+guarda en ``ProfileStore`` y su id se devuelve en ``X-Profile-Id``.
+
+Formatos:
+    cprofile: volcado pstats (``pstats.Stats(archivo)``, snakeviz)
+    sample: pilas colapsadas (``flamegraph.pl``, speedscope)
+"""
+
+PROFILE_MODES = ("cprofile", "sample")
+
+# Modo de perfilado de la petición en curso (lo fija ``ProfilingMiddleware``)
+profile_mode: ContextVar[Optional[str]] = ContextVar("export_profile_mode", default=None)
+# Ids de los perfiles generados por la petición en curso
+request_profiles: ContextVar[Optional[List[str]]] = ContextVar("export_request_profiles", default=None)
+
+
+def enabled() -> bool:
+    return (
+        os.getenv("PROFILING_ENABLED", "false").strip().lower() in ("1", "true", "yes", "on")
+        and bool(os.getenv("PROFILING_ADMIN_TOKEN"))
+    )
+
+
+def check_token(token: Optional[str]) -> bool:
+    expected = os.getenv("PROFILING_ADMIN_TOKEN") or ""
+    return bool(expected) and token is not None and hmac.compare_digest(token.encode("utf-8"), expected.encode("utf-8"))
+
+
+def _frame_name(code) -> str:
+    # El formato colapsado separa marcos con ';': se usa solo el nombre de archivo corto
+    path = code.co_filename.replace("\\", "/").split("/")
+    return f"{code.co_name} ({'/'.join(path[-2:])}:{code.co_firstlineno})"
+
+
+def _stack(frame) -> List[str]:
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame.f_code))
+        frame = frame.f_back
+    names.reverse()
+    return names
+
+
+class StackSampler:
+    """Muestrea periódicamente las pilas de Python de uno o todos los hilos del proceso.
+
+    Sin dependencias nativas: usa ``sys._current_frames`` desde un hilo propio.
+    ``thread_ids=None`` muestrea todos los hilos excepto el del muestreador y
+    antepone el nombre del hilo a cada pila.
+    """
+
+    def __init__(self, interval: float = 0.005, thread_ids: Optional[List[int]] = None):
+        self.interval = max(0.001, interval)
+        self.thread_ids = set(thread_ids) if thread_ids is not None else None
+        self.counts: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def sample_once(self, own_id: int):
+        names = {thread.ident: thread.name for thread in threading.enumerate()} if self.thread_ids is None else {}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id or (self.thread_ids is not None and thread_id not in self.thread_ids):
+                continue
+            stack = _stack(frame)
+            if self.thread_ids is None:
+                stack.insert(0, names.get(thread_id, str(thread_id)))
+            self.counts[";".join(stack)] += 1
+        self.samples += 1
+
+    def run_for(self, seconds: float):
+        """Muestrea desde el hilo actual durante ``seconds``"""
+        own_id = threading.get_ident()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline and not self._stop.is_set():
+            self.sample_once(own_id)
+            time.sleep(self.interval)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run_for, args=(float("inf"),), name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.counts
+
+
+def collapsed(counts: Counter) -> str:
+    """Pilas en formato colapsado: ``marco;marco;marco muestras`` por línea"""
+    return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
+
+
+class ProfileCapture:
+    __slots__ = ("mode", "data")
+
+    def __init__(self, mode: str):
+        self.mode = mode
+        self.data: Optional[bytes] = None
+
+
+@contextmanager
+def profile_call(mode: str, interval: Optional[float] = None) -> Iterator[ProfileCapture]:
+    """Perfila el bloque en el hilo actual; al salir ``capture.data`` contiene el resultado"""
+    capture = ProfileCapture(mode)
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield capture
+        finally:
+            profiler.disable()
+            profiler.create_stats()
+            # Mismo contenido que ``Profile.dump_stats``: se lee con ``pstats.Stats``
+            capture.data = marshal.dumps(profiler.stats)
+    elif mode == "sample":
+        sampler = StackSampler(interval or _env_float("PROFILING_SAMPLE_INTERVAL", 0.005), [threading.get_ident()])
+        sampler.start()
+        try:
+            yield capture
+        finally:
+            capture.data = collapsed(sampler.stop()).encode("utf-8")
+    else:
+        raise ValueError(f"Modo de perfilado no soportado: {mode}")
+
+
+@contextmanager
+def maybe_profile(mode: Optional[str]) -> Iterator[Optional[ProfileCapture]]:
+    """``profile_call`` si hay un modo de perfilado; si no, no hace nada"""
+    if mode is None:
+        yield None
+        return
+    with profile_call(mode) as capture:
+        yield capture
+
+
+def sample_process(seconds: float, interval: float = 0.005) -> str:
+    """Pilas colapsadas de todos los hilos del proceso durante ``seconds`` (bloquea el hilo actual)"""
+    sampler = StackSampler(interval)
+    sampler.run_for(seconds)
+    return collapsed(sampler.counts)
+
+
+class StoredProfile(NamedTuple):
+    id: str
+    mode: str
+    label: str
+    data: bytes
+    created_at: datetime
+
+    @property
+    def media_type(self) -> str:
+        return "application/octet-stream" if self.mode == "cprofile" else "text/plain; charset=utf-8"
+
+    @property
+    def filename(self) -> str:
+        return f"profile_{self.id}.pstats" if self.mode == "cprofile" else f"profile_{self.id}.collapsed.txt"
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "mode": self.mode,
+            "label": self.label,
+            "bytes": len(self.data),
+            "created_at": self.created_at.isoformat(),
+        }
+
+
+class ProfileStore:
+    """Últimos perfiles generados, en memoria (``PROFILING_MAX_STORED``, default 20)"""
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv("PROFILING_MAX_STORED", "20"))
+        self._profiles: "OrderedDict[str, StoredProfile]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, mode: str, label: str, data: bytes) -> StoredProfile:
+        profile = StoredProfile(uuid.uuid4().hex, mode, label, data, datetime.now())
+        with self._lock:
+            self._profiles[profile.id] = profile
+            while len(self._profiles) > max(1, self.max_entries):
+                self._profiles.popitem(last=False)
+        return profile
+
+    def get(self, profile_id: str) -> Optional[StoredProfile]:
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [profile.summary() for profile in reversed(self._profiles.values())]
+
+
+_store: Optional[ProfileStore] = None
+
+
+def get_profile_store() -> ProfileStore:
+    global _store
+    if _store is None:
+        _store = ProfileStore()
+    return _store
+
+
+def record_profile(mode: str, label: str, data: bytes) -> StoredProfile:
+    """Guarda un perfil y lo asocia a la petición en curso (cabecera ``X-Profile-Id``)"""
+    profile = get_profile_store().put(mode, label, data)
+    ids = request_profiles.get()
+    if ids is not None:
+        ids.append(profile.id)
+    return profile
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
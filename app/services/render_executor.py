@@ -0,0 +1,522 @@
+import io
+import os
+import math
+import asyncio
+import inspect
+import importlib
+import multiprocessing
+import tempfile
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from typing import Any, AsyncIterator, Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+
+from . import metrics, profiling, tracing
+from .memory import MB, MemoryBudget, MemoryBudgetExceeded, MemoryUsage, estimate_peak, track_memory
+
+
+class RenderJob(NamedTuple):
+    """Trabajo de render serializable (pickle) para enviarlo a un proceso trabajador.
+
+    El exportador se identifica por su ruta ``modulo:Clase`` en lugar de enviar la
+    instancia, que contiene objetos FPDF/openpyxl no serializables.
+    """
+    exporter: str
+    data: Any
+    options: Optional[Dict] = None
+    init_args: Tuple = ()
+
+    @classmethod
+    def for_service(cls, service_cls: type, data: Any, options: Optional[Dict] = None, init_args: Tuple = ()) -> "RenderJob":
+        return cls(exporter_path(service_cls), data, options, tuple(init_args))
+
+
+def exporter_path(service_cls: type) -> str:
+    return f"{service_cls.__module__}:{service_cls.__qualname__}"
+
+
+@lru_cache(maxsize=None)
+def _load_exporter(path: str) -> type:
+    module_name, _, class_name = path.partition(":")
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+class SpilledFile(NamedTuple):
+    """Resultado de render grande escrito en un archivo temporal.
+
+    Evita enviar cientos de MB por el pipe del proceso trabajador y tenerlos en
+    memoria en el proceso principal; quien lo consume es responsable de borrarlo.
+    """
+    path: str
+    size: int
+
+
+RenderOutput = Union[bytes, SpilledFile]
+
+
+class RenderResult(NamedTuple):
+    """Archivo generado en el proceso trabajador y las métricas, spans, perfil y memoria del render"""
+    output: RenderOutput
+    observations: List[Tuple[str, Tuple]]
+    spans: List[tracing.Span]
+    profile: Optional[bytes] = None
+    memory: Optional[MemoryUsage] = None
+
+
+def run_render_job(job: RenderJob, profile: Optional[str] = None) -> RenderResult:
+    """Ejecuta un trabajo de render y devuelve el archivo generado.
+
+    Corre dentro del proceso trabajador; los ``generate_file`` asíncronos se
+    ejecutan con un bucle de eventos propio. Con ``profile`` (``cprofile`` o
+    ``sample``) el render se ejecuta bajo el perfilador. Se mide el pico de
+    memoria del proceso durante el render y la serialización.
+    """
+    service = _load_exporter(job.exporter)(*job.init_args)
+    with metrics.collect(service.get_file_extension().lstrip(".")) as observations, tracing.capture() as spans:
+        with track_memory() as usage:
+            with profiling.maybe_profile(profile) as capture:
+                result = service.generate_file(job.data, job.options)
+                if inspect.isawaitable(result):
+                    result = asyncio.run(result)
+            with metrics.timed_stage("serialize"):
+                output = _output(result)
+    return RenderResult(output, observations, spans, capture.data if capture is not None else None, usage)
+
+
+def run_merge_job(exporter: str, parts: List[RenderOutput], fmt: str = "", profile: Optional[str] = None) -> RenderResult:
+    """Une los archivos parciales de un render por fragmentos con ``merge_parts`` del exportador"""
+    with metrics.collect(fmt) as observations, tracing.capture() as spans, track_memory() as usage:
+        with metrics.timed_stage("render", merge=True), profiling.maybe_profile(profile) as capture:
+            merged = _load_exporter(exporter).merge_parts([read_output(part) for part in parts])
+        with metrics.timed_stage("serialize"):
+            output = _output(merged)
+    return RenderResult(output, observations, spans, capture.data if capture is not None else None, usage)
+
+
+def read_output(output: RenderOutput) -> bytes:
+    """Devuelve los bytes de un resultado de render, leyendo y borrando el archivo si se volcó a disco"""
+    if not isinstance(output, SpilledFile):
+        return output
+    try:
+        with open(output.path, "rb") as f:
+            return f.read()
+    finally:
+        discard_output(output)
+
+
+def discard_output(output: Any):
+    """Borra el archivo temporal de un resultado volcado a disco (no hace nada con bytes)"""
+    if isinstance(output, SpilledFile):
+        try:
+            os.unlink(output.path)
+        except OSError:
+            pass
+
+
+def _output(result: Union[bytes, io.BytesIO]) -> RenderOutput:
+    # Los resultados que superan RENDER_SPILL_BYTES viajan como ruta a un archivo temporal
+    view = memoryview(result) if isinstance(result, (bytes, bytearray)) else result.getbuffer()
+    try:
+        limit = _env_int("RENDER_SPILL_BYTES", 16 * 1024 * 1024)
+        if limit <= 0 or view.nbytes <= limit:
+            return result if isinstance(result, bytes) else bytes(view)
+        fd, path = tempfile.mkstemp(prefix="export-render-")
+        with os.fdopen(fd, "wb") as f:
+            f.write(view)
+        return SpilledFile(path, view.nbytes)
+    finally:
+        view.release()
+
+
+def _record_profile(mode: Optional[str], label: str, result: RenderResult):
+    if mode is not None and result.profile is not None:
+        profiling.record_profile(mode, label, result.profile)
+
+
+def _report_memory(label: str, fmt: str, results: List[RenderResult], estimate: Optional[int]):
+    # Un render por fragmentos se informa como una línea; las métricas van por proceso trabajador
+    usages = [result.memory for result in results if result.memory is not None]
+    for index, result in enumerate(results):
+        metrics.observe_memory(fmt, result.memory, estimate if index == 0 else None)
+    if not usages:
+        return
+    peak = max(usage.rss_peak for usage in usages)
+    growth = max(usage.rss_delta for usage in usages)
+    if growth < _env_int("RENDER_MEMORY_LOG_MB", 256) * MB:
+        return
+    line = f" Memoria de render {label} ({fmt}): pico RSS {peak / MB:.1f} MB, +{growth / MB:.1f} MB"
+    if len(usages) > 1:
+        line += f" en {len(usages)} procesos"
+    traced = [usage.tracemalloc_peak for usage in usages if usage.tracemalloc_peak is not None]
+    if traced:
+        line += f", tracemalloc {max(traced) / MB:.1f} MB"
+    if estimate is not None:
+        line += f", estimado {estimate / MB:.1f} MB"
+    print(line)
+
+
+class RenderStream:
+    """Render de una lista de reportes que llega por partes (páginas de VALERA).
+
+    Con un exportador por fragmentos (``SHARD_SIZE`` y ``merge_parts``) y al menos
+    dos procesos, cada ``SHARD_SIZE`` reportes recibidos se envían como fragmento
+    al pool mientras siguen llegando las páginas restantes; ``finish`` renderiza
+    el resto y une las partes en orden. Los demás exportadores acumulan los
+    reportes y se renderizan completos en ``finish``.
+
+    ``data`` conserva todos los reportes recibidos para calcular el ETag y la
+    clave del artefacto. Si al final no hace falta el render (ETag coincidente,
+    artefacto en caché, error de VALERA) ``discard`` lo abandona y borra los
+    fragmentos según terminen. Con presupuesto de memoria cada fragmento reserva
+    su estimación mientras se renderiza y la unión la del fragmento mayor.
+    """
+
+    def __init__(self, executor: "RenderExecutor", job: RenderJob, fmt: str):
+        self.executor = executor
+        self.job = job
+        self.fmt = fmt
+        self.data: List[Any] = job.data
+        self.shard_size = executor._stream_shard_size(job)
+        self.profile = profiling.profile_mode.get()
+        self.estimate: Optional[int] = None
+        self._largest = 0
+        self._dispatched = 0
+        self._tasks: List[asyncio.Task] = []
+
+    def add(self, report: Any):
+        self.data.append(report)
+        if self.shard_size and len(self.data) - self._dispatched >= self.shard_size:
+            self._dispatch()
+
+    def _dispatch(self):
+        shard = self.job._replace(data=self.data[self._dispatched:])
+        self._dispatched = len(self.data)
+        self._tasks.append(asyncio.ensure_future(self._render_shard(shard)))
+
+    async def _render_shard(self, shard: RenderJob) -> RenderResult:
+        async with self.executor._reserve_memory(shard, self.fmt, 0) as estimate:
+            if estimate is not None:
+                self.estimate = (self.estimate or 0) + estimate
+                self._largest = max(self._largest, estimate)
+            return await self.executor._submit(self.fmt, run_render_job, shard, self.profile)
+
+    async def finish(self) -> RenderOutput:
+        """Espera los fragmentos enviados, renderiza los reportes restantes y devuelve el archivo"""
+        if not self._tasks:
+            return await self.executor.render(self.job._replace(data=self.data), self.fmt)
+        if self._dispatched < len(self.data):
+            self._dispatch()
+        tasks, self._tasks = self._tasks, []
+        try:
+            parts = await asyncio.gather(*tasks, return_exceptions=True)
+            content = await self.executor._merge_parts(self.job, self.fmt, list(parts), self.profile, self.estimate, self._largest)
+        except MemoryBudgetExceeded:
+            raise
+        except Exception:
+            self.executor.failed += 1
+            raise
+        self.executor.completed += 1
+        return content
+
+    def discard(self):
+        """Abandona el render: los fragmentos en curso terminan y su archivo se borra"""
+        for task in self._tasks:
+            task.add_done_callback(_discard_task)
+        self._tasks = []
+
+
+def _discard_task(task: "asyncio.Future"):
+    if not task.cancelled() and task.exception() is None:
+        discard_output(task.result().output)
+
+
+def _discard_future(future: Future):
+    # Resultado de un render cuyo awaiter se canceló (se ejecuta en el hilo del pool)
+    if not future.cancelled() and future.exception() is None:
+        discard_output(future.result().output)
+
+
+def _init_worker(exporters: Tuple[str, ...]):
+    # Precarga los exportadores (fpdf, openpyxl, python-docx) al arrancar el trabajador
+    for path in exporters:
+        try:
+            _load_exporter(path)
+        except Exception:
+            pass
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+class RenderExecutor:
+    """Motor de ejecución de renders CPU-bound fuera del bucle de eventos.
+
+    Los renders (fpdf, openpyxl, python-docx) se envían a un ``ProcessPoolExecutor``
+    para escalar en varios núcleos sin competir por el GIL con las peticiones; las
+    operaciones de disco/bloqueantes van a un pool de hilos separado. Cada formato
+    tiene un límite de renders simultáneos para que un tipo de exportación pesada no
+    acapare todos los trabajadores.
+
+    Configuración por variables de entorno:
+        RENDER_PROCESS_WORKERS: procesos de render (default núcleos disponibles; 0 = renderizar en hilos)
+        RENDER_IO_WORKERS: hilos para E/S bloqueante (default 8)
+        RENDER_LIMIT_PDF / RENDER_LIMIT_DOCX / RENDER_LIMIT_XLSX / ...: renders simultáneos por formato
+            (default igual al número de procesos)
+        RENDER_START_METHOD: método de arranque de procesos (default ``spawn``)
+        RENDER_SPILL_BYTES: tamaño a partir del cual el resultado se devuelve en un archivo
+            temporal en lugar de bytes (default 16 MB; 0 = nunca)
+        RENDER_MEMORY_BUDGET_MB / RENDER_MEMORY_QUEUE_TIMEOUT: presupuesto de memoria por
+            trabajador (ver ``MemoryBudget``)
+        RENDER_MEMORY_TRACKING: medición de memoria de cada render (``rss``, ``tracemalloc`` u ``off``)
+        RENDER_MEMORY_LOG_MB: crecimiento mínimo de memoria para registrar el render en el log (default 256; 0 = todos)
+    """
+
+    def __init__(
+        self,
+        process_workers: Optional[int] = None,
+        io_workers: Optional[int] = None,
+        format_limits: Optional[Dict[str, int]] = None,
+        preload: Tuple[str, ...] = (),
+    ):
+        self.process_workers = process_workers if process_workers is not None else _env_int("RENDER_PROCESS_WORKERS", os.cpu_count() or 1)
+        self.io_workers = io_workers if io_workers is not None else _env_int("RENDER_IO_WORKERS", 8)
+        self.default_limit = max(1, self.process_workers or self.io_workers)
+        self.format_limits = dict(format_limits or {})
+        self.preload = tuple(preload)
+        self._io_pool = ThreadPoolExecutor(max_workers=max(1, self.io_workers), thread_name_prefix="export-io")
+        self._process_pool: Optional[Executor] = self._create_process_pool()
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._waiting: Dict[str, int] = {}
+        self._running: Dict[str, int] = {}
+        self.memory = MemoryBudget(self.process_workers or self.default_limit)
+        self.completed = 0
+        self.failed = 0
+
+    def _create_process_pool(self) -> Optional[Executor]:
+        if self.process_workers <= 0:
+            return None
+        context = multiprocessing.get_context(os.getenv("RENDER_START_METHOD", "spawn"))
+        return ProcessPoolExecutor(
+            max_workers=self.process_workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(self.preload,),
+        )
+
+    def limit_for(self, file_format: str) -> int:
+        fmt = file_format.lower().lstrip(".")
+        if fmt not in self.format_limits:
+            self.format_limits[fmt] = _env_int(f"RENDER_LIMIT_{fmt.upper()}", self.default_limit)
+        return max(1, self.format_limits[fmt])
+
+    def _semaphore(self, file_format: str) -> asyncio.Semaphore:
+        fmt = file_format.lower().lstrip(".")
+        if fmt not in self._semaphores:
+            self._semaphores[fmt] = asyncio.Semaphore(self.limit_for(fmt))
+        return self._semaphores[fmt]
+
+    async def render(self, job: RenderJob, file_format: str) -> RenderOutput:
+        """Renderiza ``job`` en el pool de procesos respetando el límite del formato.
+
+        Devuelve los bytes del archivo, o un ``SpilledFile`` si supera
+        ``RENDER_SPILL_BYTES``. Los exportadores con ``SHARD_SIZE`` y
+        ``merge_parts`` (PDF multi-reporte) reciben listas grandes repartidas en
+        fragmentos que se renderizan en paralelo en distintos procesos y luego se
+        unen en orden.
+
+        Con ``RENDER_MEMORY_BUDGET_MB`` el render reserva antes su memoria
+        estimada y puede esperar o rechazarse con ``MemoryBudgetExceeded``.
+        """
+        fmt = file_format.lower().lstrip(".")
+        profile = profiling.profile_mode.get()
+        try:
+            shard_size = self._shard_size(job, fmt)
+            async with self._reserve_memory(job, fmt, shard_size) as estimate:
+                if shard_size:
+                    content = await self._render_sharded(job, fmt, shard_size, profile, estimate)
+                else:
+                    result = await self._submit(fmt, run_render_job, job, profile)
+                    metrics.replay(result.observations)
+                    tracing.replay(result.spans)
+                    _record_profile(profile, job.exporter, result)
+                    _report_memory(job.exporter.rpartition(":")[2], fmt, [result], estimate)
+                    content = result.output
+        except MemoryBudgetExceeded:
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+        self.completed += 1
+        return content
+
+    @asynccontextmanager
+    async def _reserve_memory(self, job: RenderJob, fmt: str, shard_size: int) -> AsyncIterator[Optional[int]]:
+        # Estima la memoria del render (por fragmento si se reparte) y la reserva en el presupuesto
+        if not self.memory.enabled:
+            yield None
+            return
+        exporter = _load_exporter(job.exporter)
+        if shard_size:
+            chunks = [job.data[i:i + shard_size] for i in range(0, len(job.data), shard_size)]
+        else:
+            chunks = [job.data]
+        estimates = await self.run_io(lambda: [estimate_peak(exporter, chunk) for chunk in chunks])
+        queued_at = time.time_ns()
+        async with self.memory.reserve(sum(estimates), max(estimates)):
+            # La espera por memoria libre también aparece como ``queue`` en Server-Timing
+            acquired_at = time.time_ns()
+            if acquired_at - queued_at > 1_000_000:
+                tracing.record("queue", queued_at, acquired_at, format=fmt, reason="memory")
+            yield sum(estimates)
+
+    def _shard_size(self, job: RenderJob, fmt: str) -> int:
+        if self._process_pool is None or self.process_workers < 2 or not isinstance(job.data, list):
+            return 0
+        exporter = _load_exporter(job.exporter)
+        min_size = getattr(exporter, "SHARD_SIZE", 0)
+        if not min_size or not hasattr(exporter, "merge_parts") or len(job.data) < 2 * min_size:
+            return 0
+        # Un fragmento por trabajador disponible, nunca menor que el mínimo configurado
+        workers = min(self.process_workers, self.limit_for(fmt))
+        return max(min_size, math.ceil(len(job.data) / workers))
+
+    def stream(self, job: RenderJob, file_format: str) -> "RenderStream":
+        """Render de ``job`` cuyos reportes llegan por partes (ver ``RenderStream``)"""
+        return RenderStream(self, job._replace(data=[]), file_format.lower().lstrip("."))
+
+    def _stream_shard_size(self, job: RenderJob) -> int:
+        # Sin el total de reportes cada fragmento tiene el mínimo del exportador
+        if self._process_pool is None or self.process_workers < 2:
+            return 0
+        exporter = _load_exporter(job.exporter)
+        return getattr(exporter, "SHARD_SIZE", 0) if hasattr(exporter, "merge_parts") else 0
+
+    async def _render_sharded(self, job: RenderJob, fmt: str, shard_size: int, profile: Optional[str] = None, estimate: Optional[int] = None) -> RenderOutput:
+        shards = [job._replace(data=job.data[i:i + shard_size]) for i in range(0, len(job.data), shard_size)]
+        parts = await asyncio.gather(*(self._submit(fmt, run_render_job, shard, profile) for shard in shards), return_exceptions=True)
+        return await self._merge_parts(job, fmt, list(parts), profile, estimate)
+
+    async def _merge_parts(self, job: RenderJob, fmt: str, parts: List[Any], profile: Optional[str], estimate: Optional[int], reserve: int = 0) -> RenderOutput:
+        # Une en orden los fragmentos renderizados; ``reserve`` es la memoria a reservar para la unión
+        errors = [part for part in parts if isinstance(part, BaseException)]
+        if errors:
+            for part in parts:
+                if not isinstance(part, BaseException):
+                    discard_output(part.output)
+            raise errors[0]
+        try:
+            async with self.memory.reserve(reserve):
+                merged = await self._submit(fmt, run_merge_job, job.exporter, [part.output for part in parts], fmt, profile)
+        except BaseException:
+            for part in parts:
+                discard_output(part.output)
+            raise
+        content = merged.output
+        # Las métricas de salida de los fragmentos se registran como un solo archivo
+        shard_observations = [obs for part in parts for obs in part.observations]
+        size = content.size if isinstance(content, SpilledFile) else len(content)
+        metrics.replay(metrics.combine_outputs(shard_observations + merged.observations, size))
+        tracing.replay([sp for part in parts for sp in part.spans] + merged.spans)
+        for index, part in enumerate(parts, 1):
+            _record_profile(profile, f"{job.exporter} fragmento {index}/{len(parts)}", part)
+        _record_profile(profile, f"{job.exporter} unión", merged)
+        _report_memory(job.exporter.rpartition(":")[2], fmt, list(parts) + [merged], estimate)
+        return content
+
+    async def _submit(self, fmt: str, fn: Callable, *args) -> Any:
+        loop = asyncio.get_running_loop()
+        self._waiting[fmt] = self._waiting.get(fmt, 0) + 1
+        acquired = False
+        queued_at = time.time_ns()
+        try:
+            async with self._semaphore(fmt):
+                acquired = True
+                self._waiting[fmt] -= 1
+                # Espera por un cupo del formato: aparece como ``queue`` en Server-Timing
+                tracing.record("queue", queued_at, time.time_ns(), format=fmt)
+                self._running[fmt] = self._running.get(fmt, 0) + 1
+                pool = self._process_pool or self._io_pool
+                future = pool.submit(fn, *args)
+                try:
+                    return await asyncio.wrap_future(future, loop=loop)
+                except asyncio.CancelledError:
+                    # Quien esperaba se canceló pero el proceso sigue renderizando: su archivo se borra al terminar
+                    future.add_done_callback(_discard_future)
+                    raise
+                except BrokenProcessPool:
+                    # Un trabajador murió (p. ej. por memoria); se recrea el pool para las siguientes peticiones
+                    self._restart_process_pool(pool)
+                    raise
+                finally:
+                    self._running[fmt] -= 1
+        finally:
+            if not acquired:
+                self._waiting[fmt] -= 1
+
+    async def run_io(self, fn: Callable, *args) -> Any:
+        """Ejecuta una operación bloqueante (disco, red síncrona) en el pool de E/S"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._io_pool, fn, *args)
+
+    def _restart_process_pool(self, broken: Executor):
+        # Varios renders fallan a la vez con el mismo pool roto; solo el primero lo recrea
+        if self._process_pool is not broken:
+            return
+        self._process_pool = self._create_process_pool()
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        formats = set(self._semaphores) | set(self.format_limits)
+        return {
+            "process_workers": self.process_workers,
+            "io_workers": self.io_workers,
+            "completed": self.completed,
+            "failed": self.failed,
+            "memory": self.memory.stats(),
+            "formats": {
+                fmt: {
+                    "limit": self.limit_for(fmt),
+                    "running": self._running.get(fmt, 0),
+                    "queued": self._waiting.get(fmt, 0),
+                }
+                for fmt in sorted(formats)
+            },
+        }
+
+    def shutdown(self, wait: bool = True):
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=wait, cancel_futures=True)
+        self._io_pool.shutdown(wait=wait, cancel_futures=True)
+
+
+_executor: Optional[RenderExecutor] = None
+
+
+def init_executor(**kwargs) -> RenderExecutor:
+    """Crea el motor de render compartido (se invoca desde ``lifespan`` en ``app/main.py``)"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+    _executor = RenderExecutor(**kwargs)
+    return _executor
+
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown()
+        _executor = None
+
+
+def get_executor() -> RenderExecutor:
+    """Devuelve el motor compartido; lo crea con la configuración por defecto si no existe"""
+    global _executor
+    if _executor is None:
+        _executor = RenderExecutor()
+    return _executor
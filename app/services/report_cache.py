@@ -0,0 +1,162 @@
+import os
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+# Política de caché de la petición en curso (cabecera Cache-Control)
+_bypass_cache: ContextVar[bool] = ContextVar("report_cache_bypass", default=False)
+_skip_store: ContextVar[bool] = ContextVar("report_cache_skip_store", default=False)
+
+
+def set_cache_policy(cache_control: Optional[str]):
+    """Aplica la cabecera Cache-Control de la petición al contexto actual.
+
+    ``no-cache`` obliga a ir a VALERA (el resultado sí refresca la caché) y
+    ``no-store`` además evita guardar la respuesta.
+    """
+    directives = {d.strip().lower() for d in (cache_control or "").split(",")}
+    no_store = "no-store" in directives
+    _bypass_cache.set(no_store or "no-cache" in directives)
+    _skip_store.set(no_store)
+
+
+def cache_bypassed() -> bool:
+    return _bypass_cache.get()
+
+
+def store_skipped() -> bool:
+    return _skip_store.get()
+
+
+class CacheEntry:
+    __slots__ = ("value", "size", "stored_at", "expires_at", "updated_at")
+
+    def __init__(self, value: Any, size: int, ttl: float, updated_at: Optional[str] = None):
+        now = time.monotonic()
+        self.value = value
+        self.size = size
+        self.stored_at = now
+        self.expires_at = now + ttl
+        self.updated_at = updated_at
+
+    @property
+    def fresh(self) -> bool:
+        return time.monotonic() < self.expires_at
+
+
+class ReportCache:
+    """Caché en memoria LRU con TTL para respuestas de VALERA.
+
+    Está acotada por número de entradas y por bytes (tamaño del JSON recibido).
+    Las entradas vencidas no se descartan: se conservan para revalidarlas
+    comparando ``updatedAt`` sin volver a descargar el reporte.
+
+    Configuración por variables de entorno:
+        REPORT_CACHE_ENABLED: habilita la caché (default true)
+        REPORT_CACHE_TTL: segundos que una entrada se sirve sin revalidar (default 60)
+        REPORT_CACHE_MAX_ENTRIES: entradas máximas (default 1000)
+        REPORT_CACHE_MAX_BYTES: bytes máximos (default 64 MB)
+    """
+
+    def __init__(
+        self,
+        ttl: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        enabled: Optional[bool] = None,
+    ):
+        self.ttl = ttl if ttl is not None else float(os.getenv("REPORT_CACHE_TTL", "60"))
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv("REPORT_CACHE_MAX_ENTRIES", "1000"))
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.getenv("REPORT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+        if enabled is None:
+            enabled = os.getenv("REPORT_CACHE_ENABLED", "true").strip().lower() in ("1", "true", "yes", "on")
+        self.enabled = enabled
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        # Último updatedAt observado por id de reporte (alimentado por los listados)
+        self._updated_at: "OrderedDict[Any, Tuple[str, float]]" = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.revalidated = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[CacheEntry]:
+        """Devuelve la entrada (vigente o vencida) y la marca como usada recientemente"""
+        if not self.enabled or cache_bypassed():
+            return None
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        if entry.fresh:
+            self.hits += 1
+        else:
+            self.stale += 1
+        return entry
+
+    def put(self, key: Hashable, value: Any, size: int, updated_at: Optional[str] = None):
+        if not self.enabled or store_skipped():
+            return
+        if size > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.bytes -= old.size
+        self._entries[key] = CacheEntry(value, size, self.ttl, updated_at)
+        self.bytes += size
+        self._evict()
+
+    def refresh(self, key: Hashable):
+        """Extiende el TTL de una entrada tras revalidarla con éxito"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry.expires_at = time.monotonic() + self.ttl
+            self.revalidated += 1
+
+    def observe_updated_at(self, report_id: Any, updated_at: Optional[str]):
+        """Registra el ``updatedAt`` visto en un listado para revalidar entradas sin petición"""
+        if not self.enabled or report_id is None or not updated_at:
+            return
+        self._updated_at[report_id] = (updated_at, time.monotonic())
+        self._updated_at.move_to_end(report_id)
+        while len(self._updated_at) > self.max_entries * 10:
+            self._updated_at.popitem(last=False)
+
+    def known_updated_at(self, report_id: Any, since: float) -> Optional[str]:
+        """``updatedAt`` observado para un reporte después del instante ``since``"""
+        seen = self._updated_at.get(report_id)
+        if seen is None or seen[1] < since:
+            return None
+        return seen[0]
+
+    def clear(self):
+        self._entries.clear()
+        self._updated_at.clear()
+        self.bytes = 0
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self.bytes > self.max_bytes):
+            _, entry = self._entries.popitem(last=False)
+            self.bytes -= entry.size
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.stale + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "stale": self.stale,
+            "misses": self.misses,
+            "revalidated": self.revalidated,
+            "evictions": self.evictions,
+            "hit_ratio": round((self.hits + self.revalidated) / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,197 @@
+import os
+import time
+import hashlib
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Mapping, Optional, Sequence, Tuple
+from urllib.parse import parse_qs
+
+""" Identificación de quién pide cada exportación (tenant) y sus límites de ritmo.
+
+El tenant es, en orden: una API key de ``TENANT_API_KEYS`` en la cabecera
+``TENANT_HEADER`` (default ``X-API-Key``), guardada como ``key:<hash>`` para no
+exponer la clave en métricas ni en ``/stats``; el ``userId`` de la ruta o de la
+query (``user:<id>``); y como último recurso la dirección del cliente
+(``ip:<dirección>``), o ``anonymous`` si no se conoce. Una clave desconocida cae
+en el tenant compartido ``unverified`` (cambiar de clave no da un token bucket nuevo).
+Detrás de un gateway todas las peticiones llegan desde la misma dirección, por
+lo que el ``userId`` es lo que separa a los usuarios.
+``AdmissionController`` reparte los cupos de cada clase entre tenants con colas
+justas ponderadas y limita el ritmo de cada uno con un token bucket.
+"""
+
+ANONYMOUS = "anonymous"
+UNVERIFIED = "unverified"
+
+
+def key_tenant(key: bytes) -> str:
+    """Tenant de una API key: ``key:`` y los primeros 12 caracteres de su SHA-256"""
+    return "key:" + hashlib.sha256(key).hexdigest()[:12]
+
+
+class TokenBucket:
+    """Token bucket: ``rate`` tokens por segundo hasta ``burst``; cada exportación consume su costo"""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, cost: float) -> float:
+        """Consume ``cost`` tokens y devuelve 0, o los segundos que faltan para tenerlos (sin consumir)"""
+        self._refill()
+        cost = min(cost, self.burst)
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        return (cost - self.tokens) / self.rate
+
+    def refund(self, cost: float):
+        """Devuelve los tokens de una exportación que no llegó a admitirse"""
+        self.tokens = min(self.burst, self.tokens + min(cost, self.burst))
+
+
+class TenantState:
+    """Peso, token bucket y contadores de un tenant"""
+
+    __slots__ = ("id", "label", "weight", "bucket", "waiting", "running", "admitted", "completed", "rejected", "throttled", "wait_seconds")
+
+    def __init__(self, id: str, label: str, weight: float, bucket: Optional[TokenBucket]):
+        self.id = id
+        self.label = label
+        self.weight = weight
+        self.bucket = bucket
+        self.waiting = 0
+        self.running = 0
+        self.admitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.throttled = 0
+        self.wait_seconds = 0.0
+
+    @property
+    def idle(self) -> bool:
+        return self.waiting == 0 and self.running == 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "weight": self.weight,
+            "waiting": self.waiting,
+            "running": self.running,
+            "admitted": self.admitted,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "throttled": self.throttled,
+            "avg_wait_seconds": round(self.wait_seconds / self.admitted, 3) if self.admitted else None,
+            "tokens": round(self.bucket.tokens, 2) if self.bucket is not None else None,
+        }
+
+
+class TenantRegistry:
+    """Identificación y estado de los tenants vistos recientemente.
+
+    Configuración por variables de entorno:
+        TENANT_HEADER: cabecera con la API key del cliente (default X-API-Key)
+        TENANT_API_KEYS: API keys válidas separadas por comas; cualquier otra es ``unverified``
+        TENANT_WEIGHTS: pesos en las colas justas, p. ej. ``user:7=2,key:0a1b2c3d4e5f=4`` (default 1)
+        TENANT_RATE: tokens por segundo de cada tenant (default 0 = sin límite de ritmo)
+        TENANT_BURST: tokens máximos acumulados (default 20)
+        TENANT_MAX_TRACKED: tenants conservados; se descartan los inactivos más antiguos (default 1000)
+        TENANT_METRICS_MAX: tenants con serie propia en /metrics; el resto se agrupa como ``other`` (default 50)
+    """
+
+    def __init__(self):
+        self.header = os.getenv("TENANT_HEADER", "X-API-Key").strip().lower().encode("latin-1")
+        # Se guarda el hash de cada clave; la de la petición se compara por su hash
+        self._api_keys = {
+            hashlib.sha256(key.encode("utf-8")).digest(): key_tenant(key.encode("utf-8"))
+            for key in (item.strip() for item in os.getenv("TENANT_API_KEYS", "").split(","))
+            if key
+        }
+        self.weights = _parse_weights(os.getenv("TENANT_WEIGHTS", ""))
+        self.rate = _env_float("TENANT_RATE", 0.0)
+        self.burst = _env_float("TENANT_BURST", 20.0)
+        self.max_tracked = max(1, int(_env_float("TENANT_MAX_TRACKED", 1000)))
+        self.metrics_max = int(_env_float("TENANT_METRICS_MAX", 50))
+        self._tenants: "OrderedDict[str, TenantState]" = OrderedDict()
+        self._labels: Dict[str, str] = {}
+
+    def identify(
+        self,
+        headers: Iterable[Tuple[bytes, bytes]],
+        client: Optional[Sequence[Any]] = None,
+        path_params: Optional[Mapping[str, Any]] = None,
+        query_string: bytes = b"",
+    ) -> str:
+        """Tenant de una petición a partir de sus cabeceras ASGI, parámetros de ruta, query y
+        dirección del cliente (``scope["client"]``)"""
+        for name, value in headers:
+            if name == self.header and value.strip():
+                return self._api_keys.get(hashlib.sha256(value.strip()).digest(), UNVERIFIED)
+        user_id = (path_params or {}).get("userId")
+        if user_id is None and query_string:
+            user_id = (parse_qs(query_string.decode("latin-1")).get("userId") or [None])[0]
+        if user_id is not None and str(user_id).strip():
+            return f"user:{str(user_id).strip()}"
+        if client and client[0]:
+            return f"ip:{client[0]}"
+        return ANONYMOUS
+
+    def get(self, tenant: str) -> TenantState:
+        state = self._tenants.get(tenant)
+        if state is None:
+            bucket = TokenBucket(self.rate, self.burst) if self.rate > 0 else None
+            state = self._tenants[tenant] = TenantState(tenant, self._label(tenant), self.weights.get(tenant, 1.0), bucket)
+            self._evict()
+        else:
+            self._tenants.move_to_end(tenant)
+        return state
+
+    def _label(self, tenant: str) -> str:
+        # Las series de Prometheus por tenant se limitan para no crecer sin cota
+        if tenant not in self._labels:
+            if len(self._labels) >= self.metrics_max:
+                return "other"
+            self._labels[tenant] = tenant
+        return self._labels[tenant]
+
+    def _evict(self):
+        if len(self._tenants) <= self.max_tracked:
+            return
+        for tenant in [key for key, state in self._tenants.items() if state.idle]:
+            if len(self._tenants) <= self.max_tracked:
+                break
+            del self._tenants[tenant]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "tenants": {tenant: state.stats() for tenant, state in reversed(self._tenants.items())},
+        }
+
+
+def _parse_weights(value: str) -> Dict[str, float]:
+    weights = {}
+    for item in value.split(","):
+        tenant, _, weight = item.strip().rpartition("=")
+        try:
+            if tenant and float(weight) > 0:
+                weights[tenant] = float(weight)
+        except ValueError:
+            print(f" Peso de tenant inválido en TENANT_WEIGHTS: {item}")
+    return weights
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
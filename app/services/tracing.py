@@ -0,0 +1,326 @@
+import os
+import json
+import time
+import queue
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import requests
+
+""" Trazas por petición: spans de cada etapa de la exportación y cabecera ``Server-Timing``.
+
+Cada petición (``TracingMiddleware``) o trabajo en segundo plano abre una traza;
+``span`` mide una etapa dentro de ella y no hace nada fuera de una traza. Los
+spans de los procesos de render se capturan con ``capture`` y se devuelven con
+el archivo para unirlos a la traza del proceso principal (``replay``).
+
+Opcionalmente las trazas terminadas se exportan en formato OTLP/JSON de
+OpenTelemetry a un archivo (una traza por línea) o a un colector HTTP.
+"""
+
+# Etapas resumidas en Server-Timing, en este orden
+SERVER_TIMING_STAGES = ("fetch", "normalize", "queue", "render", "serialize")
+
+
+def _new_id(size: int) -> str:
+    return os.urandom(size).hex()
+
+
+class Span:
+    """Intervalo medido de una etapa; los tiempos son ns de reloj (comparables entre procesos)"""
+
+    __slots__ = ("name", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, parent_id: Optional[str], start_ns: int, attributes: Dict[str, Any]):
+        self.name = name
+        self.span_id = _new_id(8)
+        self.parent_id = parent_id
+        self.start_ns = start_ns
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+
+class Trace:
+    """Spans terminados de una petición o trabajo"""
+
+    __slots__ = ("trace_id", "remote_parent_id", "spans")
+
+    def __init__(self, trace_id: Optional[str] = None, remote_parent_id: Optional[str] = None):
+        self.trace_id = trace_id or _new_id(16)
+        self.remote_parent_id = remote_parent_id
+        self.spans: List[Span] = []
+
+    def stage_durations(self) -> List[Tuple[str, float]]:
+        """Milisegundos de cada etapa de ``SERVER_TIMING_STAGES`` presente en la traza.
+
+        Los spans en paralelo de una misma etapa (páginas de VALERA, formatos de
+        un ZIP) se unen: la duración es el tiempo en que hubo al menos uno activo.
+        """
+        intervals: Dict[str, List[Tuple[int, int]]] = {}
+        for sp in self.spans:
+            if sp.name in SERVER_TIMING_STAGES and sp.end_ns is not None:
+                intervals.setdefault(sp.name, []).append((sp.start_ns, sp.end_ns))
+        return [(stage, _union_ns(intervals[stage]) / 1e6) for stage in SERVER_TIMING_STAGES if stage in intervals]
+
+    def server_timing(self) -> str:
+        return ", ".join(f"{stage};dur={elapsed:.1f}" for stage, elapsed in self.stage_durations())
+
+
+def _union_ns(intervals: List[Tuple[int, int]]) -> int:
+    total = 0
+    current_start = current_end = None
+    for start, end in sorted(intervals):
+        if current_end is None or start > current_end:
+            if current_end is not None:
+                total += current_end - current_start
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    if current_end is not None:
+        total += current_end - current_start
+    return total
+
+
+_trace: ContextVar[Optional[Trace]] = ContextVar("export_trace", default=None)
+_current_span: ContextVar[Optional[str]] = ContextVar("export_span", default=None)
+
+
+def current_trace() -> Optional[Trace]:
+    return _trace.get()
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Mide una etapa dentro de la traza actual; devuelve ``None`` si no hay traza"""
+    trace = _trace.get()
+    if trace is None:
+        yield None
+        return
+    sp = Span(name, _current_span.get(), time.time_ns(), attributes)
+    token = _current_span.set(sp.span_id)
+    try:
+        yield sp
+    except BaseException as e:
+        sp.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        sp.end_ns = time.time_ns()
+        _current_span.reset(token)
+        trace.spans.append(sp)
+
+
+def record(name: str, start_ns: int, end_ns: int, **attributes: Any) -> Optional[Span]:
+    """Agrega un span ya medido (p. ej. una espera) como hijo del span actual"""
+    trace = _trace.get()
+    if trace is None:
+        return None
+    sp = Span(name, _current_span.get(), start_ns, attributes)
+    sp.end_ns = end_ns
+    trace.spans.append(sp)
+    return sp
+
+
+@contextmanager
+def trace(name: str, traceparent: Optional[str] = None, **attributes: Any) -> Iterator[Trace]:
+    """Abre una traza con un span raíz ``name`` y la exporta al terminar.
+
+    ``traceparent`` (cabecera W3C) permite continuar la traza del cliente.
+    """
+    trace_id, parent_id = _parse_traceparent(traceparent)
+    current = Trace(trace_id, parent_id)
+    trace_token = _trace.set(current)
+    try:
+        with span(name, **attributes) as root:
+            root.parent_id = parent_id
+            yield current
+    finally:
+        _trace.reset(trace_token)
+        exporter = get_exporter()
+        if exporter is not None:
+            exporter.submit(current)
+
+
+def _parse_traceparent(value: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    # 00-<trace-id 32 hex>-<parent-id 16 hex>-<flags>
+    parts = (value or "").strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None, None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None, None
+    if set(parts[1]) == {"0"} or set(parts[2]) == {"0"}:
+        return None, None
+    return parts[1].lower(), parts[2].lower()
+
+
+@contextmanager
+def capture() -> Iterator[List[Span]]:
+    """Traza aislada para un proceso de render; la lista de spans se pasa luego a ``replay``"""
+    captured = Trace()
+    trace_token = _trace.set(captured)
+    span_token = _current_span.set(None)
+    try:
+        yield captured.spans
+    finally:
+        _current_span.reset(span_token)
+        _trace.reset(trace_token)
+
+
+def replay(spans: List[Span]):
+    """Une a la traza actual los spans capturados en un proceso de render, bajo el span actual"""
+    trace = _trace.get()
+    if trace is None:
+        return
+    parent_id = _current_span.get()
+    for sp in spans:
+        if sp.parent_id is None:
+            sp.parent_id = parent_id
+        trace.spans.append(sp)
+
+
+# Exportación OTLP/JSON
+
+def to_otlp(trace: Trace, service_name: str) -> Dict[str, Any]:
+    """Traza en el formato JSON de OTLP (``ExportTraceServiceRequest``)"""
+    root_ids = {sp.span_id for sp in trace.spans if sp.parent_id == trace.remote_parent_id}
+    spans = []
+    for sp in trace.spans:
+        item = {
+            "traceId": trace.trace_id,
+            "spanId": sp.span_id,
+            "name": sp.name,
+            # 2 = SERVER para el span raíz de la petición, 1 = INTERNAL para las etapas
+            "kind": 2 if sp.span_id in root_ids else 1,
+            "startTimeUnixNano": str(sp.start_ns),
+            "endTimeUnixNano": str(sp.end_ns or sp.start_ns),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in sp.attributes.items()],
+        }
+        if sp.parent_id:
+            item["parentSpanId"] = sp.parent_id
+        if sp.error:
+            item["status"] = {"code": 2, "message": sp.error}
+        spans.append(item)
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]},
+            "scopeSpans": [{"scope": {"name": __name__}, "spans": spans}],
+        }]
+    }
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class SpanExporter:
+    """Envía las trazas terminadas a un archivo JSONL y/o a un colector OTLP/HTTP.
+
+    La escritura y el envío se hacen en un hilo propio para no bloquear el bucle
+    de eventos; si la cola se llena las trazas nuevas se descartan.
+
+    Configuración por variables de entorno:
+        TRACE_EXPORT_FILE: archivo donde se agrega una traza OTLP/JSON por línea
+        TRACE_EXPORT_URL: endpoint OTLP/HTTP JSON (p. ej. http://localhost:4318/v1/traces)
+        TRACE_SERVICE_NAME: ``service.name`` de las trazas (default export-files-microservice)
+        TRACE_EXPORT_QUEUE: trazas pendientes máximas (default 1000)
+    """
+
+    def __init__(self, path: Optional[str] = None, url: Optional[str] = None, service_name: Optional[str] = None, max_queued: Optional[int] = None):
+        self.path = path if path is not None else os.getenv("TRACE_EXPORT_FILE") or None
+        self.url = url if url is not None else os.getenv("TRACE_EXPORT_URL") or None
+        self.service_name = service_name or os.getenv("TRACE_SERVICE_NAME", "export-files-microservice")
+        self._queue: "queue.Queue[Optional[Trace]]" = queue.Queue(max_queued or int(os.getenv("TRACE_EXPORT_QUEUE", "1000")))
+        self.exported = 0
+        self.dropped = 0
+        self.failed = 0
+        self._thread: Optional[threading.Thread] = None
+        if self.enabled:
+            self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+            self._thread.start()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path or self.url)
+
+    def submit(self, trace: Trace):
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        session = requests.Session() if self.url else None
+        while True:
+            trace = self._queue.get()
+            if trace is None:
+                break
+            payload = json.dumps(to_otlp(trace, self.service_name), separators=(",", ":"))
+            try:
+                if self.path:
+                    with open(self.path, "a", encoding="utf-8") as f:
+                        f.write(payload + "\n")
+                if session is not None:
+                    session.post(self.url, data=payload, headers={"Content-Type": "application/json"}, timeout=5).raise_for_status()
+                self.exported += 1
+            except Exception as e:
+                self.failed += 1
+                print(f" Error exportando traza {trace.trace_id}: {e}")
+        if session is not None:
+            session.close()
+
+    def shutdown(self, timeout: float = 5.0):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "file": self.path,
+            "url": self.url,
+            "queued": self._queue.qsize(),
+            "exported": self.exported,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+
+_exporter: Optional[SpanExporter] = None
+
+
+def init_tracing(**kwargs) -> Optional[SpanExporter]:
+    """Crea el exportador de trazas si hay destino configurado (se invoca desde ``lifespan``)"""
+    global _exporter
+    shutdown_tracing()
+    exporter = SpanExporter(**kwargs)
+    _exporter = exporter if exporter.enabled else None
+    return _exporter
+
+
+def shutdown_tracing():
+    global _exporter
+    if _exporter is not None:
+        _exporter.shutdown()
+        _exporter = None
+
+
+def get_exporter() -> Optional[SpanExporter]:
+    return _exporter
+
+
+def server_timing_enabled() -> bool:
+    return os.getenv("SERVER_TIMING_ENABLED", "true").strip().lower() not in ("0", "false", "no", "off")
@@ -1,6 +1,17 @@
 import os
-from typing import Any, Dict, List, Iterable, Tuple, Mapping, Union
+import math
+import time
+import asyncio
+import importlib.util
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Iterable, Tuple, Mapping, Optional, Union
+import httpx
 import requests
+from .report_cache import ReportCache
+from .metrics import observe_fetch
+from .tracing import span
 
 
 def _get_base_url() -> str:
@@ -8,6 +19,27 @@ def _get_base_url() -> str:
     return base.rstrip("/")
 
 
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
 def get_reports() -> List[Dict[str, Any]]:
     """Obtiene todos los reportes LORA desde la API VALERA"""
     url = f"{_get_base_url()}/lora-report"
@@ -42,3 +74,411 @@ def get_reports_by_filters(filters: Union[Mapping[str, Any], Iterable[Tuple[str,
     print(resp)
     resp.raise_for_status()
     return resp.json()
+
+
+class SingleFlight:
+    """Agrupa peticiones idénticas concurrentes en una sola ejecución.
+
+    El primer llamador lanza la petición en una tarea propia; los que llegan con la
+    misma clave mientras sigue en vuelo esperan esa tarea y reciben el mismo
+    resultado ya parseado. La cancelación de un llamador no cancela la petición
+    compartida.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.requests = 0
+        self.fetches = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self.requests += 1
+        task = self._inflight.get(key)
+        if task is None:
+            self.fetches += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, k=key: self._forget(k, t))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Future):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Marca la excepción como consumida aunque nadie siga esperando
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "requests": self.requests,
+            "fetches": self.fetches,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._inflight),
+        }
+
+
+class ValeraClient:
+    """Cliente asíncrono de la API VALERA con pool de conexiones persistentes.
+
+    Una única instancia se comparte en todo el proceso (ver ``init_client``) para
+    reutilizar conexiones TCP/TLS entre exportaciones en lugar de abrir una por llamada.
+
+    Configuración por variables de entorno:
+        VALERA_API: URL base de la API
+        VALERA_MAX_CONNECTIONS: conexiones simultáneas máximas (default 100)
+        VALERA_MAX_KEEPALIVE: conexiones ociosas que se mantienen abiertas (default 20)
+        VALERA_KEEPALIVE_EXPIRY: segundos antes de cerrar una conexión ociosa (default 30)
+        VALERA_HTTP2: habilita HTTP/2 si el paquete ``h2`` está instalado (default false)
+        VALERA_TIMEOUT: timeout por defecto en segundos (default 30)
+        VALERA_PAGE_SIZE: reportes por página al paginar getReportFilter (default 100)
+        VALERA_PAGE_CONCURRENCY: páginas descargadas en paralelo (default 4)
+        VALERA_REVALIDATE_PROBE: revalida reportes vencidos consultando su ``updatedAt`` en
+            getReportFilter antes del GET condicional (default true)
+    """
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        max_connections: Optional[int] = None,
+        max_keepalive_connections: Optional[int] = None,
+        keepalive_expiry: Optional[float] = None,
+        http2: Optional[bool] = None,
+        timeout: Optional[float] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        cache: Optional[ReportCache] = None,
+    ):
+        self.base_url = (base_url or _get_base_url()).rstrip("/")
+        self.timeout = timeout if timeout is not None else _env_float("VALERA_TIMEOUT", 30.0)
+        limits = httpx.Limits(
+            max_connections=max_connections if max_connections is not None else _env_int("VALERA_MAX_CONNECTIONS", 100),
+            max_keepalive_connections=(
+                max_keepalive_connections if max_keepalive_connections is not None else _env_int("VALERA_MAX_KEEPALIVE", 20)
+            ),
+            keepalive_expiry=keepalive_expiry if keepalive_expiry is not None else _env_float("VALERA_KEEPALIVE_EXPIRY", 30.0),
+        )
+        use_http2 = http2 if http2 is not None else _env_bool("VALERA_HTTP2", False)
+        if use_http2 and importlib.util.find_spec("h2") is None:
+            print(" VALERA_HTTP2 activo pero el paquete 'h2' no está instalado; se usará HTTP/1.1")
+            use_http2 = False
+        self.http2 = use_http2
+        self.page_size = _env_int("VALERA_PAGE_SIZE", 100)
+        self.page_concurrency = max(1, _env_int("VALERA_PAGE_CONCURRENCY", 4))
+        self.single_flight = SingleFlight()
+        self.cache = cache if cache is not None else ReportCache()
+        self._client = httpx.AsyncClient(
+            limits=limits,
+            http2=use_http2,
+            timeout=self.timeout,
+            transport=transport,
+        )
+
+    async def get_json(
+        self,
+        path: str,
+        params: Union[Mapping[str, Any], Iterable[Tuple[str, Any]], None] = None,
+        timeout: Optional[float] = None,
+    ) -> Any:
+        """Ejecuta un GET contra VALERA y devuelve el cuerpo JSON.
+
+        Las respuestas vigentes se sirven desde ``ReportCache``. Peticiones
+        concurrentes con la misma URL y parámetros comparten una sola llamada
+        HTTP (ver ``SingleFlight``); el resultado es el mismo objeto para todos
+        los llamadores y no debe mutarse.
+        """
+        url, param_list, key = self._request_key(path, params)
+        entry = self.cache.get(key)
+        if entry is not None and entry.fresh:
+            return entry.value
+        return await self._fetch(key, url, param_list, timeout)
+
+    def _request_key(self, path: str, params=None) -> Tuple[str, List[Tuple[str, Any]], Tuple]:
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        param_list = _as_params(params)
+        key = (url, tuple((str(k), str(v)) for k, v in param_list))
+        return url, param_list, key
+
+    async def _fetch(self, key: Tuple, url: str, params: List[Tuple[str, Any]], timeout: Optional[float] = None) -> Any:
+        async def fetch():
+            resp = await self._get(url, params=params, timeout=timeout or self.timeout)
+            resp.raise_for_status()
+            value = resp.json()
+            self._remember(key, value, len(resp.content))
+            return value
+
+        return await self.single_flight.do(key, fetch)
+
+    async def _get(self, url: str, **kwargs) -> httpx.Response:
+        """GET a VALERA medido como span ``fetch`` y en ``export_valera_fetch_seconds``"""
+        path = url[len(self.base_url):] if url.startswith(self.base_url) else url
+        start = time.perf_counter()
+        status = 0
+        try:
+            with span("fetch", **{"url.path": path}) as sp:
+                resp = await self._client.get(url, **kwargs)
+                status = resp.status_code
+                if sp is not None:
+                    sp.attributes["http.response.status_code"] = status
+                return resp
+        finally:
+            observe_fetch(path, status, time.perf_counter() - start)
+
+    def _remember(self, key: Tuple, value: Any, size: int):
+        """Guarda la respuesta en caché y registra el updatedAt de cada reporte recibido"""
+        updated_at = None
+        if isinstance(value, dict) and "id" in value:
+            updated_at = value.get("updatedAt")
+            self.cache.observe_updated_at(value.get("id"), updated_at)
+        for item in _page_items(value):
+            if isinstance(item, dict):
+                self.cache.observe_updated_at(item.get("id"), item.get("updatedAt"))
+        self.cache.put(key, value, size, updated_at)
+
+    async def _revalidate_report(self, key: Tuple, url: str, report_id: Any, entry) -> Dict[str, Any]:
+        """Revalida un reporte vencido comparando su ``updatedAt``.
+
+        En orden: el updatedAt visto en un listado reciente (sin petición); una
+        consulta liviana a getReportFilter con ``id`` y ``limit=1``; y un GET
+        condicional con ``If-Modified-Since``. Si el ``updatedAt`` no cambió o
+        VALERA responde 304 se conserva el objeto cacheado. Si VALERA no filtra
+        por ``id`` e ignora ``If-Modified-Since``, la revalidación termina siendo
+        una descarga completa del reporte.
+        """
+        if not entry.updated_at:
+            return await self._fetch(key, url, [])
+        known = self.cache.known_updated_at(report_id, since=time.monotonic() - self.cache.ttl)
+        if known is None:
+            known = await self._probe_updated_at(report_id)
+        if known is not None:
+            if known == entry.updated_at:
+                self.cache.refresh(key)
+                return entry.value
+            return await self._fetch(key, url, [])
+
+        async def conditional():
+            headers = {}
+            since = _http_date(entry.updated_at)
+            if since:
+                headers["If-Modified-Since"] = since
+            resp = await self._get(url, headers=headers, timeout=self.timeout)
+            if resp.status_code == 304:
+                self.cache.refresh(key)
+                return entry.value
+            resp.raise_for_status()
+            value = resp.json()
+            if isinstance(value, dict) and value.get("updatedAt") == entry.updated_at:
+                self.cache.refresh(key)
+                return entry.value
+            self._remember(key, value, len(resp.content))
+            return value
+
+        return await self.single_flight.do(("revalidate",) + key, conditional)
+
+    async def _probe_updated_at(self, report_id: Any) -> Optional[str]:
+        """``updatedAt`` actual de un reporte con una página de un elemento de getReportFilter.
+
+        Devuelve ``None`` si la sonda está desactivada (``VALERA_REVALIDATE_PROBE``),
+        falla o VALERA no aplica el filtro por ``id`` (el reporte devuelto es otro).
+        """
+        if not _env_bool("VALERA_REVALIDATE_PROBE", True):
+            return None
+
+        async def probe():
+            resp = await self._get(
+                f"{self.base_url}/lora-report/getReportFilter",
+                params=[("id", report_id), ("page", 1), ("limit", 1)], timeout=self.timeout,
+            )
+            resp.raise_for_status()
+            items = _page_items(resp.json())
+            if len(items) == 1 and isinstance(items[0], dict) and str(items[0].get("id")) == str(report_id):
+                updated_at = items[0].get("updatedAt")
+                self.cache.observe_updated_at(report_id, updated_at)
+                return updated_at
+            return None
+
+        try:
+            return await self.single_flight.do(("probe", report_id), probe)
+        except (httpx.HTTPError, ValueError):
+            return None
+
+    async def get_reports(self) -> List[Dict[str, Any]]:
+        """Obtiene todos los reportes LORA"""
+        return await self.get_json("lora-report")
+
+    async def get_report_by_id(self, report_id: int) -> Dict[str, Any]:
+        """Obtiene un reporte LORA por ID (con revalidación por updatedAt al vencer el TTL)"""
+        url, params, key = self._request_key(f"lora-report/{report_id}")
+        entry = self.cache.get(key)
+        if entry is None:
+            return await self._fetch(key, url, params)
+        if entry.fresh:
+            return entry.value
+        return await self._revalidate_report(key, url, report_id, entry)
+
+    async def get_report_by_userId(self, user_id: int) -> Dict[str, Any]:
+        """Obtiene los reportes LORA filtrados por usuario"""
+        return await self.get_json("lora-report/getReportFilter", params={"userId": user_id})
+
+    async def get_reports_by_filters(
+        self, filters: Union[Mapping[str, Any], Iterable[Tuple[str, Any]]]
+    ) -> Dict[str, Any]:
+        """Obtiene reportes LORA filtrados (acepta claves repetidas como lista de tuplas)"""
+        return await self.get_json("lora-report/getReportFilter", params=_as_params(filters), timeout=60)
+
+    async def iter_report_filter(
+        self,
+        filters: Union[Mapping[str, Any], Iterable[Tuple[str, Any]], None] = None,
+        page_size: Optional[int] = None,
+        concurrency: Optional[int] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Itera los reportes de getReportFilter recorriendo todas las páginas.
+
+        La primera página indica el total de páginas; el resto se descarga en
+        paralelo con una ventana acotada de ``concurrency`` peticiones y los
+        reportes se entregan en orden a medida que llega cada página. Si los
+        filtros ya incluyen ``page`` solo se devuelve esa página.
+        """
+        params = _as_params(filters)
+        if any(key == "page" for key, _ in params):
+            resp = await self.get_json("lora-report/getReportFilter", params=params, timeout=60)
+            for report in _page_items(resp):
+                yield report
+            return
+
+        size = page_size or self.page_size
+        window = max(1, concurrency or self.page_concurrency)
+        params = [(key, value) for key, value in params if key != "limit"]
+
+        first = await self._get_filter_page(params, 1, size)
+        for report in _page_items(first):
+            yield report
+
+        total_pages = _page_count(first, size)
+        next_page = 2
+        pending = deque()
+        try:
+            while next_page <= total_pages or pending:
+                while next_page <= total_pages and len(pending) < window:
+                    pending.append(asyncio.ensure_future(self._get_filter_page(params, next_page, size)))
+                    next_page += 1
+                resp = await pending.popleft()
+                for report in _page_items(resp):
+                    yield report
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _get_filter_page(self, params: List[Tuple[str, Any]], page: int, size: int) -> Dict[str, Any]:
+        page_params = params + [("page", page), ("limit", size)]
+        return await self.get_json("lora-report/getReportFilter", params=page_params, timeout=60)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"single_flight": self.single_flight.stats(), "cache": self.cache.stats()}
+
+    async def aclose(self):
+        await self._client.aclose()
+
+
+def _as_params(filters: Union[Mapping[str, Any], Iterable[Tuple[str, Any]], None]) -> List[Tuple[str, Any]]:
+    """Normaliza filtros (mapeo o lista de tuplas) a una lista de tuplas"""
+    if not filters:
+        return []
+    if isinstance(filters, Mapping):
+        return list(filters.items())
+    return list(filters)
+
+
+def _page_items(resp: Any) -> List[Dict[str, Any]]:
+    """Extrae la lista de reportes de ``{ success, data: { data: [...], pagination } }``"""
+    if isinstance(resp, list):
+        return resp
+    return (((resp or {}).get("data") or {}).get("data") or [])
+
+
+def _http_date(value: str) -> Optional[str]:
+    """Convierte un ``updatedAt`` ISO 8601 a fecha HTTP para ``If-Modified-Since``"""
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        return None
+    return format_datetime(parsed.astimezone(timezone.utc), usegmt=True)
+
+
+def _page_count(resp: Any, page_size: int) -> int:
+    """Calcula el total de páginas a partir del bloque ``pagination`` de VALERA"""
+    if not isinstance(resp, dict):
+        return 1
+    pagination = ((resp.get("data") or {}).get("pagination") or {})
+    for key in ("totalPages", "pages", "lastPage"):
+        if pagination.get(key):
+            return int(pagination[key])
+    total = pagination.get("total") or pagination.get("totalItems") or pagination.get("count")
+    limit = pagination.get("limit") or page_size
+    if total and limit:
+        return int(math.ceil(int(total) / int(limit)))
+    return 1
+
+
+_client: Optional[ValeraClient] = None
+
+
+async def init_client(**kwargs) -> ValeraClient:
+    """Crea el cliente compartido (se invoca desde ``lifespan`` en ``app/main.py``)"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+    _client = ValeraClient(**kwargs)
+    return _client
+
+
+async def close_client():
+    """Cierra el cliente compartido y libera sus conexiones"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_client() -> ValeraClient:
+    """Devuelve el cliente compartido; lo crea con la configuración por defecto si no existe"""
+    global _client
+    if _client is None:
+        _client = ValeraClient()
+    return _client
+
+
+async def get_reports_async() -> List[Dict[str, Any]]:
+    """Versión asíncrona de ``get_reports`` usando el cliente compartido"""
+    return await get_client().get_reports()
+
+
+async def get_report_by_id_async(report_id: int) -> Dict[str, Any]:
+    """Versión asíncrona de ``get_report_by_id`` usando el cliente compartido"""
+    return await get_client().get_report_by_id(report_id)
+
+
+async def get_report_by_userId_async(user_id: int) -> Dict[str, Any]:
+    """Versión asíncrona de ``get_report_by_userId`` usando el cliente compartido"""
+    return await get_client().get_report_by_userId(user_id)
+
+
+async def get_reports_by_filters_async(
+    filters: Union[Mapping[str, Any], Iterable[Tuple[str, Any]]]
+) -> Dict[str, Any]:
+    """Versión asíncrona de ``get_reports_by_filters`` usando el cliente compartido"""
+    return await get_client().get_reports_by_filters(filters)
+
+
+def iter_reports_by_userId_async(user_id: int) -> AsyncIterator[Dict[str, Any]]:
+    """Itera todos los reportes de un usuario recorriendo la paginación de VALERA"""
+    return get_client().iter_report_filter({"userId": user_id})
+
+
+def iter_reports_by_filters_async(
+    filters: Union[Mapping[str, Any], Iterable[Tuple[str, Any]]]
+) -> AsyncIterator[Dict[str, Any]]:
+    """Itera todos los reportes filtrados recorriendo la paginación de VALERA"""
+    return get_client().iter_report_filter(filters)
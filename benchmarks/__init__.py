@@ -0,0 +1 @@
+""" Benchmarks del microservicio de exportación (se ejecutan con ``python -m benchmarks.<modulo>``) """
@@ -0,0 +1,193 @@
+import argparse
+import asyncio
+import contextlib
+import inspect
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from app.services.LORA.docs.single_report import DOCXExportService
+from app.services.LORA.pdf.all_reports import ExportAllReports
+from app.services.LORA.pdf.single_report_simple import ExportSinglePDFReportSimple
+from app.services.LORA.pdf.single_report_with_styles import ExportSinglePDFReportWithStyle
+from app.services.LORA.report_view import clear_view_cache
+from app.services.LORA.xlsx.all_reports import XLSXListExportService
+from app.services.LORA.xlsx.single_report import XLSXExportService
+
+from .synthetic import generate_reports
+
+""" Tiempo y memoria de cada exportador con 1, 100, 1k y 10k reportes sintéticos.
+
+Los exportadores de listado generan un archivo con N reportes; los de un solo
+reporte generan N archivos, uno por reporte. Los resultados se guardan en JSON
+para comparar corridas (``--compare anterior.json``).
+"""
+
+# Exportador -> genera un archivo con todos los reportes (True) o uno por reporte (False)
+SERVICES = {
+    "ExportAllReports": (ExportAllReports, True),
+    "XLSXListExportService": (XLSXListExportService, True),
+    "ExportSinglePDFReportSimple": (ExportSinglePDFReportSimple, False),
+    "ExportSinglePDFReportWithStyle": (ExportSinglePDFReportWithStyle, False),
+    "DOCXExportService": (DOCXExportService, False),
+    "XLSXExportService": (XLSXExportService, False),
+}
+
+DEFAULT_SIZES = [1, 100, 1000, 10000]
+
+
+def _generate(service_cls: type, data: Any) -> int:
+    # Algunos exportadores tienen generate_file asíncrono
+    result = service_cls().generate_file(data)
+    if inspect.iscoroutine(result):
+        result = asyncio.run(result)
+    return result.getbuffer().nbytes
+
+
+def _export(service_cls: type, listing: bool, reports: List[Dict]) -> int:
+    if listing:
+        return _generate(service_cls, reports)
+    return sum(_generate(service_cls, report) for report in reports)
+
+
+def _measure(fn: Callable[[], int], repeat: int, memory: bool) -> Dict[str, Any]:
+    times = []
+    size = 0
+    for _ in range(repeat):
+        # Sin vistas memoizadas de la corrida anterior: cada repetición normaliza desde cero
+        clear_view_cache()
+        start = time.perf_counter()
+        size = fn()
+        times.append(time.perf_counter() - start)
+    result = {"seconds": round(min(times), 4), "seconds_mean": round(sum(times) / len(times), 4), "output_bytes": size}
+    if memory:
+        # Pasada aparte: tracemalloc hace más lenta la ejecución y distorsionaría los tiempos
+        clear_view_cache()
+        tracemalloc.start()
+        try:
+            fn()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        result["peak_mib"] = round(peak / (1024 * 1024), 2)
+    return result
+
+
+def run(
+    services: List[str],
+    sizes: List[int],
+    repeat: int = 3,
+    seed: int = 42,
+    unicode: str = "latin",
+    memory: bool = True,
+    log: Optional[Callable[[str], None]] = None,
+) -> Dict[str, Any]:
+    corpus = generate_reports(max(sizes), seed, unicode=unicode)
+    results = []
+    for name in services:
+        service_cls, listing = SERVICES[name]
+        for size in sizes:
+            reports = corpus[:size]
+            entry: Dict[str, Any] = {"service": name, "reports": size}
+            try:
+                entry.update(_measure(lambda: _export(service_cls, listing, reports), repeat, memory))
+                entry["reports_per_s"] = round(size / entry["seconds"], 1) if entry["seconds"] else None
+            except Exception as e:
+                entry["error"] = f"{type(e).__name__}: {e}"
+            results.append(entry)
+            if log:
+                log(_format_entry(entry))
+    return {"meta": _meta(seed, repeat, unicode), "results": results}
+
+
+def _meta(seed: int, repeat: int, unicode: str) -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "seed": seed,
+        "repeat": repeat,
+        "unicode": unicode,
+    }
+
+
+def _format_entry(entry: Dict[str, Any]) -> str:
+    head = f"{entry['service']:<31} {entry['reports']:>6} reportes: "
+    if "error" in entry:
+        return head + f"error ({entry['error']})"
+    line = head + f"{entry['seconds'] * 1000:10.1f} ms  {entry['reports_per_s']:>9} rep/s  {entry['output_bytes']:>11} bytes"
+    if "peak_mib" in entry:
+        line += f"  pico {entry['peak_mib']} MiB"
+    return line
+
+
+def compare(previous: Dict[str, Any], current: Dict[str, Any]) -> List[str]:
+    """Diferencia de tiempo y memoria por (exportador, reportes) contra una corrida anterior"""
+    before = {(r["service"], r["reports"]): r for r in previous.get("results", [])}
+    lines = []
+    for entry in current["results"]:
+        old = before.get((entry["service"], entry["reports"]))
+        if not old or "seconds" not in old or "seconds" not in entry:
+            continue
+        line = f"{entry['service']:<31} {entry['reports']:>6} reportes: tiempo {_delta(old['seconds'], entry['seconds'])}"
+        if "peak_mib" in old and "peak_mib" in entry:
+            line += f", memoria {_delta(old['peak_mib'], entry['peak_mib'])}"
+        lines.append(line)
+    return lines
+
+
+def _delta(old: float, new: float) -> str:
+    if not old:
+        return "n/d"
+    return f"{(new - old) / old * 100:+.1f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de los exportadores LORA con reportes sintéticos")
+    parser.add_argument("--services", default=",".join(SERVICES), help="Exportadores separados por coma")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="Cantidades de reportes separadas por coma")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--unicode", choices=["latin", "full"], default="latin", help="'full' agrega texto fuera de latin-1")
+    parser.add_argument("--no-memory", action="store_true", help="Omite la pasada con tracemalloc")
+    parser.add_argument("--output", help="Archivo JSON de resultados (default: stdout)")
+    parser.add_argument("--compare", help="JSON de una corrida anterior para mostrar diferencias")
+    args = parser.parse_args()
+
+    services = [name.strip() for name in args.services.split(",") if name.strip()]
+    unknown = [name for name in services if name not in SERVICES]
+    if unknown:
+        parser.error(f"Exportadores desconocidos: {', '.join(unknown)}")
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+
+    # Los exportadores imprimen mensajes de control: se desvían para no mezclarlos con el JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        report = run(services, sizes, args.repeat, args.seed, args.unicode, not args.no_memory, log=lambda line: print(line, file=sys.stderr))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    else:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            previous = json.load(f)
+        for line in compare(previous, report):
+            print(line, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import argparse
+import json
+import time
+from typing import Any, Callable, Dict, List
+
+from app.services.LORA.pdf.all_reports import ExportAllReports
+from app.services.LORA.projection import compile_projection, format_actions
+from app.services.LORA.xlsx.all_reports import XLSXListExportService
+
+from .synthetic import generate_reports
+
+""" Compara la proyección compilada con la búsqueda anterior (``key.split('.')`` por valor) """
+
+
+def _legacy_get(obj: Dict, key: str) -> Any:
+    # Implementación previa de ``_get_nested_value`` en los exportadores
+    value = obj
+    for part in key.split('.'):
+        if isinstance(value, dict):
+            value = value.get(part, None)
+        else:
+            return None
+    if key == "reportEvidence" and value is None:
+        return obj.get("evidence") or None
+    return value
+
+
+def _legacy_format(value: Any) -> Any:
+    # Implementación previa de ``_format_value`` en los exportadores
+    if value is None:
+        return "N/A"
+    if isinstance(value, list):
+        formatted_items = []
+        for item in value:
+            if isinstance(item, dict):
+                parts = [f"{k}: {v}" for k, v in item.items() if v not in (None, "")]
+                formatted_items.append(", ".join(parts) if parts else str(item))
+            else:
+                formatted_items.append(str(item))
+        return "\n".join(formatted_items) if formatted_items else "N/A"
+    if isinstance(value, dict):
+        parts = [f"{k}: {v}" for k, v in value.items() if v not in (None, "")]
+        return ", ".join(parts) if parts else "N/A"
+    return value
+
+
+def legacy_rows(reports: List[Dict], fields) -> List[List[Any]]:
+    rows = []
+    for report in reports:
+        row = []
+        for key, _ in fields:
+            if key == "actions":
+                row.append(format_actions(report.get("actions", [])))
+            else:
+                row.append(_legacy_format(_legacy_get(report, key)))
+        rows.append(row)
+    return rows
+
+
+def _best(fn: Callable[[], Any], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(count: int, repeat: int, seed: int) -> List[Dict[str, Any]]:
+    reports = generate_reports(count, seed)
+    cases = [
+        ("pdf_fields", ExportAllReports.FIELDS, compile_projection(ExportAllReports.FIELDS, formatters={"actions": format_actions})),
+        ("xlsx_headers", XLSXListExportService.HEADERS, XLSXListExportService.PROJECTION),
+    ]
+    results = []
+    for name, fields, projection in cases:
+        legacy = _best(lambda: legacy_rows(reports, fields), repeat)
+        compiled = _best(lambda: projection.rows(reports), repeat)
+        results.append({
+            "case": name,
+            "reports": count,
+            "fields": len(fields),
+            "legacy_s": round(legacy, 4),
+            "projection_s": round(compiled, 4),
+            "speedup": round(legacy / compiled, 2) if compiled else None,
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la proyección de campos de reportes")
+    parser.add_argument("--reports", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="Imprime los resultados en JSON")
+    args = parser.parse_args()
+
+    results = run(args.reports, args.repeat, args.seed)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for r in results:
+        print(
+            f"{r['case']:<14} {r['reports']} reportes x {r['fields']} campos: "
+            f"anterior {r['legacy_s'] * 1000:.1f} ms, compilada {r['projection_s'] * 1000:.1f} ms "
+            f"({r['speedup']}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
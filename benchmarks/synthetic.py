@@ -0,0 +1,112 @@
+import random
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional
+
+""" Reportes LORA sintéticos con la forma que devuelve VALERA, reproducibles por semilla """
+
+STATUSES = ["open", "in_progress", "closed"]
+REPORT_TYPES = ["Acto inseguro", "Condición insegura", "Incidente", "Buena práctica"]
+CLASSIFICATIONS = ["Alta", "Media", "Baja"]
+HAZARD_TYPES = ["Mecánico", "Eléctrico", "Químico", "Ergonómico", "Locativo"]
+RIGS = [f"RIG-{n:02d}" for n in range(1, 13)]
+PROJECTS = ["Proyecto Norte", "Proyecto Sur", "Proyecto Oriente"]
+FIELDS = ["Campo Rubiales", "Campo Castilla", "Campo Chichimene"]
+UNITIES = ["Perforación", "Workover", "Completamiento"]
+BASES = ["Base Villavicencio", "Base Neiva", "Base Yopal"]
+NAMES = ["Ana", "Luis", "María", "Carlos", "Sofía", "Jorge", "Valentina", "Andrés"]
+LAST_NAMES = ["Pérez", "Gómez", "Rodríguez", "Martínez", "García", "López"]
+WORDS = (
+    "se observa trabajador sin elementos de protección en zona de maniobra "
+    "durante el cambio de turno la herramienta presenta desgaste y riesgo de caída "
+    "señalización insuficiente en el área de tubería niño almacén grúa válvula"
+).split()
+# Texto fuera de latin-1 (solo con ``unicode="full"``): las fuentes core de FPDF no lo soportan
+FULL_UNICODE_WORDS = ["żurawia", "Ölleitung", "трубопровод", "安全帽", "🔧", "⚠️", "→"]
+
+# Largo de la conversación en palabras: casi siempre corta, a veces muy larga
+CONVERSATION_LENGTHS = [(5, 20)] * 6 + [(50, 200)] * 3 + [(400, 1200)]
+
+_EPOCH = datetime(2024, 1, 1)
+
+
+def _text(rng: random.Random, words: int, vocabulary: List[str] = WORDS) -> str:
+    return " ".join(rng.choice(vocabulary) for _ in range(words)).capitalize() + "."
+
+
+def _user(rng: random.Random, user_id: int) -> Dict:
+    return {
+        "id": user_id,
+        "documentId": str(rng.randint(10_000_000, 1_999_999_999)),
+        "userInformation": {"name": rng.choice(NAMES), "lastName": rng.choice(LAST_NAMES)},
+    }
+
+
+def make_report(rng: random.Random, report_id: int, users: int = 50, unicode: str = "latin") -> Dict:
+    """Un reporte con todos los campos que usan los exportadores (algunos opcionales vacíos).
+
+    Varía la cantidad de acciones (0-8), el largo de la conversación, la lista de
+    evidencias y la forma de las acciones (``responsible`` o ``assignedTo``).
+    ``unicode="full"`` agrega texto fuera de latin-1 (cirílico, CJK, emoji).
+    """
+    vocabulary = WORDS + FULL_UNICODE_WORDS if unicode == "full" else WORDS
+    user_id = rng.randint(1, users)
+    created = _EPOCH + timedelta(minutes=rng.randint(0, 60 * 24 * 365))
+    external = rng.random() < 0.2
+    report = {
+        "id": report_id,
+        "userId": user_id,
+        "user": _user(rng, user_id),
+        "externalNameUser": f"{rng.choice(NAMES)} {rng.choice(LAST_NAMES)}" if external else None,
+        "externalOrganization": "Contratista S.A.S." if external else None,
+        "reportTitle": _text(rng, rng.randint(3, 8)),
+        "conversation": _text(rng, rng.randint(*rng.choice(CONVERSATION_LENGTHS)), vocabulary),
+        "base": rng.choice(BASES),
+        "createdAt": created.isoformat(timespec="milliseconds") + "Z",
+        "updatedAt": (created + timedelta(hours=rng.randint(0, 240))).isoformat(timespec="milliseconds") + "Z",
+        "unity": rng.choice(UNITIES),
+        "rig": rng.choice(RIGS),
+        "project": rng.choice(PROJECTS),
+        "field": rng.choice(FIELDS),
+        "reportType": rng.choice(REPORT_TYPES),
+        "hazardClassification": rng.choice(CLASSIFICATIONS),
+        "hazardType": rng.choice(HAZARD_TYPES),
+        "detailedDescription": _text(rng, rng.randint(20, 120), vocabulary),
+        "findingCause": _text(rng, rng.randint(5, 30), vocabulary),
+        "actions": [_action(rng, created, vocabulary) for _ in range(rng.choice([0, 0, 1, 1, 1, 2, 2, 3, 5, 8]))],
+        "reportStatus": rng.choice(STATUSES),
+        "loraReportCode": f"LORA-{report_id:06d}",
+    }
+    # VALERA envía la evidencia como ``reportEvidence`` o como lista ``evidence`` según la versión
+    if rng.random() < 0.5:
+        report["reportEvidence"] = f"https://valera.example/evidencias/{report_id}.jpg"
+    else:
+        report["evidence"] = [
+            {"url": f"https://valera.example/evidencias/{report_id}-{n}.jpg"}
+            for n in range(rng.choice([0, 1, 1, 2, 3, 5]))
+        ]
+    return report
+
+
+def _action(rng: random.Random, created: datetime, vocabulary: List[str]) -> Dict:
+    action = {
+        "description": _text(rng, rng.randint(4, 12), vocabulary),
+        "dueDate": (created + timedelta(days=rng.randint(1, 60))).date().isoformat(),
+        "status": rng.choice(STATUSES),
+    }
+    # Versiones anteriores de VALERA envían el responsable dentro de ``assignedTo``
+    if rng.random() < 0.5:
+        action["responsible"] = f"{rng.choice(NAMES)} {rng.choice(LAST_NAMES)}"
+    else:
+        action["assignedTo"] = _user(rng, rng.randint(1, 500))
+    return action
+
+
+def iter_reports(count: int, seed: int = 42, users: int = 50, unicode: str = "latin") -> Iterator[Dict]:
+    rng = random.Random(seed)
+    for report_id in range(1, count + 1):
+        yield make_report(rng, report_id, users, unicode)
+
+
+def generate_reports(count: int, seed: int = 42, users: Optional[int] = None, unicode: str = "latin") -> List[Dict]:
+    """``count`` reportes deterministas: la misma semilla produce siempre los mismos datos"""
+    return list(iter_reports(count, seed, users or 50, unicode))
@@ -0,0 +1 @@
+""" Pruebas de carga locales: VALERA simulado (``loadtest.fake_valera``), generador de carga (``loadtest.driver``) y colector de trazas (``loadtest.fake_collector``) """
@@ -0,0 +1,210 @@
+import re
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+from typing import Any, Dict, List, NamedTuple, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+""" Generador de carga concurrente contra las rutas /api/v1/lora/* del microservicio """
+
+
+class Route(NamedTuple):
+    name: str
+    method: str
+    path: str
+
+
+# Rutas de filtro: sin parámetros VALERA devolvería el corpus completo
+FILTER_QUERY = "?userId={userId}"
+
+
+def discover_routes(client: httpx.Client, base_url: str, prefix: str = "/api/v1/lora/") -> List[Route]:
+    """Lee ``/openapi.json`` del servicio y devuelve todas las rutas bajo ``prefix``"""
+    parts = urlsplit(base_url)
+    resp = client.get(f"{parts.scheme}://{parts.netloc}/openapi.json")
+    resp.raise_for_status()
+    spec = resp.json()
+    routes = []
+    for path, operations in spec.get("paths", {}).items():
+        if not path.startswith(prefix):
+            continue
+        for method in operations:
+            method = method.upper()
+            # Solo POST /lora/bundle tiene un cuerpo conocido
+            if method == "GET" or (method == "POST" and path.endswith("/bundle")):
+                routes.append(Route(f"{method} {path}", method, path))
+    return sorted(routes)
+
+
+class Sample(NamedTuple):
+    route: str
+    status: int
+    seconds: float
+    size: int
+
+
+class LoadDriver:
+    """Ejecuta ``concurrency`` clientes que eligen rutas al azar durante ``duration`` segundos.
+
+    Cada petición descarga la respuesta completa; la latencia incluye el cuerpo.
+    Los ``{id}``/``{userId}`` se eligen entre los reportes y usuarios del corpus.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        routes: List[Route],
+        concurrency: int = 10,
+        duration: float = 30.0,
+        max_requests: Optional[int] = None,
+        ids: int = 1000,
+        users: int = 50,
+        seed: int = 42,
+        timeout: float = 120.0,
+    ):
+        # Las rutas de openapi.json son absolutas (/api/v1/lora/...): se combinan con el origen
+        parts = urlsplit(base_url)
+        self.origin = f"{parts.scheme}://{parts.netloc}"
+        self.routes = routes
+        self.concurrency = concurrency
+        self.duration = duration
+        self.max_requests = max_requests
+        self.ids = ids
+        self.users = users
+        self.rng = random.Random(seed)
+        self.timeout = timeout
+        self.samples: List[Sample] = []
+        self._issued = 0
+
+    def _request(self, route: Route) -> Dict[str, Any]:
+        values = {"id": self.rng.randint(1, self.ids), "userId": self.rng.randint(1, self.users)}
+        path = route.path
+        if path.endswith("_filter"):
+            path += FILTER_QUERY
+        request: Dict[str, Any] = {"method": route.method, "url": self.origin + path.format(**values)}
+        if route.method == "POST":
+            request["json"] = {"ids": self.rng.sample(range(1, self.ids + 1), min(5, self.ids))}
+        return request
+
+    async def _worker(self, client: httpx.AsyncClient, deadline: float):
+        while time.monotonic() < deadline:
+            if self.max_requests is not None:
+                if self._issued >= self.max_requests:
+                    return
+                self._issued += 1
+            route = self.rng.choice(self.routes)
+            request = self._request(route)
+            start = time.perf_counter()
+            size = 0
+            try:
+                async with client.stream(**request) as resp:
+                    async for chunk in resp.aiter_bytes():
+                        size += len(chunk)
+                    status = resp.status_code
+            except httpx.HTTPError:
+                status = 0
+            self.samples.append(Sample(route.name, status, time.perf_counter() - start, size))
+
+    async def run(self) -> Dict[str, Any]:
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        async with httpx.AsyncClient(timeout=self.timeout, limits=limits) as client:
+            start = time.monotonic()
+            deadline = start + self.duration
+            await asyncio.gather(*[self._worker(client, deadline) for _ in range(self.concurrency)])
+            elapsed = time.monotonic() - start
+        return summarize(self.samples, elapsed, self.concurrency)
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Percentil por rango más cercano sobre una lista ya ordenada"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def _stats(samples: List[Sample], elapsed: float) -> Dict[str, Any]:
+    latencies = sorted(sample.seconds * 1000 for sample in samples)
+    errors = [sample for sample in samples if not 200 <= sample.status < 400]
+    statuses: Dict[str, int] = {}
+    for sample in samples:
+        statuses[str(sample.status)] = statuses.get(str(sample.status), 0) + 1
+    return {
+        "requests": len(samples),
+        "errors": len(errors),
+        "statuses": statuses,
+        "throughput_rps": round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        "bytes": sum(sample.size for sample in samples),
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p95_ms": round(percentile(latencies, 95), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+        "max_ms": round(latencies[-1], 1) if latencies else 0.0,
+    }
+
+
+def summarize(samples: List[Sample], elapsed: float, concurrency: int) -> Dict[str, Any]:
+    by_route: Dict[str, List[Sample]] = {}
+    for sample in samples:
+        by_route.setdefault(sample.route, []).append(sample)
+    return {
+        "elapsed_s": round(elapsed, 2),
+        "concurrency": concurrency,
+        "total": _stats(samples, elapsed),
+        "routes": {route: _stats(route_samples, elapsed) for route, route_samples in sorted(by_route.items())},
+    }
+
+
+def format_summary(summary: Dict[str, Any]) -> str:
+    lines = [
+        f"{'ruta':<52} {'pet.':>6} {'err.':>5} {'rps':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}",
+    ]
+    rows = list(summary["routes"].items()) + [("TOTAL", summary["total"])]
+    for name, stats in rows:
+        lines.append(
+            f"{name:<52} {stats['requests']:>6} {stats['errors']:>5} {stats['throughput_rps']:>7} "
+            f"{stats['p50_ms']:>9} {stats['p95_ms']:>9} {stats['p99_ms']:>9}"
+        )
+    lines.append(f"{summary['elapsed_s']} s con {summary['concurrency']} clientes concurrentes")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga de las rutas /api/v1/lora/*")
+    parser.add_argument("--target", default="http://127.0.0.1:8000/api/v1", help="URL base del microservicio")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=30.0, help="Segundos de carga")
+    parser.add_argument("--requests", type=int, help="Detiene la prueba tras este número de peticiones")
+    parser.add_argument("--ids", type=int, default=1000, help="Reportes del corpus de VALERA (ids 1..N)")
+    parser.add_argument("--users", type=int, default=50, help="Usuarios del corpus de VALERA (userId 1..N)")
+    parser.add_argument("--routes", help="Expresión regular para elegir rutas (p. ej. 'pdf|docx')")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--output", help="Archivo JSON con el resumen")
+    args = parser.parse_args()
+
+    with httpx.Client(timeout=30) as client:
+        routes = discover_routes(client, args.target)
+    if args.routes:
+        routes = [route for route in routes if re.search(args.routes, route.name)]
+    if not routes:
+        parser.error("No hay rutas para probar")
+    print(f"{len(routes)} rutas, {args.concurrency} clientes, {args.duration} s", file=sys.stderr)
+
+    driver = LoadDriver(
+        args.target, routes, concurrency=args.concurrency, duration=args.duration, max_requests=args.requests,
+        ids=args.ids, users=args.users, seed=args.seed, timeout=args.timeout,
+    )
+    summary = asyncio.run(driver.run())
+    print(format_summary(summary))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import json
+import argparse
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+
+from .driver import percentile
+
+""" Colector OTLP/HTTP (JSON) mínimo que resume por etapa los spans enviados por el microservicio """
+
+
+def create_app(max_spans: int = 100000, output: Optional[str] = None) -> FastAPI:
+    """App con ``POST /v1/traces`` (formato OTLP/JSON) y el resumen en ``GET /_stats``"""
+    spans: Deque[Dict[str, Any]] = deque(maxlen=max_spans)
+    app = FastAPI(title="Colector de trazas simulado")
+
+    @app.post("/v1/traces")
+    async def receive_traces(request: Request):
+        payload = await request.json()
+        if output:
+            with open(output, "a", encoding="utf-8") as f:
+                f.write(json.dumps(payload, separators=(",", ":")) + "\n")
+        for resource in payload.get("resourceSpans", []):
+            for scope in resource.get("scopeSpans", []):
+                for span in scope.get("spans", []):
+                    spans.append({
+                        "name": span.get("name"),
+                        "ms": (int(span["endTimeUnixNano"]) - int(span["startTimeUnixNano"])) / 1e6,
+                        "error": "status" in span,
+                    })
+        return {}
+
+    @app.get("/_stats")
+    async def get_stats():
+        return summarize(list(spans))
+
+    return app
+
+
+def summarize(spans: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Cantidad, errores y latencias p50/p95/p99 por nombre de span"""
+    by_name: Dict[str, List[Dict[str, Any]]] = {}
+    for span in spans:
+        by_name.setdefault(span["name"], []).append(span)
+    summary = {}
+    for name, items in sorted(by_name.items()):
+        latencies = sorted(item["ms"] for item in items)
+        summary[name] = {
+            "spans": len(items),
+            "errors": sum(1 for item in items if item["error"]),
+            "p50_ms": round(percentile(latencies, 50), 1),
+            "p95_ms": round(percentile(latencies, 95), 1),
+            "p99_ms": round(percentile(latencies, 99), 1),
+        }
+    return summary
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Colector OTLP/JSON simulado para pruebas de carga")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4318)
+    parser.add_argument("--max-spans", type=int, default=100000, help="Spans conservados para el resumen")
+    parser.add_argument("--output", help="Archivo donde se agrega cada envío recibido (JSONL)")
+    args = parser.parse_args()
+
+    print(f" Colector simulado en http://{args.host}:{args.port}/v1/traces")
+    uvicorn.run(create_app(args.max_spans, args.output), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+import os
+import random
+import asyncio
+import argparse
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+from benchmarks.synthetic import generate_reports
+
+""" API VALERA simulada con un corpus sintético, para medir el microservicio sin red """
+
+
+class FakeValeraConfig:
+    """Configuración del VALERA simulado.
+
+    Configuración por variables de entorno:
+        FAKE_VALERA_REPORTS: reportes del corpus (default 1000)
+        FAKE_VALERA_USERS: usuarios distintos (default 50)
+        FAKE_VALERA_SEED: semilla del corpus (default 42)
+        FAKE_VALERA_LATENCY_MS: latencia media por petición (default 20)
+        FAKE_VALERA_JITTER_MS: variación máxima (+/-) de la latencia (default 10)
+        FAKE_VALERA_ERROR_RATE: fracción de peticiones que responden 503 (default 0)
+        FAKE_VALERA_PAGE_SIZE: reportes por página de getReportFilter (default 100)
+    """
+
+    def __init__(
+        self,
+        reports: Optional[int] = None,
+        users: Optional[int] = None,
+        seed: Optional[int] = None,
+        latency_ms: Optional[float] = None,
+        jitter_ms: Optional[float] = None,
+        error_rate: Optional[float] = None,
+        page_size: Optional[int] = None,
+    ):
+        self.reports = reports if reports is not None else int(os.getenv("FAKE_VALERA_REPORTS", "1000"))
+        self.users = users if users is not None else int(os.getenv("FAKE_VALERA_USERS", "50"))
+        self.seed = seed if seed is not None else int(os.getenv("FAKE_VALERA_SEED", "42"))
+        self.latency_ms = latency_ms if latency_ms is not None else float(os.getenv("FAKE_VALERA_LATENCY_MS", "20"))
+        self.jitter_ms = jitter_ms if jitter_ms is not None else float(os.getenv("FAKE_VALERA_JITTER_MS", "10"))
+        self.error_rate = error_rate if error_rate is not None else float(os.getenv("FAKE_VALERA_ERROR_RATE", "0"))
+        self.page_size = page_size if page_size is not None else int(os.getenv("FAKE_VALERA_PAGE_SIZE", "100"))
+
+
+def create_app(config: Optional[FakeValeraConfig] = None) -> FastAPI:
+    """App con las rutas de VALERA que usa el microservicio, bajo ``/api``"""
+    config = config or FakeValeraConfig()
+    reports = generate_reports(config.reports, config.seed, users=config.users)
+    by_id = {report["id"]: report for report in reports}
+    rng = random.Random(config.seed)
+    stats = {"requests": 0, "errors": 0, "not_modified": 0}
+
+    app = FastAPI(title="VALERA simulado")
+
+    async def simulate() -> Optional[Response]:
+        # Latencia con variación uniforme y errores aleatorios antes de responder
+        stats["requests"] += 1
+        delay = config.latency_ms + rng.uniform(-config.jitter_ms, config.jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        if config.error_rate and rng.random() < config.error_rate:
+            stats["errors"] += 1
+            return JSONResponse({"success": False, "message": "Error simulado"}, status_code=503)
+        return None
+
+    @app.get("/api/lora-report")
+    async def list_reports():
+        return await simulate() or reports
+
+    @app.get("/api/lora-report/getReportFilter")
+    async def report_filter(request: Request):
+        error = await simulate()
+        if error:
+            return error
+        params = request.query_params
+        try:
+            page = max(1, int(params.get("page", 1)))
+            limit = min(config.page_size, max(1, int(params.get("limit", config.page_size))))
+        except ValueError:
+            return JSONResponse({"success": False, "message": "page/limit inválidos"}, status_code=400)
+        matches = _filter(reports, params)
+        start = (page - 1) * limit
+        total_pages = max(1, -(-len(matches) // limit))
+        return {
+            "success": True,
+            "data": {
+                "data": matches[start:start + limit],
+                "pagination": {"total": len(matches), "page": page, "limit": limit, "totalPages": total_pages},
+            },
+        }
+
+    @app.get("/api/lora-report/{report_id}")
+    async def get_report(report_id: int, request: Request):
+        error = await simulate()
+        if error:
+            return error
+        report = by_id.get(report_id)
+        if report is None:
+            return JSONResponse({"success": False, "message": "Reporte no encontrado"}, status_code=404)
+        if _not_modified(request.headers.get("if-modified-since"), report["updatedAt"]):
+            stats["not_modified"] += 1
+            return Response(status_code=304)
+        return report
+
+    @app.get("/_stats")
+    async def get_stats():
+        return dict(stats, reports=len(reports))
+
+    return app
+
+
+# Filtros de getReportFilter: parámetro -> campo del reporte
+FILTER_FIELDS = {
+    "id": "id",
+    "userId": "userId",
+    "status": "reportStatus",
+    "reportStatus": "reportStatus",
+    "reportType": "reportType",
+    "rig": "rig",
+    "project": "project",
+    "field": "field",
+    "base": "base",
+}
+
+
+def _filter(reports: List[Dict[str, Any]], params) -> List[Dict[str, Any]]:
+    conditions = []
+    for param, field in FILTER_FIELDS.items():
+        values = params.getlist(param)
+        if values:
+            conditions.append((field, set(values)))
+    if not conditions:
+        return reports
+    return [report for report in reports if all(str(report.get(field)) in values for field, values in conditions)]
+
+
+def _not_modified(if_modified_since: Optional[str], updated_at: str) -> bool:
+    if not if_modified_since:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+        updated = datetime.fromisoformat(updated_at.replace("Z", "+00:00"))
+    except (TypeError, ValueError):
+        return False
+    # Las fechas HTTP no tienen milisegundos
+    return updated.astimezone(timezone.utc).replace(microsecond=0) <= since
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="VALERA simulado para pruebas de carga")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=3000)
+    parser.add_argument("--reports", type=int)
+    parser.add_argument("--users", type=int)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--latency-ms", type=float)
+    parser.add_argument("--jitter-ms", type=float)
+    parser.add_argument("--error-rate", type=float)
+    parser.add_argument("--page-size", type=int)
+    args = parser.parse_args()
+
+    config = FakeValeraConfig(
+        reports=args.reports, users=args.users, seed=args.seed, latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms, error_rate=args.error_rate, page_size=args.page_size,
+    )
+    print(f" VALERA simulado: {config.reports} reportes en http://{args.host}:{args.port}/api/")
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
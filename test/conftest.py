@@ -0,0 +1,56 @@
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from loadtest.fake_valera import FakeValeraConfig, create_app
+
+""" Fixtures de las pruebas: VALERA simulado en memoria y la app con configuración aislada por prueba """
+
+# Scripts manuales: requieren el servidor levantado en localhost:8000 o entrada por consola
+collect_ignore = ["debug_test.py", "quick_test.py", "test_local_pdf.py", "demo_pdf_professional.py", "test_microservice.py"]
+
+
+@pytest.fixture
+def valera():
+    """VALERA simulado sin latencia: 30 reportes de 3 usuarios, páginas de 10"""
+    return create_app(FakeValeraConfig(reports=30, users=3, latency_ms=0, jitter_ms=0, error_rate=0, page_size=10))
+
+
+@pytest.fixture
+def valera_transport(valera):
+    return httpx.ASGITransport(app=valera)
+
+
+@pytest.fixture
+def app_env(monkeypatch, tmp_path):
+    """Renders en hilos y directorios temporales propios para la caché de archivos y los jobs"""
+    from app.services import artifact_store
+
+    monkeypatch.setenv("RENDER_PROCESS_WORKERS", "0")
+    monkeypatch.setenv("ARTIFACT_CACHE_DIR", str(tmp_path / "artifacts"))
+    monkeypatch.setenv("EXPORT_JOB_DIR", str(tmp_path / "jobs"))
+    monkeypatch.setenv("RENDER_MEMORY_TRACKING", "off")
+    monkeypatch.setattr(artifact_store, "_store", None)
+    return monkeypatch
+
+
+@pytest.fixture
+def client(app_env, valera_transport):
+    """``TestClient`` de la app con el cliente de VALERA conectado al simulado"""
+    from fastapi.testclient import TestClient
+    import app.main as main
+    from app.services import valera_client
+
+    async def init_client(**kwargs):
+        kwargs.setdefault("transport", valera_transport)
+        return await valera_client.init_client(**kwargs)
+
+    app_env.setattr(main, "init_client", init_client)
+    with TestClient(main.app) as test_client:
+        yield test_client
@@ -0,0 +1,155 @@
+import asyncio
+from contextlib import contextmanager
+
+import anyio
+import pytest
+
+from app.services.admission import AdmissionClass, AdmissionRejected, admission_class, init_admission
+from app.services.tenants import ANONYMOUS, UNVERIFIED, TenantRegistry, TenantState, key_tenant
+
+
+def test_routes_are_grouped_by_cost_class():
+    assert admission_class("/api/v1/lora/docx/{id}") == "single"
+    assert admission_class("/api/v1/lora/pdf_all_reports_by_user/{userId}") == "user"
+    assert admission_class("/api/v1/lora/xlsx_all_reports_filter") == "user"
+    assert admission_class("/api/v1/lora/bundle") == "user"
+    assert admission_class("/api/v1/lora/pdf_all_reports") == "all"
+    assert admission_class("/api/v1/health") is None
+
+
+@contextmanager
+def _held_slot(client, controller, name: str, tenant: str = "ocupado"):
+    """Ocupa un cupo real de la clase con ``admit()`` en una tarea del bucle de la app hasta salir del bloque"""
+    async def hold(release, *, task_status):
+        async with controller.admit(name, tenant):
+            task_status.started()
+            await release.wait()
+
+    release = client.portal.call(anyio.Event)
+    future, _ = client.portal.start_task(hold, release)
+    try:
+        yield
+    finally:
+        client.portal.call(release.set)
+        future.result()
+
+
+def test_full_queue_answers_429_with_retry_after_and_cors(client, app_env):
+    app_env.setenv("ADMISSION_SINGLE_LIMIT", "1")
+    app_env.setenv("ADMISSION_SINGLE_QUEUE", "0")
+    controller = init_admission()
+    single = controller.classes["single"]
+
+    # Un cupo ocupado y sin cola: la siguiente exportación se rechaza
+    with _held_slot(client, controller, "single"):
+        assert single.running == 1
+        response = client.get("/api/v1/lora/docx/3", headers={"Origin": "http://cliente.test"})
+        assert response.status_code == 429
+        assert int(response.headers["retry-after"]) >= 1
+        assert response.headers["access-control-allow-origin"] == "*"
+        assert "Retry-After" in response.headers["access-control-expose-headers"]
+        assert single.rejected == 1
+
+    assert single.running == 0
+    assert single.completed == 1
+    assert client.get("/api/v1/lora/docx/3").status_code == 200
+    assert single.running == 0
+
+
+def test_congestion_rejections_do_not_spend_the_tenant_tokens(client, app_env):
+    app_env.setenv("ADMISSION_SINGLE_LIMIT", "1")
+    app_env.setenv("ADMISSION_SINGLE_QUEUE", "0")
+    app_env.setenv("TENANT_RATE", "0.01")
+    app_env.setenv("TENANT_BURST", "2")
+    controller = init_admission()
+
+    with _held_slot(client, controller, "single"):
+        statuses = [client.get("/api/v1/lora/docx/3").status_code for _ in range(3)]
+    assert statuses == [429, 429, 429]
+    # Los rechazos por cola llena devolvieron sus tokens: el tenant conserva su ráfaga
+    assert [client.get("/api/v1/lora/docx/3").status_code for _ in range(2)] == [200, 200]
+    tenant = controller.tenants.stats()["tenants"]["ip:testclient"]
+    assert tenant["rejected"] == 3
+    assert tenant["throttled"] == 0
+
+
+def test_wait_longer_than_the_class_timeout_is_rejected_with_503():
+    async def run():
+        cls = AdmissionClass("user", limit=1, max_queue=4, timeout=0.05)
+        await cls.acquire()
+        with pytest.raises(AdmissionRejected) as rejected:
+            await cls.acquire()
+        cls.release(0.1)
+        return cls, rejected.value
+
+    cls, error = asyncio.run(run())
+    assert error.status_code == 503
+    assert error.reason == "timeout"
+    assert error.retry_after >= 1
+    assert cls.timed_out == 1
+    assert cls.running == 0
+    assert cls.waiting == 0
+
+
+def test_tenants_come_from_verified_keys_then_user_id_then_the_client_address(monkeypatch):
+    monkeypatch.setenv("TENANT_API_KEYS", "clave-a, clave-b")
+    registry = TenantRegistry()
+    gateway = ("10.0.0.7", 5000)
+    assert registry.identify([(b"x-api-key", b"clave-a")], gateway, {"userId": 7}) == key_tenant(b"clave-a")
+    # Rotar claves desconocidas no crea tenants nuevos
+    assert registry.identify([(b"x-api-key", b"rotada-1")], gateway) == UNVERIFIED
+    assert registry.identify([(b"x-api-key", b"rotada-2")]) == UNVERIFIED
+    # Detrás del gateway la dirección es la misma: el userId separa a los usuarios
+    assert registry.identify([], gateway, {"userId": 7}) == "user:7"
+    assert registry.identify([], gateway, {}, b"reportStatus=OPEN&userId=8") == "user:8"
+    assert registry.identify([], gateway) == "ip:10.0.0.7"
+    assert registry.identify([]) == ANONYMOUS
+
+
+def test_tenant_without_tokens_is_rate_limited(client, app_env):
+    app_env.setenv("TENANT_RATE", "0.01")
+    app_env.setenv("TENANT_BURST", "2")
+    init_admission()
+    # Claves distintas sin verificar comparten el token bucket de ``unverified``
+    statuses = [client.get("/api/v1/lora/docx/3", headers={"X-API-Key": key}) for key in ("k1", "k2", "k3")]
+    assert [response.status_code for response in statuses] == [200, 200, 429]
+    assert int(statuses[-1].headers["retry-after"]) >= 1
+
+
+def test_each_user_id_has_its_own_token_bucket(client, app_env):
+    app_env.setenv("TENANT_RATE", "0.01")
+    app_env.setenv("TENANT_BURST", "4")
+    controller = init_admission()
+    # Todas las peticiones llegan desde la misma dirección (el cliente de pruebas)
+    assert client.get("/api/v1/lora/xlsx_all_reports_by_user/1").status_code == 200
+    assert client.get("/api/v1/lora/xlsx_all_reports_by_user/1").status_code == 429
+    assert client.get("/api/v1/lora/xlsx_all_reports_by_user/2").status_code == 200
+    assert client.get("/api/v1/lora/xlsx_all_reports_filter", params={"userId": 3}).status_code == 200
+    tenants = controller.tenants.stats()["tenants"]
+    assert tenants["user:1"]["throttled"] == 1
+    assert tenants["user:2"]["admitted"] == 1
+    assert tenants["user:3"]["admitted"] == 1
+
+
+def test_waiting_tenants_are_served_in_fair_order():
+    async def run():
+        cls = AdmissionClass("all", limit=1, max_queue=8, timeout=5, tenant_queue=8)
+        a, b = TenantState("a", "a", 1.0, None), TenantState("b", "b", 1.0, None)
+        await cls.acquire(a)
+        served = []
+
+        async def wait(tenant):
+            await cls.acquire(tenant)
+            served.append(tenant.id)
+            cls.release(0.01)
+
+        waiters = [asyncio.ensure_future(wait(a)) for _ in range(3)]
+        await asyncio.sleep(0)
+        waiters.append(asyncio.ensure_future(wait(b)))
+        await asyncio.sleep(0)
+        cls.release(0.01)
+        await asyncio.gather(*waiters)
+        return served
+
+    # ``b`` llega después de tres peticiones de ``a`` pero no espera a que terminen todas
+    assert asyncio.run(run()) == ["a", "b", "a", "a"]
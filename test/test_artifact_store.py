@@ -0,0 +1,53 @@
+import os
+
+from app.services.artifact_store import ArtifactStore, artifact_key
+from app.services.LORA.pdf.all_reports import ExportAllReports
+from app.services.LORA.xlsx.all_reports import XLSXListExportService
+
+
+def _reports(updated_at: str = "2025-01-03T10:00:00.000Z"):
+    return [{"id": i, "updatedAt": updated_at, "reportTitle": f"Reporte {i}"} for i in range(1, 4)]
+
+
+def _store(tmp_path, monkeypatch, max_bytes: int, rescan: str = "3600", name: str = "artifacts") -> ArtifactStore:
+    monkeypatch.setenv("ARTIFACT_CACHE_RESCAN_SECONDS", rescan)
+    return ArtifactStore(root=str(tmp_path / name), max_bytes=max_bytes, enabled=True)
+
+
+def test_artifact_key_follows_updated_at_format_exporter_and_options():
+    key = artifact_key(_reports(), ".pdf", ExportAllReports)
+    assert artifact_key(_reports(), ".pdf", ExportAllReports) == key
+    assert artifact_key(_reports("2025-02-01T00:00:00.000Z"), ".pdf", ExportAllReports) != key
+    assert artifact_key(_reports(), ".xlsx", XLSXListExportService) != key
+    assert artifact_key(_reports(), ".pdf", ExportAllReports, {"landscape": True}) != key
+
+
+def test_put_and_open_round_trip(tmp_path, monkeypatch):
+    store = _store(tmp_path, monkeypatch, 10_000)
+    store.put("a", b"contenido")
+    with store.open("a") as f:
+        assert f.read() == b"contenido"
+    assert store.get("missing") is None
+    assert store.stats()["hits"] == 1
+    assert store.stats()["misses"] == 1
+
+
+def test_least_recently_used_artifact_is_evicted(tmp_path, monkeypatch):
+    store = _store(tmp_path, monkeypatch, 2500)
+    store.put("a", b"a" * 1000)
+    store.put("b", b"b" * 1000)
+    assert store.get("a") is not None
+    store.put("c", b"c" * 1000)
+    assert store.get("b") is None
+    assert store.get("a") is not None
+    assert store.get("c") is not None
+    assert store.bytes == 2000
+
+
+def test_budget_is_shared_by_stores_on_the_same_directory(tmp_path, monkeypatch):
+    first = _store(tmp_path, monkeypatch, 3000, rescan="0")
+    second = _store(tmp_path, monkeypatch, 3000, rescan="0")
+    for index in range(6):
+        (first if index % 2 else second).put(f"k{index}", bytes(1000))
+    root = tmp_path / "artifacts"
+    assert sum(os.path.getsize(root / name) for name in os.listdir(root)) <= 3000
@@ -0,0 +1,180 @@
+import io
+import time
+import zipfile
+
+import pytest
+
+
+@pytest.mark.parametrize("path", [
+    "/api/v1/lora/xlsx/3",
+    "/api/v1/lora/docx/3",
+    "/api/v1/lora/xlsx_all_reports_by_user/1",
+    "/api/v1/lora/pdf_all_reports_by_user/2",
+    "/api/v1/lora/csv_all_reports",
+    "/api/v1/lora/ndjson_all_reports_by_user/1",
+    "/api/v1/lora/csv_all_reports_filter?userId=2",
+])
+def test_matching_if_none_match_returns_304(client, path):
+    response = client.get(path)
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+
+    cached = client.get(path, headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == etag
+    assert cached.content == b""
+
+    assert client.get(path, headers={"If-None-Match": f"W/{etag}"}).status_code == 304
+    assert client.get(path, headers={"If-None-Match": '"otro"'}).status_code == 200
+
+
+def test_etag_differs_between_exports_of_the_same_report(client):
+    etags = {client.get(f"/api/v1/lora/{export}/3").headers["etag"] for export in ("xlsx", "docx", "pdf_simple")}
+    assert len(etags) == 3
+
+
+def test_bundle_zips_every_entry_and_lists_failures_in_errores_txt(client):
+    response = client.post("/api/v1/lora/bundle", json={"ids": [1, 2, 99], "formats": ["xlsx", "docx"]})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/zip"
+    archive = zipfile.ZipFile(io.BytesIO(response.content))
+    assert archive.testzip() is None
+    assert sorted(archive.namelist()) == [
+        "docx/lora_report_1.docx", "docx/lora_report_2.docx", "errores.txt",
+        "xlsx/lora_report_1.xlsx", "xlsx/lora_report_2.xlsx",
+    ]
+    errors = archive.read("errores.txt").decode("utf-8")
+    assert "docx 99: " in errors
+    assert "xlsx 99: " in errors
+
+
+def test_bundle_lists_a_failed_render_in_errores_txt(client, app_env):
+    from app.services.LORA.docs.single_report import DOCXExportService
+
+    generate_file = DOCXExportService.generate_file
+
+    def failing(self, data, options=None):
+        if data["id"] == 2:
+            raise RuntimeError("plantilla rota")
+        return generate_file(self, data, options)
+
+    app_env.setattr(DOCXExportService, "generate_file", failing)
+    response = client.post("/api/v1/lora/bundle", json={"ids": [1, 2], "formats": ["docx", "xlsx"]})
+    assert response.status_code == 200
+    archive = zipfile.ZipFile(io.BytesIO(response.content))
+    assert sorted(archive.namelist()) == [
+        "docx/lora_report_1.docx", "errores.txt", "xlsx/lora_report_1.xlsx", "xlsx/lora_report_2.xlsx",
+    ]
+    errors = archive.read("errores.txt").decode("utf-8")
+    assert "docx 2: " in errors
+    assert "plantilla rota" in errors
+    assert "xlsx" not in errors
+
+
+def test_bundle_rejects_multi_report_exports(client):
+    response = client.post("/api/v1/lora/bundle", json={"ids": [1], "formats": ["pdf_all_reports"]})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("failing", ["source_etag", "artifact_key"])
+def test_streamed_render_is_discarded_when_the_export_fails_before_finishing(client, app_env, failing):
+    from app.api import routes
+    from app.services.render_executor import RenderStream
+
+    discarded, finished = [], []
+    app_env.setattr(RenderStream, "discard", lambda self: discarded.append(self))
+    app_env.setattr(RenderStream, "finish", lambda self: finished.append(self))
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("fallo antes del render")
+
+    app_env.setattr(routes, failing, fail)
+    response = client.get("/api/v1/lora/pdf_all_reports_by_user/2")
+    assert response.status_code == 500
+    assert len(discarded) == 1
+    assert finished == []
+
+
+def _wait_for_job(client, job_id: str, timeout: float = 10.0) -> dict:
+    deadline = time.monotonic() + timeout
+    while True:
+        status = client.get(f"/api/v1/jobs/{job_id}").json()
+        if status["status"] in ("completed", "failed") or time.monotonic() > deadline:
+            return status
+        time.sleep(0.02)
+
+
+def test_export_job_runs_in_the_background_and_is_downloaded(client):
+    created = client.post("/api/v1/jobs", json={"export": "xlsx_all_reports_by_user", "userId": 1})
+    assert created.status_code == 202
+    job = created.json()
+    assert job["status"] in ("queued", "fetching", "rendering", "saving", "completed")
+    assert job["download_url"] is None or job["status"] == "completed"
+
+    status = _wait_for_job(client, job["job_id"])
+    assert status["status"] == "completed"
+    assert status["success"] is True
+    assert status["progress"] == 1.0
+    assert status["filename"] == "reportes_usuario_1.xlsx"
+    assert status["download_url"] == f"/api/v1/jobs/{job['job_id']}/file"
+
+    download = client.get(status["download_url"])
+    assert download.status_code == 200
+    assert download.headers["content-type"] == status["content_type"]
+    assert len(download.content) == status["size"]
+    assert zipfile.ZipFile(io.BytesIO(download.content)).testzip() is None
+    # El resultado se conserva y puede descargarse otra vez
+    assert client.get(status["download_url"]).content == download.content
+
+
+def test_failed_export_job_reports_the_error_and_has_no_file(client):
+    job = client.post("/api/v1/jobs", json={"export": "docx", "id": 99}).json()
+    status = _wait_for_job(client, job["job_id"])
+    assert status["status"] == "failed"
+    assert status["success"] is False
+    assert status["message"].startswith("Error en la exportación")
+    assert status["download_url"] is None
+    assert client.get(f"/api/v1/jobs/{job['job_id']}/file").status_code == 409
+
+
+def test_export_job_requires_its_parameter_and_unknown_jobs_are_404(client):
+    assert client.post("/api/v1/jobs", json={"export": "pdf_all_reports_by_user"}).status_code == 400
+    assert client.get("/api/v1/jobs/no-existe").status_code == 404
+    assert client.get("/api/v1/jobs/no-existe/file").status_code == 404
+
+
+def test_single_report_formats_are_zipped_with_per_format_timing(client):
+    response = client.get("/api/v1/lora/3/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/zip"
+    archive = zipfile.ZipFile(io.BytesIO(response.content))
+    assert archive.testzip() is None
+    assert sorted(archive.namelist()) == [
+        "lora_report_3_docx.docx", "lora_report_3_pdf_styled.pdf", "lora_report_3_xlsx.xlsx",
+    ]
+    assert archive.read("lora_report_3_pdf_styled.pdf").startswith(b"%PDF")
+    assert archive.read("lora_report_3_docx.docx").startswith(b"PK")
+    assert archive.read("lora_report_3_xlsx.xlsx").startswith(b"PK")
+    timing = response.headers["server-timing"]
+    for export in ("pdf_styled", "docx", "xlsx"):
+        assert f"{export};dur=" in timing
+
+
+def test_single_report_formats_accept_repeated_keys_and_reject_unknown_formats(client):
+    response = client.get("/api/v1/lora/3/export?formats=pdf_simple&formats=docx,pdf_simple")
+    assert sorted(zipfile.ZipFile(io.BytesIO(response.content)).namelist()) == [
+        "lora_report_3_docx.docx", "lora_report_3_pdf_simple.pdf",
+    ]
+    assert client.get("/api/v1/lora/3/export?formats=pdf_all_reports").status_code == 400
+
+
+def test_single_report_formats_fail_when_one_render_raises(client, app_env):
+    from app.services.LORA.xlsx.single_report import XLSXExportService
+
+    def failing(self, data, options=None):
+        raise RuntimeError("plantilla rota")
+
+    app_env.setattr(XLSXExportService, "generate_file", failing)
+    response = client.get("/api/v1/lora/3/export?formats=docx,xlsx")
+    assert response.status_code == 500
+    assert "xlsx" in response.json()["message"]
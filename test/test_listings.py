@@ -0,0 +1,19 @@
+import io
+
+import pytest
+
+from benchmarks.synthetic import generate_reports
+
+
+def test_parquet_listing_keeps_column_types(client):
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    response = client.get("/api/v1/lora/parquet_all_reports_by_user/1")
+    assert response.status_code == 200
+    table = pq.read_table(io.BytesIO(response.content))
+    expected = [report["id"] for report in generate_reports(30, 42, users=3) if report["userId"] == 1]
+    assert table.column("id").to_pylist() == expected
+    assert table.schema.field("id").type == pa.int64()
+    assert table.schema.field("createdAt").type == pa.timestamp("ms", tz="UTC")
+    assert pa.types.is_dictionary(table.schema.field("reportStatus").type)
+    assert table.schema.field("reportTitle").type == pa.string()
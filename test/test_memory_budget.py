@@ -0,0 +1,47 @@
+import anyio
+
+from benchmarks.synthetic import generate_reports
+from app.services.memory import MB, MemoryBudget, estimate_peak
+from app.services.render_executor import get_executor
+from app.services.LORA.pdf.all_reports import ExportAllReports
+
+
+def _listing_estimate() -> int:
+    # Mismos 30 reportes que sirve el VALERA simulado de conftest.py
+    return estimate_peak(ExportAllReports, generate_reports(30, 42, users=3))
+
+
+def test_export_larger_than_a_worker_budget_is_rejected_with_413(client):
+    budget = get_executor().memory = MemoryBudget(1, per_worker=_listing_estimate() // 2, timeout=1)
+    response = client.get("/api/v1/lora/pdf_all_reports")
+    assert response.status_code == 413
+    assert "MB" in response.json()["message"]
+    assert "retry-after" not in response.headers
+    assert budget.rejected == 1
+    assert budget.reserved == 0
+
+
+def test_saturated_memory_budget_answers_503_with_retry_after(client):
+    estimate = _listing_estimate()
+    budget = get_executor().memory = MemoryBudget(1, per_worker=estimate + MB, timeout=0.05)
+
+    async def hold(release, *, task_status):
+        # Otra exportación ocupa toda la memoria del trabajador
+        async with budget.reserve(budget.total):
+            task_status.started()
+            await release.wait()
+
+    release = client.portal.call(anyio.Event)
+    future, _ = client.portal.start_task(hold, release)
+    try:
+        response = client.get("/api/v1/lora/pdf_all_reports")
+        assert response.status_code == 503
+        assert int(response.headers["retry-after"]) >= 1
+        assert budget.timed_out == 1
+    finally:
+        client.portal.call(release.set)
+        future.result()
+
+    assert budget.reserved == 0
+    assert client.get("/api/v1/lora/pdf_all_reports").status_code == 200
+    assert budget.reserved == 0
@@ -0,0 +1,43 @@
+import pytest
+
+
+def _metric(client, name: str, **labels) -> float:
+    """Suma de las muestras de ``name`` en /metrics cuyas etiquetas incluyen ``labels``"""
+    parser = pytest.importorskip("prometheus_client.parser")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    return sum(
+        sample.value
+        for family in parser.text_string_to_metric_families(response.text)
+        for sample in family.samples
+        if sample.name == name and all(sample.labels.get(key) == value for key, value in labels.items())
+    )
+
+
+def test_metrics_exposes_the_export_stage_histograms_and_state_gauges(client):
+    pytest.importorskip("prometheus_client")
+    body = client.get("/metrics").text
+    for name in (
+        "export_valera_fetch_seconds", "export_normalize_seconds", "export_render_seconds", "export_serialize_seconds",
+        "export_output_bytes", "export_files_total", "export_in_flight", "export_executor_queued",
+        "export_cache_hit_ratio", "export_memory_reserved_bytes", "export_admission_running",
+    ):
+        assert f"# TYPE {name} " in body
+
+
+def test_export_increments_the_counters_of_its_route_and_format(client):
+    route = "/api/v1/lora/docx/{id}"
+    before = {
+        "files": _metric(client, "export_files_total", route=route, format="docx"),
+        "render": _metric(client, "export_render_seconds_count", route=route, format="docx"),
+        "fetch": _metric(client, "export_valera_fetch_seconds_count", route=route),
+        "bytes": _metric(client, "export_output_bytes_sum", route=route, format="docx"),
+    }
+    response = client.get("/api/v1/lora/docx/3")
+    assert response.status_code == 200
+
+    assert _metric(client, "export_files_total", route=route, format="docx") == before["files"] + 1
+    assert _metric(client, "export_render_seconds_count", route=route, format="docx") == before["render"] + 1
+    assert _metric(client, "export_valera_fetch_seconds_count", route=route) >= before["fetch"] + 1
+    assert _metric(client, "export_output_bytes_sum", route=route, format="docx") == before["bytes"] + len(response.content)
+    assert _metric(client, "export_in_flight", route=route) == 0
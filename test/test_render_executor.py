@@ -0,0 +1,90 @@
+import io
+import time
+import asyncio
+
+import pytest
+
+from benchmarks.synthetic import generate_reports
+from app.services.render_executor import RenderExecutor, RenderJob, RenderResult, SpilledFile
+from app.services.LORA.pdf.all_reports import ExportAllReports
+
+
+def _pages(content) -> int:
+    pypdf = pytest.importorskip("pypdf")
+    data = content.getvalue() if isinstance(content, io.BytesIO) else content
+    return len(pypdf.PdfReader(io.BytesIO(data)).pages)
+
+
+def test_render_stream_dispatches_shards_while_reports_arrive(monkeypatch):
+    monkeypatch.setattr(ExportAllReports, "SHARD_SIZE", 5)
+    reports = generate_reports(12, users=1)
+
+    async def run():
+        executor = RenderExecutor(process_workers=2)
+        try:
+            stream = executor.stream(RenderJob.for_service(ExportAllReports, None), ".pdf")
+            dispatched = []
+            for report in reports:
+                stream.add(report)
+                dispatched.append(len(stream._tasks))
+            return dispatched, await stream.finish()
+        finally:
+            executor.shutdown()
+
+    dispatched, content = asyncio.run(run())
+    # Un fragmento por cada 5 reportes recibidos; los 2 restantes se envían en ``finish``
+    assert dispatched[3] == 0
+    assert dispatched[4] == 1
+    assert dispatched[9] == 2
+    assert dispatched[-1] == 2
+    assert _pages(content) == _pages(asyncio.run(ExportAllReports().generate_file(reports)))
+
+
+def test_discarded_render_stream_removes_its_shards(monkeypatch, tmp_path):
+    monkeypatch.setattr(ExportAllReports, "SHARD_SIZE", 5)
+    monkeypatch.setenv("RENDER_SPILL_BYTES", "1")
+    monkeypatch.setenv("TMPDIR", str(tmp_path))
+
+    async def run():
+        executor = RenderExecutor(process_workers=2)
+        try:
+            stream = executor.stream(RenderJob.for_service(ExportAllReports, None), ".pdf")
+            for report in generate_reports(10, users=1):
+                stream.add(report)
+            tasks = list(stream._tasks)
+            stream.discard()
+            await asyncio.wait(tasks)
+            await asyncio.sleep(0)
+            return [task.result().output for task in tasks]
+        finally:
+            executor.shutdown()
+
+    outputs = asyncio.run(run())
+    assert len(outputs) == 2
+    assert all(isinstance(output, SpilledFile) and output.path.startswith(str(tmp_path)) for output in outputs)
+    assert not any(tmp_path.iterdir())
+
+
+def test_cancelled_render_deletes_its_spill_file_when_it_finishes(tmp_path):
+    path = tmp_path / "export-render-cancelado"
+
+    def slow_render():
+        time.sleep(0.3)
+        path.write_bytes(b"%PDF")
+        return RenderResult(SpilledFile(str(path), 4), [], [])
+
+    async def run():
+        # Con process_workers=0 el render corre en un hilo, que no se puede interrumpir
+        executor = RenderExecutor(process_workers=0)
+        try:
+            task = asyncio.ensure_future(executor._submit("pdf", slow_render))
+            await asyncio.sleep(0.1)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            await asyncio.sleep(0.5)
+        finally:
+            executor.shutdown()
+
+    asyncio.run(run())
+    assert not path.exists()
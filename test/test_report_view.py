@@ -0,0 +1,51 @@
+import pickle
+
+import pytest
+
+from benchmarks.synthetic import generate_reports
+from app.services.LORA.report_view import ReportView, clear_view_cache, iter_report_views, report_view
+
+
+@pytest.fixture
+def report():
+    clear_view_cache()
+    return next(report for report in generate_reports(20, users=2) if report.get("actions"))
+
+
+def test_report_view_is_immutable(report):
+    view = ReportView(report)
+    with pytest.raises(AttributeError):
+        view.id = 99
+    with pytest.raises(AttributeError):
+        del view.raw
+    with pytest.raises(TypeError):
+        view.raw["reportTitle"] = "otro"
+    with pytest.raises(TypeError):
+        view.values["reportTitle"] = "otro"
+    with pytest.raises(TypeError):
+        view.actions[0]["status"] = "otro"
+
+
+def test_report_view_does_not_follow_changes_to_the_source_dict(report):
+    view = ReportView(report)
+    title = view["reportTitle"]
+    report["reportTitle"] = "modificado"
+    assert view["reportTitle"] == title
+
+
+def test_report_view_survives_pickling(report):
+    view = ReportView(report)
+    restored = pickle.loads(pickle.dumps(view))
+    assert restored.to_dict() == view.to_dict()
+    assert dict(restored.values) == dict(view.values)
+    assert restored.items([("reportTitle", "Título")]) == view.items([("reportTitle", "Título")])
+    assert [dict(act) for act in restored.actions] == [dict(act) for act in view.actions]
+    with pytest.raises(AttributeError):
+        restored.id = 99
+
+
+def test_views_are_shared_while_updated_at_is_unchanged(report):
+    view = report_view(report)
+    assert report_view(dict(report)) is view
+    assert next(iter_report_views([dict(report)])) is view
+    assert report_view(dict(report, updatedAt="2030-01-01T00:00:00.000Z")) is not view
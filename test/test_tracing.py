@@ -0,0 +1,39 @@
+import re
+
+from app.services.LORA.report_view import clear_view_cache
+
+# ``etapa;dur=12.3`` separadas por coma, como en la especificación de Server-Timing
+SERVER_TIMING = re.compile(r"^[a-z_]+;dur=\d+(\.\d+)?(, [a-z_]+;dur=\d+(\.\d+)?)*$")
+
+
+def _durations(header: str) -> dict:
+    return {name: float(value) for name, value in (entry.split(";dur=") for entry in header.split(", "))}
+
+
+def test_export_response_reports_each_stage_in_server_timing(client):
+    # Sin la vista en caché la petición también normaliza el reporte
+    clear_view_cache()
+    response = client.get("/api/v1/lora/docx/3")
+    assert response.status_code == 200
+    header = response.headers["server-timing"]
+    assert SERVER_TIMING.match(header), header
+    durations = _durations(header)
+    assert {"fetch", "normalize", "render", "serialize", "total"} <= set(durations)
+    assert list(durations)[-1] == "total"
+    assert all(value >= 0 for value in durations.values())
+    assert durations["render"] <= durations["total"]
+    assert re.fullmatch(r"[0-9a-f]{32}", response.headers["x-trace-id"])
+
+
+def test_trace_continues_the_client_traceparent(client):
+    trace_id = "4bf92f3577b34da6a3ce929d0e0e4736"
+    response = client.get("/api/v1/lora/xlsx/3", headers={"traceparent": f"00-{trace_id}-00f067aa0ba902b7-01"})
+    assert response.headers["x-trace-id"] == trace_id
+
+
+def test_server_timing_can_be_disabled(client, app_env):
+    app_env.setenv("SERVER_TIMING_ENABLED", "false")
+    response = client.get("/api/v1/lora/docx/3")
+    assert response.status_code == 200
+    assert "server-timing" not in response.headers
+    assert "x-trace-id" in response.headers
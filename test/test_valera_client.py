@@ -0,0 +1,107 @@
+import asyncio
+
+import httpx
+
+from loadtest.fake_valera import FakeValeraConfig, create_app
+from app.services.report_cache import ReportCache
+from app.services.valera_client import SingleFlight, ValeraClient
+
+
+def _valera(latency_ms: float = 0):
+    return create_app(FakeValeraConfig(reports=5, users=1, latency_ms=latency_ms, jitter_ms=0, error_rate=0))
+
+
+async def _requests(transport: httpx.AsyncBaseTransport) -> int:
+    async with httpx.AsyncClient(transport=transport, base_url="http://valera") as client:
+        return (await client.get("/_stats")).json()["requests"]
+
+
+class _Recording(httpx.AsyncBaseTransport):
+    """Transporte que anota cada petición a VALERA (ruta y query)"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self.transport = transport
+        self.requests = []
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append((request.url.path, dict(request.url.params)))
+        return await self.transport.handle_async_request(request)
+
+
+def test_concurrent_fetches_of_a_report_share_one_request():
+    transport = httpx.ASGITransport(app=_valera(latency_ms=50))
+
+    async def run():
+        client = ValeraClient(transport=transport)
+        try:
+            reports = await asyncio.gather(*(client.get_report_by_id(3) for _ in range(10)))
+        finally:
+            await client.aclose()
+        return reports, client.single_flight.stats(), await _requests(transport)
+
+    reports, stats, requests = asyncio.run(run())
+    assert reports[0]["id"] == 3
+    assert all(report is reports[0] for report in reports)
+    assert stats["fetches"] == 1
+    assert stats["coalesced"] == 9
+    assert requests == 1
+
+
+def test_single_flight_shares_errors_and_forgets_the_key():
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise ValueError("VALERA no disponible")
+
+    async def run():
+        flight = SingleFlight()
+        results = await asyncio.gather(*(flight.do("k", failing) for _ in range(3)), return_exceptions=True)
+        return flight, results
+
+    flight, results = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_stale_report_is_revalidated_with_an_updated_at_probe():
+    transport = _Recording(httpx.ASGITransport(app=_valera()))
+
+    async def run():
+        # TTL 0: la segunda lectura encuentra la entrada vencida
+        client = ValeraClient(transport=transport, cache=ReportCache(ttl=0))
+        try:
+            return await client.get_report_by_id(3), await client.get_report_by_id(3)
+        finally:
+            await client.aclose()
+
+    first, second = asyncio.run(run())
+    assert second is first
+    assert transport.requests == [
+        ("/api/lora-report/3", {}),
+        ("/api/lora-report/getReportFilter", {"id": "3", "page": "1", "limit": "1"}),
+    ]
+
+
+def test_stale_report_is_downloaded_again_when_updated_at_changed():
+    report = {"id": 3, "updatedAt": "2025-01-01T00:00:00.000Z", "reportTitle": "v1"}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("/getReportFilter"):
+            return httpx.Response(200, json={"data": {"data": [report], "pagination": {"totalPages": 1}}})
+        return httpx.Response(200, json=report)
+
+    async def run():
+        client = ValeraClient(transport=httpx.MockTransport(handler), cache=ReportCache(ttl=0))
+        try:
+            first = await client.get_report_by_id(3)
+            report.update(updatedAt="2025-02-01T00:00:00.000Z", reportTitle="v2")
+            return first, await client.get_report_by_id(3)
+        finally:
+            await client.aclose()
+
+    first, second = asyncio.run(run())
+    assert first["reportTitle"] == "v1"
+    assert second["reportTitle"] == "v2"